@@ -7,8 +7,12 @@ import streamlit as st
 import seaborn as sns
 from datetime import datetime, timedelta
 import requests
+from cryptobot import load_environment
+from cryptobot.backtest import backtest_predictions
 from cryptobot.brokers.enums import Intervals, Symbols
 
+load_environment()
+
 BASE_API_URL = "https://cryptobot-889-amz3m5pjwa-ew.a.run.app"
 # THRESHOLD =.517037
 THRESHOLD =.517039
@@ -59,26 +63,11 @@ def prediction():
     return prediction
 prediction=prediction()
 
-def create_df_stock(candles, prediction):
-    df_stock = candles[["open_time","open","close"]]
-    df_stock["symbol"] = prediction["predictions"].apply(lambda x: 0 if x <=THRESHOLD else 1)
-    df_stock["USD"] = 0
-    df_stock["ETH"] = 0
-    df_stock.dropna(inplace=True)
-    df_stock.reset_index(inplace=True)
-    for index,row in df_stock.iterrows():
-        if index == 0:
-            df_stock.loc[index,'USD'] = INITIAL_INVEST
-        else:
-            df_stock.loc[index,'USD'] = df_stock.loc[index-1,'USD'] - (df_stock.loc[index,'symbol']*df_stock.loc[index-1,'USD'] - (1-df_stock.loc[index,'symbol'])*(df_stock.loc[index-1,'ETH']*df_stock.loc[index-1,'close']))
-            df_stock.loc[index,'ETH'] = df_stock.loc[index-1,'ETH'] - ((1-df_stock.loc[index,'symbol'])*df_stock.loc[index-1,'ETH'] - df_stock.loc[index,'symbol']*(df_stock.loc[index-1,'USD']/df_stock.loc[index-1,'close']))
-    df_stock["TOTAL_VALUE_IN_USD"] = df_stock["USD"] + df_stock["ETH"]*df_stock["close"]
-    df_stock[["USD","TOTAL_VALUE_IN_USD"]] = df_stock[["USD","TOTAL_VALUE_IN_USD"]].applymap(lambda x: round(x,1))
-    df_stock.set_index("open_time")
+def create_df_stock(candles, prediction, initial_invest):
+    df_stock = backtest_predictions(candles, prediction["predictions"], THRESHOLD, initial_invest, asset="ETH")
+    df_stock[["USD","TOTAL_VALUE_IN_USD"]] = df_stock[["USD","TOTAL_VALUE_IN_USD"]].round(1)
     return df_stock
 
-df_stock = create_df_stock(candles,prediction)
-
 CSS = """
 h1 {
     color: red;
@@ -193,30 +182,10 @@ number = st.number_input('Invest Simulator')
 # df_stock["symbol"] = prediction["symbol_predicted"].apply(lambda x: 0 if x <=THRESHOLD else 1).to_list()
 # df_stock["symbol"] = 1   Para estrategia de HOLD
 
-INITIAL_INVEST=number
-
-df_stock["USD"] = 0
-df_stock["ETH"] = 0
-
-df_stock.dropna(inplace=True)
-df_stock.reset_index(inplace=True)
-
-for index,row in df_stock.iterrows():
-
-    if index == 0:
-        df_stock.loc[index,'USD'] = INITIAL_INVEST
-
-    else:
-        df_stock.loc[index,'USD'] = df_stock.loc[index-1,'USD'] - (df_stock.loc[index,'symbol']*df_stock.loc[index-1,'USD'] - (1-df_stock.loc[index,'symbol'])*(df_stock.loc[index-1,'ETH']*df_stock.loc[index-1,'close']))
-        df_stock.loc[index,'ETH'] = df_stock.loc[index-1,'ETH'] - ((1-df_stock.loc[index,'symbol'])*df_stock.loc[index-1,'ETH'] - df_stock.loc[index,'symbol']*(df_stock.loc[index-1,'USD']/df_stock.loc[index-1,'close']))
-
-df_stock["TOTAL_VALUE_IN_USD"] = df_stock["USD"] + df_stock["ETH"]*df_stock["close"]
-df_stock[["USD","TOTAL_VALUE_IN_USD"]] = df_stock[["USD","TOTAL_VALUE_IN_USD"]].applymap(lambda x: round(x,1))
-
-df_stock.set_index("open_time")
+df_stock = create_df_stock(candles, prediction, number)
 
 
-investment_result = df_stock["TOTAL_VALUE_IN_USD"][len(df_stock["TOTAL_VALUE_IN_USD"])-1] - number
+investment_result = df_stock["TOTAL_VALUE_IN_USD"].iloc[-1] - number
 
 st.markdown("""
             ### HISTORICAL SIMULATION OF INVESTMENT (IN USD)
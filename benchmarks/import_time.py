@@ -0,0 +1,58 @@
+"""
+Measures the time to import the modules of the package, each one in a new interpreter,
+and which heavy dependencies each import loads.
+
+Usage:
+    python benchmarks/import_time.py [module ...]
+"""
+import subprocess
+import sys
+
+MODULES = [
+    "cryptobot",
+    "cryptobot.brokers.enums",
+    "cryptobot.brokers.binance_client",
+    "cryptobot.backtest",
+    "cryptobot.data",
+    "cryptobot.trainer",
+    "cryptobot.predictors.crypto_predictor",
+]
+
+HEAVY_DEPENDENCIES = ["tensorflow", "pandas_ta", "sklearn", "binance", "yfinance"]
+
+SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed, ",".join(heavy))
+"""
+
+
+def measure(module, repeat=3):
+    """
+    Returns the best import time of the module, in seconds, and the heavy dependencies it loads.
+    """
+    best, heavy = float("inf"), ""
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", SCRIPT.format(module=module, heavy=HEAVY_DEPENDENCIES)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        best = min(best, float(output[0]))
+        heavy = output[1] if len(output) > 1 else ""
+    return best, heavy
+
+
+if __name__ == "__main__":
+    print(f"{'module':45} {'seconds':>8}  heavy dependencies")
+    for module in sys.argv[1:] or MODULES:
+        try:
+            seconds, heavy = measure(module)
+        except subprocess.CalledProcessError as error:
+            print(f"{module:45} {'error':>8}  {error.stderr.strip().splitlines()[-1]}")
+            continue
+        print(f"{module:45} {seconds:8.3f}  {heavy or '-'}")
@@ -0,0 +1,380 @@
+"""
+Benchmarks of the hot path from the candles to the predictions: parsing the klines, paginating
+get_candles, the features, the windows, the predictor with a stub model and the portfolio
+simulation of the app. Each stage is measured at several data sizes, with its best time and its
+peak memory (tracemalloc), and compared with a stored baseline.
+
+The klines are synthetic, a seeded random walk, or recorded from Binance with --klines, as the
+JSON list of raw klines returned by the klines endpoint. They are served by a fake klines client,
+so nothing is requested to Binance. The stages whose dependencies aren't installed are skipped.
+
+Usage:
+    python benchmarks/suite.py [--sizes 1000 10000] [--klines klines.json] [--stages parse_candle ...]
+    python benchmarks/suite.py --save-baseline
+The exit code is 1 if a stage regresses more than the margin of the baseline, or if a stage is
+slower than the stage it replaces (NOT_SLOWER_THAN), like parse_candle_columns and parse_candle.
+"""
+import argparse
+import bisect
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptobot.backtest import backtest_predictions  # noqa: E402
+from cryptobot.brokers.binance_client import (  # noqa: E402
+    BinanceClient,
+    parse_candle,
+    parse_candle_columns,
+)
+from cryptobot.brokers.enums import Intervals, Symbols  # noqa: E402
+from cryptobot.stores.candle_store import to_datetime  # noqa: E402
+from cryptobot.utils.daily_data_helper import align_daily_data, attach_daily_data  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_MARGIN = 0.5
+# The differences below these are noise, they aren't regressions.
+NOISE_FLOOR = {"seconds": 0.002, "peak_bytes": 64 * 2**10}
+
+HOUR = Intervals.ONE_HOUR.to_milliseconds()
+# The synthetic klines close just before 2022-06-01 00:00 UTC.
+LAST_OPEN_TIME = 1654041600000 - HOUR
+
+
+class FakeKlinesClient:
+    """Serves the klines endpoint of Binance from a list of raw klines, sorted by open time."""
+
+    def __init__(self, klines):
+        self.klines = klines
+        self.open_times = [kline[0] for kline in klines]
+
+    def get_klines(self, symbol, interval, startTime=None, endTime=None, limit=None):
+        limit = min(limit or 500, 1000)
+        end = bisect.bisect_right(self.open_times, endTime)
+        if startTime is None:
+            return self.klines[max(end - limit, 0) : end]
+        start = bisect.bisect_left(self.open_times, startTime)
+        return self.klines[start : min(start + limit, end)]
+
+
+class StubModel:
+    """Predicts the sigmoid of the last step of the first feature of each window."""
+
+    size = 0
+
+    def predict(self, X):
+        return 1 / (1 + np.exp(-np.asarray(X)[:, -1, 0]))
+
+
+def synthetic_klines(size, seed=0):
+    """
+    Returns size raw klines, like the klines endpoint returns them, of a seeded random walk.
+    """
+    rng = np.random.default_rng(seed)
+    open_time = LAST_OPEN_TIME - HOUR * np.arange(size)[::-1]
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, size)))
+    open_ = np.concatenate([[1000], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.005, size)) * close
+    volume = rng.uniform(10, 1000, size)
+    trades = rng.integers(100, 10000, size)
+    return [
+        [
+            int(open_time[i]),
+            f"{open_[i]:.2f}",
+            f"{max(open_[i], close[i]) + spread[i]:.2f}",
+            f"{min(open_[i], close[i]) - spread[i]:.2f}",
+            f"{close[i]:.2f}",
+            f"{volume[i]:.6f}",
+            int(open_time[i]) + HOUR - 1,
+            f"{volume[i] * close[i]:.6f}",
+            int(trades[i]),
+            f"{volume[i] / 2:.6f}",
+            f"{volume[i] * close[i] / 2:.6f}",
+            "0",
+        ]
+        for i in range(size)
+    ]
+
+
+def synthetic_daily_data(klines, seed=0):
+    """
+    Returns daily data like get_daily_data does, aligned by day, for the days of the klines.
+    """
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(
+        pd.to_datetime(klines[0][0], unit="ms").normalize(),
+        pd.to_datetime(klines[-1][6], unit="ms").normalize(),
+        freq="D",
+    )
+    value = rng.integers(0, 100, len(days))
+    classes = np.array(["Extreme Fear", "Fear", "Neutral", "Greed", "Extreme Greed"])
+    return align_daily_data(
+        pd.DataFrame(
+            {
+                "close_time_day": days.strftime("%Y-%m-%d"),
+                "FG_value": value.astype(float),
+                "FG_val_clasif": classes[np.minimum(value // 20, 4)],
+                "btc_avg": rng.uniform(40, 70, len(days)),
+                "GSPC_close": 4000 * np.exp(np.cumsum(rng.normal(0, 0.01, len(days)))),
+            }
+        )
+    )
+
+
+def parsed_candles(klines):
+    from cryptobot.data import parse_candles_data
+
+    return parse_candles_data(pd.DataFrame(parse_candle_columns(klines)))
+
+
+def create_predictor(klines, daily_data):
+    """
+    Returns a CryptoPredictor with a stub model, that reads the candles from the fake client
+    through a temporary candle store.
+    """
+    from cryptobot import data
+    from cryptobot.predictors.crypto_predictor import CryptoPredictor
+    from cryptobot.predictors.model_registry import ModelRegistry
+    from cryptobot.stores.candle_store import CandleStore
+    from cryptobot.stores.prediction_store import PredictionStore
+    from cryptobot.utils.pipeline_helper import create_pipeline
+
+    client = BinanceClient(None, None)
+    client.client = FakeKlinesClient(klines)
+    data._binance_client = client
+    data.candle_store = CandleStore(tempfile.mkdtemp())
+
+    class BenchmarkPredictor(CryptoPredictor):
+        def __init__(self):
+            self.daily_data = daily_data
+            self.prediction_store = PredictionStore()
+            self.model_registry = ModelRegistry(loader=self.load)
+
+        def load(self, symbol, interval, version):
+            df = self.add_features(parsed_candles(klines[-2000:]))
+            pipeline = create_pipeline(df).fit(df)
+            preprocessor = {"pipeline": pipeline, "columns": list(df.columns), "version": "benchmark"}
+            return {"model": StubModel(), "preprocessor": preprocessor}
+
+    return BenchmarkPredictor()
+
+
+def bench_parse_candle(klines, daily_data):
+    return lambda: [parse_candle(kline) for kline in klines]
+
+
+def bench_parse_candle_columns(klines, daily_data):
+    return lambda: parse_candle_columns(klines)
+
+
+def bench_parse_candles_data(klines, daily_data):
+    from cryptobot.data import parse_candles_data
+
+    columns = parse_candle_columns(klines)
+    return lambda: parse_candles_data(pd.DataFrame(columns))
+
+
+def bench_get_candles(klines, daily_data):
+    client = BinanceClient(None, None)
+    client.client = FakeKlinesClient(klines)
+    start_time, end_time = to_datetime(klines[0][0]), to_datetime(klines[-1][6])
+    return lambda: client.get_candles(Symbols.ETHUSDT, Intervals.ONE_HOUR, start_time, end_time)
+
+
+def bench_add_metrics(klines, daily_data):
+    from cryptobot.utils.feature_engineering import add_metrics
+
+    df = parsed_candles(klines)
+    return lambda: add_metrics(df.copy())
+
+
+def bench_clean_data(klines, daily_data):
+    from cryptobot.data import clean_data
+
+    df = attach_daily_data(parsed_candles(klines), daily_data)
+    return lambda: clean_data(df.copy())
+
+
+def bench_get_X_y(klines, daily_data):
+    from cryptobot.utils.data_train_split_helper import get_X_y
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(len(klines), 20)))
+    df["remainder__target"] = rng.integers(0, 2, len(klines))
+    lengths = rng.integers(120, 168, 1000)
+    return lambda: get_X_y(df, lengths)
+
+
+def bench_prepare_X(klines, daily_data):
+    predictor = create_predictor(klines, daily_data)
+    close_time = to_datetime(klines[-1][6])
+    return lambda: predictor.prepare_X(Symbols.ETHUSDT, close_time, Intervals.ONE_HOUR)
+
+
+def bench_predict(klines, daily_data):
+    from cryptobot.stores.prediction_store import PredictionStore
+
+    predictor = create_predictor(klines, daily_data)
+    start_time = to_datetime(klines[-1][6] + 1)
+
+    def predict():
+        # A new store each time, so the prediction isn't cached.
+        predictor.prediction_store = PredictionStore()
+        return predictor.predict(Symbols.ETHUSDT, start_time, Intervals.ONE_HOUR)
+
+    return predict
+
+
+def bench_portfolio_simulation(klines, daily_data):
+    # The simulation of create_df_stock in app.py, that can't be imported without streamlit.
+    candles = parsed_candles(klines)
+    predictions = pd.Series(np.random.default_rng(0).uniform(0.4, 0.6, len(candles)))
+    return lambda: backtest_predictions(candles, predictions, 0.517039, 10000, asset="ETH")
+
+
+# Each stage: name, function that receives the klines and the daily data and returns the
+# callable to measure, and the modules it needs.
+STAGES = [
+    ("parse_candle", bench_parse_candle, []),
+    ("parse_candle_columns", bench_parse_candle_columns, []),
+    ("parse_candles_data", bench_parse_candles_data, []),
+    ("get_candles", bench_get_candles, []),
+    ("add_metrics", bench_add_metrics, ["pandas_ta"]),
+    ("clean_data", bench_clean_data, []),
+    ("get_X_y", bench_get_X_y, []),
+    ("prepare_X", bench_prepare_X, ["pandas_ta", "sklearn"]),
+    ("predict", bench_predict, ["pandas_ta", "sklearn"]),
+    ("portfolio_simulation", bench_portfolio_simulation, []),
+]
+
+# Each pair: a stage that replaces another one, that can't be slower than it at any size.
+NOT_SLOWER_THAN = [
+    ("parse_candle_columns", "parse_candle"),
+]
+
+
+def measure(function, repeat=5):
+    """
+    Returns the best time of repeat runs, in seconds, and the peak memory of one run, in bytes.
+    """
+    function()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def run(sizes=DEFAULT_SIZES, klines=None, stages=None, repeat=5):
+    """
+    Returns the results of the stages at each size, keyed by "stage[size]".
+    With recorded klines, the sizes are the last candles of the recording.
+    """
+    results = {}
+    for size in sizes:
+        size_klines = klines[-size:] if klines else synthetic_klines(size)
+        daily_data = synthetic_daily_data(size_klines)
+        for name, bench, requirements in STAGES:
+            if stages and name not in stages:
+                continue
+            missing = [r for r in requirements if importlib.util.find_spec(r) is None]
+            if missing:
+                print(f"{name:22} {size:>8}  skipped, {', '.join(missing)} not installed")
+                continue
+
+            seconds, peak = measure(bench(size_klines, daily_data), repeat)
+            results[f"{name}[{len(size_klines)}]"] = {"seconds": seconds, "peak_bytes": peak}
+            print(f"{name:22} {len(size_klines):>8}  {seconds * 1000:10.2f} ms  {peak / 2**20:8.2f} MB")
+    return results
+
+
+def compare(results, baseline, margin):
+    """
+    Returns the regressions of the results: the time or the peak memory of a stage greater
+    than its baseline by more than margin (a fraction) and more than the noise floor.
+    """
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        for metric in ["seconds", "peak_bytes"]:
+            if (
+                result[metric] > reference[metric] * (1 + margin)
+                and result[metric] - reference[metric] > NOISE_FLOOR[metric]
+            ):
+                regressions.append(
+                    f"{key} {metric}: {result[metric]:.6g} > {reference[metric]:.6g} (+{margin:.0%})"
+                )
+    return regressions
+
+
+def compare_stages(results):
+    """
+    Returns the stages of NOT_SLOWER_THAN slower than the stage they replace, by more than the
+    noise floor, at the same size.
+    """
+    regressions = []
+    for key, result in results.items():
+        name, size = key.split("[")
+        for stage, reference_stage in NOT_SLOWER_THAN:
+            reference = results.get(f"{reference_stage}[{size}")
+            if name != stage or reference is None:
+                continue
+            if result["seconds"] - reference["seconds"] > NOISE_FLOOR["seconds"]:
+                regressions.append(
+                    f"{key} seconds: {result['seconds']:.6g} > {reference_stage}[{size} "
+                    f"{reference['seconds']:.6g}"
+                )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the candle-to-prediction hot path")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--klines", help="JSON file with raw klines recorded from Binance")
+    parser.add_argument("--stages", nargs="+", help="Only these stages")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--margin", type=float, help="By default, the margin of the baseline")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    klines = None
+    if args.klines:
+        with open(args.klines) as f:
+            klines = json.load(f)
+
+    results = run(args.sizes, klines, args.stages, args.repeat)
+    regressions = compare_stages(results)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"margin": args.margin or DEFAULT_MARGIN, "results": results}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif not os.path.exists(args.baseline):
+        print(f"There's no baseline at {args.baseline}, run with --save-baseline")
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        margin = args.margin if args.margin is not None else baseline.get("margin", DEFAULT_MARGIN)
+        regressions += compare(results, baseline["results"], margin)
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    sys.exit(1 if regressions else 0)
@@ -1,15 +1,29 @@
 from os.path import isfile
 from os.path import dirname
-from dotenv import load_dotenv, find_dotenv
 import logging
 
-# Uncomment next line in case that you create and execute any main function inside this folder.
-load_dotenv(find_dotenv())
+"""
+Importing the package doesn't do any I/O. The entry points (scripts, app, __main__ blocks)
+call load_environment to load the .env file and configure the logging.
+"""
 
 version_file = "{}/version.txt".format(dirname(__file__))
 
-if isfile(version_file):
-    with open(version_file) as version_file:
-        __version__ = version_file.read().strip()
 
-logging.basicConfig(level=logging.INFO)
+def load_environment():
+    """
+    Loads the variables of the .env file into the environment and configures the logging.
+    """
+    from dotenv import load_dotenv, find_dotenv
+
+    load_dotenv(find_dotenv())
+    logging.basicConfig(level=logging.INFO)
+
+
+def __getattr__(name):
+    # The version is read on first access.
+    if name == "__version__" and isfile(version_file):
+        with open(version_file) as f:
+            globals()["__version__"] = f.read().strip()
+        return globals()["__version__"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
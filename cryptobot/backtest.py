@@ -0,0 +1,244 @@
+import numpy as np
+import pandas as pd
+
+"""
+Vectorized simulation of the all-in/all-out strategy.
+On every candle the whole portfolio is either in the asset (position 1) or in USD (position 0).
+The position of a candle is taken at the close price of the previous candle, so the value of
+the portfolio grows with the asset return while the position is 1, and stays flat while it's 0.
+A fee, as a fraction of the traded value, is paid every time the position changes.
+"""
+
+INITIAL_INVEST = 10000
+
+
+def predictions_to_positions(predictions, threshold: float):
+    """
+    Returns the positions for the given prediction probabilities:
+    0 (USD) if the prediction is lower or equal than the threshold, otherwise 1 (asset).
+    """
+    return np.where(np.asarray(predictions, dtype=float) <= threshold, 0, 1)
+
+
+def simulate_portfolio(close, positions, initial_invest=INITIAL_INVEST, fee=0.0):
+    """
+    Simulates the strategy with array operations.
+
+    Parameters
+    ----------
+    close : array-like
+        The close prices. It's a 1D array for one symbol or a 2D array (candles x symbols).
+
+    positions : array-like
+        The positions, with the same shape that close. The position of the first candle
+        is ignored, because the portfolio starts with the initial investment in USD.
+
+    initial_invest : float
+        It's the initial investment in USD, for each symbol.
+
+    fee : float
+        It's the fee paid on each trade as a fraction of the traded value.
+
+    Returns
+    -------
+    dict
+        Contains the arrays USD, ASSET (quantity of the asset) and TOTAL_VALUE_IN_USD,
+        with the same shape that close.
+    """
+    close = np.asarray(close, dtype=float)
+    held = np.array(positions, dtype=float)
+    held[0] = 0
+
+    returns = np.ones_like(close)
+    returns[1:] = close[1:] / close[:-1]
+    trades = np.abs(np.diff(held, axis=0, prepend=held[:1]))
+
+    growth = np.where(held == 1, returns, 1.0) * (1 - fee * trades)
+    total_value = initial_invest * np.cumprod(growth, axis=0)
+
+    return {
+        "USD": np.where(held == 1, 0.0, total_value),
+        "ASSET": np.where(held == 1, total_value / close, 0.0),
+        "TOTAL_VALUE_IN_USD": total_value,
+    }
+
+
+def compute_metrics(total_value, positions=None, periods_per_year=None):
+    """
+    Returns the final value, total return, maximum drawdown, number of trades and,
+    if periods_per_year is given, the annualized Sharpe ratio of the simulation.
+    For 2D inputs (candles x symbols), every metric is an array with one value per symbol.
+    """
+    total_value = np.asarray(total_value, dtype=float)
+    running_max = np.maximum.accumulate(total_value, axis=0)
+    metrics = {
+        "final_value": total_value[-1],
+        "total_return": total_value[-1] / total_value[0] - 1,
+        "max_drawdown": np.max(1 - total_value / running_max, axis=0),
+    }
+
+    if positions is not None:
+        held = np.array(positions, dtype=float)
+        held[0] = 0
+        metrics["trades"] = np.abs(np.diff(held, axis=0)).sum(axis=0)
+
+    if periods_per_year:
+        period_returns = total_value[1:] / total_value[:-1] - 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            metrics["sharpe"] = (
+                period_returns.mean(axis=0)
+                / period_returns.std(axis=0)
+                * np.sqrt(periods_per_year)
+            )
+
+    return metrics
+
+
+def backtest(df, initial_invest=INITIAL_INVEST, fee=0.0, asset="ETH"):
+    """
+    Returns a copy of df with the USD, asset and TOTAL_VALUE_IN_USD columns of the simulation.
+    df must have the close and symbol (position) columns, one row per candle.
+    """
+    df = df.copy()
+    simulation = simulate_portfolio(df["close"], df["symbol"], initial_invest, fee)
+    df["USD"] = simulation["USD"]
+    df[asset] = simulation["ASSET"]
+    df["TOTAL_VALUE_IN_USD"] = simulation["TOTAL_VALUE_IN_USD"]
+    return df
+
+
+def backtest_predictions(
+    candles, predictions, threshold: float, initial_invest=INITIAL_INVEST, fee=0.0, asset="ETH"
+):
+    """
+    Returns the simulation of backtest for the candles with the positions of the predictions,
+    aligned by index. The candles without a prediction are dropped, they aren't simulated.
+    """
+    df = candles[["open_time", "open", "close"]].copy()
+    df["symbol"] = pd.Series(predictions).reindex(df.index)
+    df = df.dropna()
+    df["symbol"] = predictions_to_positions(df["symbol"], threshold)
+    return backtest(df.reset_index(), initial_invest, fee, asset)
+
+
+def backtest_symbols(
+    close: pd.DataFrame,
+    predictions: pd.DataFrame,
+    threshold: float,
+    initial_invest=INITIAL_INVEST,
+    fee=0.0,
+    periods_per_year=None,
+):
+    """
+    Simulates the strategy for several symbols at once, each one with its own initial investment.
+
+    Parameters
+    ----------
+    close : pd.DataFrame
+        The close prices, one column per symbol and one row per candle.
+
+    predictions : pd.DataFrame
+        The prediction probabilities, with the same columns and index that close.
+
+    Returns
+    -------
+    tuple
+        The total value in USD of each symbol (pd.DataFrame like close),
+        and the metrics of each symbol (pd.DataFrame with one row per symbol).
+    """
+    predictions = predictions.reindex(index=close.index, columns=close.columns)
+    positions = predictions_to_positions(predictions, threshold)
+    simulation = simulate_portfolio(close, positions, initial_invest, fee)
+
+    total_value = pd.DataFrame(
+        simulation["TOTAL_VALUE_IN_USD"], index=close.index, columns=close.columns
+    )
+    metrics = pd.DataFrame(
+        compute_metrics(total_value, positions, periods_per_year), index=close.columns
+    )
+    return total_value, metrics
+
+
+def sweep_parameters(
+    predictions,
+    close,
+    thresholds,
+    min_holds=(0,),
+    fees=(0.0,),
+    initial_invest=INITIAL_INVEST,
+    sort_by="final_value",
+):
+    """
+    Evaluates every combination of threshold, minimum hold and fee over the same predictions,
+    in one pass over the candles vectorized along the parameters axis.
+    The minimum hold is the number of candles that a position must be kept before it can change.
+    With a minimum hold of 0 or 1 the strategy is the same that simulate_portfolio simulates.
+
+    Parameters
+    ----------
+    predictions : array-like
+        The prediction probabilities, one per candle.
+
+    close : array-like
+        The close prices, one per candle.
+
+    thresholds, min_holds, fees : array-like
+        The values to combine.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per combination, sorted by sort_by (descending, except for max_drawdown), with the
+        threshold, min_hold, fee, final_value, total_return, max_drawdown, trades and turnover
+        (traded value divided by the initial investment) columns.
+    """
+    predictions = np.asarray(predictions, dtype=float)
+    close = np.asarray(close, dtype=float)
+    threshold, min_hold, fee = (
+        grid.ravel()
+        for grid in np.meshgrid(
+            np.asarray(thresholds, dtype=float),
+            np.asarray(min_holds, dtype=float),
+            np.asarray(fees, dtype=float),
+            indexing="ij",
+        )
+    )
+
+    value = np.full(threshold.shape, float(initial_invest))
+    peak = value.copy()
+    max_drawdown = np.zeros_like(value)
+    trades = np.zeros_like(value)
+    traded_value = np.zeros_like(value)
+    position = np.zeros(threshold.shape, dtype=bool)
+    held_for = np.full(threshold.shape, np.inf)
+
+    for t in range(1, len(close)):
+        signal = ~(predictions[t] <= threshold)
+        new_position = np.where(held_for >= min_hold, signal, position)
+        changed = new_position != position
+
+        trades += changed
+        traded_value += changed * value
+        value *= 1 - fee * changed
+        value *= np.where(new_position, close[t] / close[t - 1], 1.0)
+
+        np.maximum(peak, value, out=peak)
+        np.maximum(max_drawdown, 1 - value / peak, out=max_drawdown)
+        held_for = np.where(changed, 1, held_for + 1)
+        position = new_position
+
+    results = pd.DataFrame(
+        {
+            "threshold": threshold,
+            "min_hold": min_hold.astype(int),
+            "fee": fee,
+            "final_value": value,
+            "total_return": value / initial_invest - 1,
+            "max_drawdown": max_drawdown,
+            "trades": trades.astype(int),
+            "turnover": traded_value / initial_invest,
+        }
+    )
+    return results.sort_values(
+        sort_by, ascending=sort_by == "max_drawdown", ignore_index=True
+    )
@@ -1,6 +1,10 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from datetime import datetime
 from http import HTTPStatus
-from binance import Client
+import threading
+import numpy as np
 
 from cryptobot.brokers.broker_interface import BrokerInterface
 from cryptobot.brokers.enums import (
@@ -10,6 +14,21 @@ from cryptobot.brokers.enums import (
     Intervals,
     OperationType,
 )
+from cryptobot.utils.instrumentation import increment, instrument_session, timed, timer
+
+CANDLE_COLUMN_DTYPES = {
+    "open_time": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.float64,
+    "close_time": np.int64,
+    "quote_asset_volume": np.float64,
+    "number_of_trades": np.int64,
+    "taker_buy_base_asset_volume": np.float64,
+    "taker_buy_quote_asset_volume": np.float64,
+}
 
 
 class BinanceClient(BrokerInterface):
@@ -20,14 +39,17 @@ class BinanceClient(BrokerInterface):
     
     Instance Attributes
     ----------
-    client : BinanceClient
-        It's the connection to the Binance API.
+    client : binance.Client
+        It's the connection to the Binance API. It's created on first use, as it pings the API.
         
     Class Attributes
     ----------
     COLUMNS_CANDLE : list
         It's the columns of the CSV file.
 
+    KLINES_PAGE_SIZE : int
+        It's the maximum number of candles that Binance returns in one request.
+
     Instance methods
     -------
     get_account_status()
@@ -61,6 +83,8 @@ class BinanceClient(BrokerInterface):
         "taker_buy_quote_asset_volume",
     ]
 
+    KLINES_PAGE_SIZE = 1000
+
     def __init__(self, api_key, secret_key):
         """
         Parameters
@@ -72,8 +96,28 @@ class BinanceClient(BrokerInterface):
             It's the secret key of the account.
         """
         
-        self.client = Client(api_key, secret_key, testnet=True)
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from binance import Client
+
+                    self._client = Client(self.api_key, self.secret_key, testnet=True)
+                    # The requests and the bytes of the responses are counted.
+                    instrument_session(self._client.session, "binance")
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
     
+    @timed("broker_request", broker="binance", endpoint="account_snapshot")
     def get_account_status(self):
         """
         Returns the status of the account. It includes the balances of the distinct currencies.
@@ -104,6 +148,7 @@ class BinanceClient(BrokerInterface):
             )
         return parse_account_snapshot(res)
     
+    @timed("broker_request", broker="binance", endpoint="klines")
     def get_current_candle(self, symbol: Symbols, interval: Intervals):
         """
         Returns the current candle of the given symbol and interval.
@@ -149,6 +194,7 @@ class BinanceClient(BrokerInterface):
             )
         )
     
+    @timed("broker_request", broker="binance", endpoint="klines")
     def get_last_complete_candle(self, symbol: Symbols, interval: Intervals):
         """
         Returns the last complete candle for the given symbol and interval.
@@ -201,10 +247,13 @@ class BinanceClient(BrokerInterface):
         start_time: datetime = None,
         end_time: datetime = None,
         limit: int = None,
+        workers: int = None,
     ):
         """
-        Returns the last complete candle for the given symbol and interval.
-        It means that the candle is complete, so the close time is before the current time. 
+        Returns the candles for the given symbol and interval between start_time and end_time.
+        If workers is given, the range is split in windows of KLINES_PAGE_SIZE candles
+        that are requested concurrently, otherwise the pages are requested one after another.
+        Both ways return the same candles.
         
         See docstring of :Symbols:`cryptobot.brokers.enums.Symbols` for more info about the symbols.
         See docstring of :Intervals:`cryptobot.brokers.enums.Intervals` for more info about the intervals.
@@ -222,6 +271,12 @@ class BinanceClient(BrokerInterface):
         
         end_time : datetime
             It's the close time of the last candle.
+
+        limit : int
+            It's the maximum number of candles to return.
+
+        workers : int
+            It's the maximum number of concurrent requests. It's only used when start_time is given.
                     
         Returns
         -------
@@ -232,25 +287,122 @@ class BinanceClient(BrokerInterface):
             Example: [[1654686000000, 30382.79, 30504.86, 30340.73, 30419.64,
                         217.160362, 1654689599999, 6608879.303886, 6047, 125.007039, 3804377.38752454]]
         """
+        candles = []
+        for batch in self.iter_candle_batches(
+            symbol, interval, start_time, end_time, limit, workers
+        ):
+            candles.extend(batch)
+
+        return candles
+
+    def iter_candle_batches(
+        self,
+        symbol: Symbols,
+        interval: Intervals,
+        start_time: datetime = None,
+        end_time: datetime = None,
+        limit: int = None,
+        workers: int = None,
+        columns: list = None,
+    ):
+        """
+        Yields the candles of :get_candles:`get_candles` in batches, as soon as each page arrives.
+        So the caller can consume them without holding the whole range in memory.
+
+        The parameters are the same that in :get_candles:`get_candles`, plus:
+
+        columns : list
+            If it's given, each batch is parsed at once into typed columns, and only these
+            columns of COLUMNS_CANDLE are kept. See :parse_candle_columns:`parse_candle_columns`.
+
+        Yields
+        ------
+        list or dict
+            The batch of parsed candles, in the same format that get_candles returns,
+            or a dict of numpy arrays by column if columns is given.
+            The batches are yielded in order, and there are no repeated candles between them.
+        """
         end_time = end_time or datetime.now()
-        
+
         start = round(start_time.timestamp()) * 1000 if start_time else None
-        end = round(min(end_time.timestamp(), datetime.now().timestamp())) * 1000
-        candles = []
+        # The end is floored, so a close time (...:59.999) doesn't reach the next candle.
+        end = int(min(end_time.timestamp(), datetime.now().timestamp()) * 1000)
+        if workers and start is not None:
+            pages = self._iter_klines_concurrently(
+                symbol, interval, start, end, limit, workers
+            )
+        else:
+            pages = self._iter_klines(symbol, interval, start, end, limit)
+
+        for page in pages:
+            if columns:
+                yield parse_candle_columns(page, columns)
+            else:
+                yield [parse_candle(candle) for candle in page]
+
+    def _iter_klines(self, symbol, interval, start, end, limit):
+        """Yields the pages of raw klines between start and end, one after another"""
         while (start is None or start < end) and (limit is None or limit > 0):
-            candles_aux = self.client.get_klines(
-                symbol=symbol.value,
-                interval=interval.value,
-                startTime=start,
-                endTime=end,
-                limit=limit,
+            with timer("broker_request", broker="binance", endpoint="klines"):
+                candles = self.client.get_klines(
+                    symbol=symbol.value,
+                    interval=interval.value,
+                    startTime=start,
+                    endTime=end,
+                    limit=limit,
+                )
+            increment("broker_candles", len(candles), broker="binance", symbol=symbol.value)
+            if candles:
+                yield candles
+            start = candles[-1][6] if candles else end
+            limit = limit - len(candles) if limit else None
+
+    def _iter_klines_concurrently(self, symbol, interval, start, end, limit, workers):
+        """
+        Yields the raw klines between start and end in windows of KLINES_PAGE_SIZE candles.
+        The windows are requested on a pool of workers, with at most two windows per worker
+        in flight, and yielded in order without repeated open times.
+        """
+        step = interval.to_milliseconds()
+        if limit:
+            end = min(end, start + step * limit - 1)
+
+        window = step * self.KLINES_PAGE_SIZE
+        windows = (
+            (window_start, min(window_start + window - 1, end))
+            for window_start in range(start, end, window)
+        )
+
+        def get_window(window):
+            return [
+                candle
+                for page in self._iter_klines(
+                    symbol, interval, window[0], window[1], self.KLINES_PAGE_SIZE
+                )
+                for candle in page
+            ]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque(
+                executor.submit(get_window, w) for w in islice(windows, workers * 2)
             )
-            candles = candles + candles_aux
-            start = candles_aux[-1][6] if candles_aux else end
-            limit = limit - len(candles_aux) if limit else None
-            
-        return [parse_candle(candle) for candle in candles]
+            last_open_time = None
+            remaining = limit
+            while pending:
+                page = pending.popleft().result()
+                for w in islice(windows, 1):
+                    pending.append(executor.submit(get_window, w))
+
+                if last_open_time is not None:
+                    page = [candle for candle in page if candle[0] > last_open_time]
+                if remaining is not None:
+                    page = page[:remaining]
+                    remaining -= len(page)
+                if page:
+                    last_open_time = page[-1][0]
+                    yield page
 
+    @timed("broker_request", broker="binance", endpoint="order")
     def create_buy_order(self, symbol: Symbols, quantity: float):
         """
         Create a buy order for the given symbol and quantity, considering the market price.
@@ -275,6 +427,7 @@ class BinanceClient(BrokerInterface):
             quoteOrderQty=quantity,
         )
         
+    @timed("broker_request", broker="binance", endpoint="order")
     def create_sell_order(self, symbol: Symbols, quantity: float):
         """
         Create a sell order for the given symbol and quantity, considering the market price.
@@ -335,3 +488,39 @@ def parse_candle(candle):
         float(candle[9]),
         float(candle[10])
     ]
+
+
+def parse_candle_columns(candles, columns=None):
+    """
+    Parses a page of candles at once into typed columns, instead of casting value by value.
+    The open and close times and the number of trades are int64 (times in ms since epoch),
+    the rest of columns are float64. The columns that aren't requested are skipped.
+
+    Parameters
+    ----------
+    candles : list
+        The raw candles returned by Binance, or the candles already parsed by parse_candle.
+
+    columns : list
+        The names of the columns to keep, from BinanceClient.COLUMNS_CANDLE. By default, all of them.
+
+    Returns
+    -------
+    dict
+        Contains one numpy array per column.
+    """
+    columns = columns or BinanceClient.COLUMNS_CANDLE
+    if not len(candles):
+        return {
+            column: np.empty(0, dtype=CANDLE_COLUMN_DTYPES[column]) for column in columns
+        }
+
+    # The page is kept as an object matrix, that only references the values, and each column
+    # is cast from it. A matrix of strings is slower than parse_candle and takes more memory.
+    values = np.array(candles, dtype=object)
+    return {
+        column: values[:, BinanceClient.COLUMNS_CANDLE.index(column)].astype(
+            CANDLE_COLUMN_DTYPES[column]
+        )
+        for column in columns
+    }
@@ -1,4 +1,5 @@
 from abc import abstractmethod, ABCMeta
+from datetime import datetime
 
 from cryptobot.brokers.enums import Symbols, Intervals
 
@@ -32,3 +33,35 @@ class BrokerInterface:
     @abstractmethod
     def get_current_candle(self, symbol: str, interval: Intervals) -> dict:
         pass
+    
+    @abstractmethod
+    def get_candles(
+        self,
+        symbol: Symbols,
+        interval: Intervals,
+        start_time: datetime = None,
+        end_time: datetime = None,
+        limit: int = None,
+        workers: int = None,
+    ) -> list:
+        pass
+    
+    @abstractmethod
+    def iter_candle_batches(
+        self,
+        symbol: Symbols,
+        interval: Intervals,
+        start_time: datetime = None,
+        end_time: datetime = None,
+        limit: int = None,
+        workers: int = None,
+        columns: list = None,
+    ):
+        pass
+
+    def now(self) -> datetime:
+        """
+        Returns the time of the broker, that decides which candles are complete.
+        By default, it's the local time. The replay brokers return the time of their clock.
+        """
+        return datetime.now()
@@ -1,5 +1,12 @@
 from enum import Enum
 
+MILLISECONDS_BY_UNIT = {
+    "m": 60 * 1000,
+    "h": 60 * 60 * 1000,
+    "d": 24 * 60 * 60 * 1000,
+    "w": 7 * 24 * 60 * 60 * 1000,
+}
+
 
 class Symbols(Enum):
     BTCUSDT = "BTCUSDT"
@@ -11,6 +18,10 @@ class Intervals(Enum):
     EIGHT_HOURS = "8h"
     ONE_DAY = "1d"
 
+    def to_milliseconds(self):
+        """Returns the duration of one candle of this interval in milliseconds."""
+        return int(self.value[:-1]) * MILLISECONDS_BY_UNIT[self.value[-1]]
+
 
 class OperationType(Enum):
     BUY = "BUY"
@@ -0,0 +1,374 @@
+import json
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from cryptobot.brokers.binance_client import CANDLE_COLUMN_DTYPES, BinanceClient
+from cryptobot.brokers.broker_interface import BrokerInterface
+from cryptobot.brokers.enums import Intervals, OperationType, OrderType, Symbols
+from cryptobot.stores.candle_store import to_candles_frame, to_datetime
+
+QUOTE_ASSET = "USDT"
+
+# The columns that are still unknown while a candle is in progress, and are returned as 0.
+IN_PROGRESS_ZERO_COLUMNS = [
+    "volume",
+    "quote_asset_volume",
+    "number_of_trades",
+    "taker_buy_base_asset_volume",
+    "taker_buy_quote_asset_volume",
+]
+
+
+class ReplayBroker(BrokerInterface):
+    """
+    An offline broker that replays candles from local files, with a clock controlled by the
+    caller, so the decide-and-order loop runs over years of candles without network.
+
+    Only what is known at the time of the clock is returned: the complete candles closed before
+    it, and the candle in progress as it is at its open (every price is the open price and the
+    volumes are 0). The market orders are filled at once at the price of the candle in progress,
+    with the slippage against the order and the fee taken from the received asset, like Binance
+    does.
+
+    Instance Attributes
+    ----------
+    balances : dict
+        It's the free balance of each asset, like {"USDT": 10000.0, "ETH": 0.5}.
+
+    fee : float
+        It's the fee paid on each order, as a fraction of the received asset.
+
+    slippage : float
+        It's the fraction of the price paid over it on buys, and under it on sells.
+
+    orders : list
+        It's the filled orders, in the format that Binance returns them.
+
+    Instance methods
+    -------
+    now()
+        Returns the datetime of the clock, that the candle store, the predictor and the
+        prediction store use instead of the local time.
+
+    set_time(date_time)
+        Moves the clock to date_time.
+
+    advance(delta)
+        Moves the clock forward by a timedelta or by the duration of one candle of an interval.
+
+    get_price(symbol)
+        Returns the market price of the symbol at the time of the clock.
+
+    The rest of methods are the ones of :BrokerInterface:`cryptobot.brokers.broker_interface.BrokerInterface`,
+    with the same results that :BinanceClient:`cryptobot.brokers.binance_client.BinanceClient`.
+    """
+
+    KLINES_PAGE_SIZE = BinanceClient.KLINES_PAGE_SIZE
+
+    # It's the number of candles that Binance returns when neither the start nor the limit are given.
+    KLINES_DEFAULT_LIMIT = 500
+
+    def __init__(
+        self,
+        candles: dict,
+        balances: dict = None,
+        start_time: datetime = None,
+        fee: float = 0.001,
+        slippage: float = 0.0,
+    ):
+        """
+        Parameters
+        ----------
+        candles : dict
+            The candles of each symbol and interval, keyed by (Symbols, Intervals). Each value
+            is the path of a Parquet, CSV or JSON file with the columns of
+            BinanceClient.COLUMNS_CANDLE (a JSON file is the list of raw klines of Binance),
+            a dataframe with these columns, or a list of candles.
+
+        balances : dict
+            It's the initial balance of each asset. By default, 10000 USDT.
+
+        start_time : datetime
+            It's the initial time of the clock. By default, the open time of the first candle.
+        """
+        self.balances = dict(balances or {QUOTE_ASSET: 10000.0})
+        self.fee = fee
+        self.slippage = slippage
+        self.orders = []
+        self._lock = threading.Lock()
+
+        self._candles = {}
+        for key, source in candles.items():
+            values = read_candles(source)[BinanceClient.COLUMNS_CANDLE].to_numpy(np.float64)
+            values = values[np.argsort(values[:, 0], kind="stable")]
+            self._candles[key] = (values[:, 0].astype(np.int64), values)
+
+        if start_time is not None:
+            self.set_time(start_time)
+        else:
+            self._now = min(
+                (int(open_times[0]) for open_times, _ in self._candles.values() if len(open_times)),
+                default=0,
+            )
+
+    def now(self):
+        return to_datetime(self._now)
+
+    def set_time(self, date_time: datetime):
+        self._now = round(date_time.timestamp() * 1000)
+
+    def advance(self, delta):
+        """
+        Moves the clock forward by delta, a timedelta or an interval, that moves it one candle.
+        """
+        if isinstance(delta, Intervals):
+            self._now += delta.to_milliseconds()
+        else:
+            self._now += round(delta / timedelta(milliseconds=1))
+
+    def get_account_status(self):
+        """
+        Returns the balances, like BinanceClient does. The totalAssetOfBtc is NaN if there are
+        no BTCUSDT candles, or an asset with balance can't be valued in USDT.
+        """
+        with self._lock:
+            balances = {asset: free for asset, free in self.balances.items() if free}
+
+        total = sum(free * self._price_in_quote(asset) for asset, free in balances.items())
+        btc_price = self._price_in_quote("BTC")
+        return {
+            "totalAssetOfBtc": float(total / btc_price),
+            "balances": [
+                {"asset": asset, "free": float(free), "locked": 0.0}
+                for asset, free in balances.items()
+            ],
+        }
+
+    def get_current_candle(self, symbol: Symbols, interval: Intervals):
+        """
+        Returns the candle in progress at the time of the clock, as it is at its open.
+        If there's no candle in progress, it's the last complete one.
+        """
+        candles = self._select(symbol, interval, None, self._now, 1)
+        if len(candles):
+            return to_candle(candles[-1])
+        raise Exception(
+            "Replay broker doesn't have any candle for symbol: {} and interval: {} at {}. ".format(
+                symbol.value, interval.value, self.now()
+            )
+        )
+
+    def get_last_complete_candle(self, symbol: Symbols, interval: Intervals):
+        """
+        Returns the last candle closed before the time of the clock.
+        """
+        _, values = self._get(symbol, interval)
+        position = np.searchsorted(values[:, 6], self._now, side="left") - 1
+        if position >= 0:
+            return to_candle(values[position])
+        raise Exception(
+            "Replay broker doesn't have any complete candle for symbol: {} and interval: {} at {}. ".format(
+                symbol.value, interval.value, self.now()
+            )
+        )
+
+    def get_candles(
+        self,
+        symbol: Symbols,
+        interval: Intervals,
+        start_time: datetime = None,
+        end_time: datetime = None,
+        limit: int = None,
+        workers: int = None,
+    ):
+        """
+        Returns the candles that open between start_time and end_time, up to the clock.
+        See :get_candles:`cryptobot.brokers.binance_client.BinanceClient.get_candles`.
+        The workers are ignored, as there are no requests.
+        """
+        candles = []
+        for batch in self.iter_candle_batches(symbol, interval, start_time, end_time, limit):
+            candles.extend(batch)
+        return candles
+
+    def iter_candle_batches(
+        self,
+        symbol: Symbols,
+        interval: Intervals,
+        start_time: datetime = None,
+        end_time: datetime = None,
+        limit: int = None,
+        workers: int = None,
+        columns: list = None,
+    ):
+        """
+        Yields the candles of get_candles in batches of KLINES_PAGE_SIZE candles.
+        See :iter_candle_batches:`cryptobot.brokers.binance_client.BinanceClient.iter_candle_batches`.
+        """
+        start = round(start_time.timestamp()) * 1000 if start_time else None
+        # The end is floored, so a close time (...:59.999) doesn't reach the candle in progress.
+        end = int(end_time.timestamp() * 1000) if end_time else self._now
+        candles = self._select(symbol, interval, start, end, limit)
+
+        for i in range(0, len(candles), self.KLINES_PAGE_SIZE):
+            page = candles[i : i + self.KLINES_PAGE_SIZE]
+            if columns:
+                yield {
+                    column: page[:, BinanceClient.COLUMNS_CANDLE.index(column)].astype(
+                        CANDLE_COLUMN_DTYPES[column]
+                    )
+                    for column in columns
+                }
+            else:
+                yield [to_candle(candle) for candle in page]
+
+    def get_price(self, symbol: Symbols):
+        """
+        Returns the open price of the candle in progress of the symbol, with its shortest
+        interval, or the close price of the last candle if there's none in progress.
+        """
+        intervals = [interval for s, interval in self._candles if s == symbol]
+        if not intervals:
+            raise Exception(f"Replay broker doesn't have candles for symbol: {symbol.value}")
+        interval = min(intervals, key=lambda interval: interval.to_milliseconds())
+        return self.get_current_candle(symbol, interval)[4]
+
+    def create_buy_order(self, symbol: Symbols, quantity: float):
+        """
+        Buys the base asset of the symbol spending quantity of the quote asset (USDT).
+        """
+        base, quote = split_symbol(symbol)
+        price = self.get_price(symbol) * (1 + self.slippage)
+        executed = quantity / price
+        commission = executed * self.fee
+        with self._lock:
+            self._withdraw(quote, quantity)
+            self.balances[base] = self.balances.get(base, 0.0) + executed - commission
+        return self._fill(symbol, OperationType.BUY, price, executed, quantity, commission, base)
+
+    def create_sell_order(self, symbol: Symbols, quantity: float):
+        """
+        Sells quantity of the base asset of the symbol for the quote asset (USDT).
+        """
+        base, quote = split_symbol(symbol)
+        price = self.get_price(symbol) * (1 - self.slippage)
+        received = quantity * price
+        commission = received * self.fee
+        with self._lock:
+            self._withdraw(base, quantity)
+            self.balances[quote] = self.balances.get(quote, 0.0) + received - commission
+        return self._fill(symbol, OperationType.SELL, price, quantity, received, commission, quote)
+
+    def _get(self, symbol: Symbols, interval: Intervals):
+        try:
+            return self._candles[(symbol, interval)]
+        except KeyError:
+            raise Exception(
+                "Replay broker doesn't have candles for symbol: {} and interval: {}. ".format(
+                    symbol.value, interval.value
+                )
+            )
+
+    def _select(self, symbol, interval, start, end, limit):
+        """
+        Returns the candles that open between start and end, and not after the clock, like the
+        klines endpoint: without start, the last limit candles. The candle in progress is
+        returned as it is at its open.
+        """
+        open_times, values = self._get(symbol, interval)
+        stop = np.searchsorted(open_times, min(end, self._now), side="right")
+        if start is None:
+            first = max(stop - (limit or self.KLINES_DEFAULT_LIMIT), 0)
+        else:
+            first = np.searchsorted(open_times, start, side="left")
+            stop = max(min(stop, first + limit), first) if limit else max(stop, first)
+
+        candles = values[first:stop]
+        if len(candles) and candles[-1, 6] >= self._now:
+            candles = candles.copy()
+            candles[-1] = to_candle_in_progress(candles[-1])
+        return candles
+
+    def _withdraw(self, asset: str, quantity: float):
+        if quantity <= 0:
+            raise Exception(f"The quantity of the order must be positive, it's {quantity}")
+        if self.balances.get(asset, 0.0) < quantity:
+            raise Exception(
+                f"Insufficient balance of {asset}: {self.balances.get(asset, 0.0)} < {quantity}"
+            )
+        self.balances[asset] -= quantity
+
+    def _fill(self, symbol, side, price, quantity, quote_quantity, commission, commission_asset):
+        with self._lock:
+            order = {
+                "symbol": symbol.value,
+                "orderId": len(self.orders) + 1,
+                "transactTime": self._now,
+                "executedQty": quantity,
+                "cummulativeQuoteQty": quote_quantity,
+                "status": "FILLED",
+                "type": OrderType.MARKET.value,
+                "side": side.value,
+                "fills": [
+                    {
+                        "price": price,
+                        "qty": quantity,
+                        "commission": commission,
+                        "commissionAsset": commission_asset,
+                    }
+                ],
+            }
+            self.orders.append(order)
+        return order
+
+    def _price_in_quote(self, asset: str):
+        if asset == QUOTE_ASSET:
+            return 1.0
+        try:
+            return self.get_price(Symbols(asset + QUOTE_ASSET))
+        except Exception:
+            return float("nan")
+
+
+def read_candles(source):
+    """
+    Returns the candles of a Parquet, CSV or JSON file, a dataframe or a list as a dataframe.
+    The lists, and the JSON files, can have raw klines of Binance or parsed candles.
+    """
+    if isinstance(source, pd.DataFrame):
+        return source
+    if isinstance(source, str) and source.endswith(".parquet"):
+        return pd.read_parquet(source)
+    if isinstance(source, str) and source.endswith(".csv"):
+        return pd.read_csv(source)
+    if isinstance(source, str):
+        with open(source) as f:
+            source = json.load(f)
+    return to_candles_frame([candle[: len(BinanceClient.COLUMNS_CANDLE)] for candle in source])
+
+
+def to_candle(values):
+    """Converts a row of candle values to the list of a parsed candle, see parse_candle"""
+    candle = values.tolist()
+    for index in [0, 6, 8]:
+        candle[index] = int(candle[index])
+    return candle
+
+
+def to_candle_in_progress(values):
+    """Returns the candle as it is at its open: every price is the open, and no volume"""
+    values = values.copy()
+    values[1:5] = values[1]
+    for column in IN_PROGRESS_ZERO_COLUMNS:
+        values[BinanceClient.COLUMNS_CANDLE.index(column)] = 0
+    return values
+
+
+def split_symbol(symbol: Symbols):
+    """Returns the base and quote assets of the symbol, like ("ETH", "USDT") for ETHUSDT"""
+    if not symbol.value.endswith(QUOTE_ASSET):
+        raise Exception(f"The replay broker only trades {QUOTE_ASSET} pairs, not {symbol.value}")
+    return symbol.value[: -len(QUOTE_ASSET)], QUOTE_ASSET
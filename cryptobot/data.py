@@ -2,29 +2,105 @@ import logging
 import os
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
-from cryptobot.brokers.binance_client import BinanceClient
+from cryptobot import load_environment
+from cryptobot.brokers.binance_client import BinanceClient, parse_candle_columns
+from cryptobot.brokers.broker_interface import BrokerInterface
 from cryptobot.brokers.enums import Intervals, Symbols
 from cryptobot.readers.fear_greed_index_reader import FearGreedIndexReader
 from cryptobot.readers.yahoo_market_reader import YahooMarketReader
+from cryptobot.stores.candle_store import CandleStore
+from cryptobot.utils.daily_data_helper import align_daily_data, attach_daily_data
+from cryptobot.utils.instrumentation import increment, log_metrics, timer
+from cryptobot.utils.memory_helper import compact_frame, log_memory_usage
 
-binance_client = BinanceClient(os.getenv("API_KEY"), os.getenv("API_SECRET"))
+candle_store = CandleStore(workers=4)
 
-BUCKET = f"gs://{os.getenv('GOOGLE_CLOUD_STORAGE_BUCKET')}/raw_data"
+MILLISECONDS_IN_A_MINUTE = 60 * 1000
+MILLISECONDS_IN_A_DAY = 24 * 60 * MILLISECONDS_IN_A_MINUTE
 
+UNUSED_CANDLE_COLUMNS = [
+    "quote_asset_volume",
+    "number_of_trades",
+    "taker_buy_base_asset_volume",
+    "taker_buy_quote_asset_volume",
+]
 
-def get_data(symbol: Symbols, interval: str, start_time: datetime, end_time: datetime):
+_binance_client = None
+
+
+def get_binance_client():
+    """
+    Returns the BinanceClient shared by the module, created on first use with the
+    API_KEY and API_SECRET environment variables.
+    """
+    global _binance_client
+    if _binance_client is None:
+        _binance_client = BinanceClient(os.getenv("API_KEY"), os.getenv("API_SECRET"))
+    return _binance_client
+
+
+def get_bucket():
+    return f"gs://{os.getenv('GOOGLE_CLOUD_STORAGE_BUCKET')}/raw_data"
+
+
+def __getattr__(name):
+    # binance_client and BUCKET are resolved on first access, so importing the module
+    # doesn't read the environment before load_environment.
+    if name == "binance_client":
+        return get_binance_client()
+    if name == "BUCKET":
+        return get_bucket()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_data(
+    symbol: Symbols,
+    interval: str,
+    start_time: datetime,
+    end_time: datetime,
+    compact: bool = False,
+    daily_data=None,
+):
+    """
+    Returns the candles with the daily data.
+    In compact mode, the numeric columns are float32, FG_val_clasif is categorical, and the
+    open and close times are kept as ms since epoch, without the close_time_min and
+    close_time_day keys.
+
+    The daily data, built by get_daily_data, can be given to share it between several calls.
+    It has to cover the range, otherwise the missing days are NaN.
+    """
     logging.info(
         f"Start getting data for symbol: {symbol.value}, candle duration: {interval.value}, start_time: {start_time}, end_time: {end_time}"
     )
-    df = get_candles_from_binance(symbol, interval, start_time, end_time)
-    df_aux = FearGreedIndexReader(start_time).get_data()  # TODO use singleton
-    df = df.merge(df_aux, on="close_time_day", how="left")
-    df_aux = get_binance_dominance_data()
-    df = df.merge(df_aux, on="close_time_day", how="left")
-    df_aux = YahooMarketReader(start_time, end_time).get_data()
-    df = df.merge(df_aux, on="close_time_day", how="left")
-    return df
+    with timer("get_data", stage="candles"):
+        df = get_candles_from_binance(
+            symbol, interval, start_time, end_time, compact=compact
+        )
+    if daily_data is None:
+        with timer("get_data", stage="daily_data"):
+            daily_data = get_daily_data(start_time, end_time)
+    with timer("get_data", stage="attach_daily_data"):
+        if compact:
+            daily_data = compact_frame(daily_data.copy())
+        df = attach_daily_data(df, daily_data)
+    return log_memory_usage(df, "get_data")
+
+
+def get_daily_data(start_time: datetime, end_time: datetime):
+    """
+    Returns the Fear and Greed index, the BTC dominance and the Yahoo data aligned by day number.
+    See :func:`cryptobot.utils.daily_data_helper.align_daily_data`.
+    """
+    with timer("daily_data", source="fear_greed_index"):
+        fear_greed_index = FearGreedIndexReader(start_time).get_data()
+    with timer("daily_data", source="btc_dominance"):
+        btc_dominance = get_binance_dominance_data()
+    with timer("daily_data", source="yahoo"):
+        yahoo = YahooMarketReader(start_time, end_time).get_data()
+    return align_daily_data(fear_greed_index, btc_dominance, yahoo)
 
 
 def interpolate_data(df):
@@ -34,7 +110,7 @@ def interpolate_data(df):
         "close_time_min",
         "close_time_day",
     ]
-    aux_df = df.drop(columns=not_fillna)
+    aux_df = df.drop(columns=not_fillna, errors="ignore").select_dtypes("number")
     aux_df.interpolate(method="linear", limit_direction="forward", axis=0, inplace=True)
     df[list(aux_df.columns)] = aux_df
     return df
@@ -42,16 +118,16 @@ def interpolate_data(df):
 
 def clean_data(df):
     df = interpolate_data(df)
-    df["FG_val_clasif"] = df["FG_val_clasif"].fillna(method="ffill")
+    df["FG_val_clasif"] = df["FG_val_clasif"].ffill()
     # df["FG_value"] = df["FG_value"].fillna(method="ffill")
     columns_to_drop = ["open_time", "close_time", "close_time_min", "close_time_day"]
-    df.drop(columns=columns_to_drop, inplace=True)
+    df.drop(columns=columns_to_drop, inplace=True, errors="ignore")
     df = df[200:]
     return df
 
 
 def add_target(df):
-    df["target"] = (df.close - df.open).apply(lambda x: 0 if x < 0 else 1)
+    df["target"] = np.where(df.close - df.open < 0, 0, 1)
     return df
 
 
@@ -61,43 +137,82 @@ def get_candles_from_binance(
     start_time: datetime,
     end_time: datetime,
     limit: int = None,
+    use_store: bool = True,
+    compact: bool = False,
+    broker: BrokerInterface = None,
 ):
+    """
+    Returns the parsed candles of the given range.
+    By default, the candles are read from the local candle store and only the missing ones
+    are requested to the Binance API. See :CandleStore:`cryptobot.stores.candle_store.CandleStore`.
+    In compact mode, see :func:`parse_candles_data`.
+
+    The broker, like a ReplayBroker, replaces the shared Binance client, and its clock decides
+    which candles are complete.
+    """
+    broker = broker or get_binance_client()
+    if use_store:
+        logging.info(f"Getting data from candle store at {candle_store.root}")
+        df = candle_store.get_candles(broker, symbol, interval, start_time, end_time, limit)
+        return parse_candles_data(df, compact)
+
     logging.info(f"Getting data from Binance API")
 
-    df = pd.DataFrame(
-        binance_client.get_candles(symbol, interval, start_time, end_time, limit),
-        columns=BinanceClient.COLUMNS_CANDLE,
+    columns = [c for c in BinanceClient.COLUMNS_CANDLE if c not in UNUSED_CANDLE_COLUMNS]
+    df = pd.concat(
+        [
+            pd.DataFrame(batch)
+            for batch in broker.iter_candle_batches(
+                symbol, interval, start_time, end_time, limit, columns=columns
+            )
+        ]
+        or [pd.DataFrame(parse_candle_columns([], columns))],
+        ignore_index=True,
     )
 
-    return parse_candles_data(df)
-
-
-def parse_candles_data(df):
-
-    df["open_time"] = df["open_time"].apply(
-        lambda x: datetime.utcfromtimestamp(x / 1e3)
+    return parse_candles_data(df, compact)
+
+
+def parse_candles_data(df, compact: bool = False):
+    """
+    Converts the open and close times (ms since epoch) to datetimes, adds the close minute and
+    close day keys, and removes the unused columns. Every column is computed at once, and the
+    keys are formatted only once per distinct minute or day.
+
+    In compact mode, the times are kept as int64 ms since epoch, without the keys, and the
+    prices and volumes are cast to float32.
+    """
+    df = df.drop(columns=UNUSED_CANDLE_COLUMNS, errors="ignore")
+    if compact:
+        df["open_time"] = df["open_time"].astype(np.int64)
+        df["close_time"] = df["close_time"].astype(np.int64)
+        return compact_frame(df)
+
+    close_time = df["close_time"].to_numpy(dtype=np.int64)
+    df["open_time"] = pd.to_datetime(df["open_time"].to_numpy(dtype=np.int64), unit="ms")
+    df["close_time"] = pd.to_datetime(close_time, unit="ms")
+    df["close_time_min"] = format_timestamps(
+        close_time, MILLISECONDS_IN_A_MINUTE, "%Y-%m-%d-%H-%M"
     )
-    df["close_time"] = df["close_time"].apply(
-        lambda x: datetime.utcfromtimestamp(x / 1e3)
-    )
-    df["close_time_min"] = df["close_time"].apply(
-        lambda x: x.strftime("%Y-%m-%d-%H-%M")
-    )
-    df["close_time_day"] = df["close_time"].apply(lambda x: x.strftime("%Y-%m-%d"))
-    df = df.drop(
-        columns=[
-            "quote_asset_volume",
-            "number_of_trades",
-            "taker_buy_base_asset_volume",
-            "taker_buy_quote_asset_volume",
-        ]
+    df["close_time_day"] = format_timestamps(
+        close_time, MILLISECONDS_IN_A_DAY, "%Y-%m-%d"
     )
     return df
 
 
+def format_timestamps(timestamps, unit, date_format):
+    """
+    Formats timestamps in ms, truncated to the given unit in ms, with the given date format.
+    """
+    keys, inverse = np.unique(timestamps // unit, return_inverse=True)
+    labels = pd.to_datetime(keys * unit, unit="ms").strftime(date_format)
+    return np.asarray(labels, dtype=object)[inverse]
+
+
 def get_binance_dominance_data():
-    logging.info(f"Getting data about Binance Dominance from {BUCKET}")
-    path = f"{BUCKET}/BTC Dominance - Trading View - 1day.csv"
+    bucket = get_bucket()
+    logging.info(f"Getting data about Binance Dominance from {bucket}")
+    path = f"{bucket}/BTC Dominance - Trading View - 1day.csv"
     df = read_data_from_gs(path)
     df["time"] = df["time"].apply(lambda x: datetime.utcfromtimestamp(int(x)))
     df["close_time_day"] = df["time"].apply(lambda x: x.strftime("%Y-%m-%d"))
@@ -110,13 +225,18 @@ def get_binance_dominance_data():
 
 
 def read_data_from_gs(path):
-    df = pd.read_csv(path)
+    increment("reader_requests", source="btc_dominance")
+    with timer("reader_request", source="btc_dominance"):
+        df = pd.read_csv(path)
     return df
 
 
 if __name__ == "__main__":
+    load_environment()
+
     symbol = Symbols.ETHUSDT
     interval = Intervals.ONE_HOUR
     start_time = datetime(2018, 2, 1)
     end_time = datetime(2022, 5, 31)
     get_data(symbol, interval, start_time, end_time)
+    log_metrics()
@@ -0,0 +1,211 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from itertools import product
+
+from cryptobot.brokers.enums import Intervals, Symbols
+
+"""
+Trains one model for each combination of symbols and intervals on a pool of processes.
+
+Each process runs one Trainer at a time, with its TensorFlow and BLAS threads limited, so the
+jobs don't oversubscribe the cores. The daily data (Fear and Greed, BTC dominance, Yahoo) is
+fetched once and handed to every job. At the end, a JSON summary with the timing and the
+version of every model is written.
+
+Usage:
+    python -m cryptobot.fleet --start 2018-02-01 --end 2022-05-31 --workers 4
+"""
+
+THREAD_ENVIRONMENT_VARIABLES = [
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "TF_NUM_INTRAOP_THREADS",
+]
+
+
+def limit_threads(threads: int):
+    """
+    Limits the threads of the BLAS libraries and TensorFlow of the current process.
+    It has to run before they are imported, so it's the initializer of the pool processes.
+    """
+    from cryptobot import load_environment
+
+    load_environment()
+    for variable in THREAD_ENVIRONMENT_VARIABLES:
+        os.environ[variable] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+
+
+def train_job(
+    symbol: Symbols,
+    interval: Intervals,
+    start_time: datetime,
+    end_time: datetime,
+    daily_data=None,
+    threads: int = None,
+    **kwargs,
+):
+    """
+    Trains and saves the model of the symbol and interval.
+
+    Returns
+    -------
+    dict
+        Contains the symbol, interval, version and seconds of each stage of the job.
+    """
+    from cryptobot.trainer import Trainer
+
+    if threads:
+        import tensorflow as tf
+
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    timings = {}
+    trainer = Trainer(
+        symbol, interval, start_time, end_time, daily_data=daily_data, **kwargs
+    )
+    for stage in ["preprocess_data", "split_data", "set_model", "train_model", "save_model"]:
+        start = time.perf_counter()
+        result = getattr(trainer, stage)()
+        timings[stage] = round(time.perf_counter() - start, 3)
+
+    return {
+        "symbol": symbol.value,
+        "interval": interval.value,
+        "version": result,
+        "seconds": timings,
+    }
+
+
+def train_fleet(
+    start_time: datetime,
+    end_time: datetime,
+    symbols=tuple(Symbols),
+    intervals=tuple(Intervals),
+    workers: int = None,
+    threads_per_job: int = None,
+    summary_path: str = "fleet_summary.json",
+    train_function=train_job,
+    daily_data=None,
+    **kwargs,
+):
+    """
+    Trains every combination of symbols and intervals on a pool of workers processes, and
+    writes the summary to summary_path. A failed job doesn't stop the others, its error is
+    kept in the summary.
+
+    Parameters
+    ----------
+    workers : int
+        It's the number of processes. By default, one per job up to the number of CPUs.
+
+    threads_per_job : int
+        It's the number of threads of each process. By default, the CPUs split between the
+        workers.
+
+    daily_data : pd.DataFrame
+        It's the daily data shared by the jobs. By default, it's fetched once for the range.
+
+    Returns
+    -------
+    dict
+        The summary, with the total seconds and one result per job.
+    """
+    jobs = list(product(symbols, intervals))
+    cpus = os.cpu_count() or 1
+    workers = workers or min(len(jobs), cpus)
+    threads_per_job = threads_per_job or max(cpus // workers, 1)
+
+    start = time.perf_counter()
+    if daily_data is None:
+        from cryptobot.data import get_daily_data
+
+        daily_data = get_daily_data(start_time, end_time)
+
+    logging.info(
+        f"Training {len(jobs)} models on {workers} processes with {threads_per_job} threads each"
+    )
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=limit_threads,
+        initargs=(threads_per_job,),
+    ) as executor:
+        futures = {
+            executor.submit(
+                train_function,
+                symbol,
+                interval,
+                start_time,
+                end_time,
+                daily_data,
+                threads_per_job,
+                **kwargs,
+            ): (symbol, interval)
+            for symbol, interval in jobs
+        }
+        for future in as_completed(futures):
+            symbol, interval = futures[future]
+            try:
+                result = {**future.result(), "status": "ok"}
+            except Exception:
+                logging.exception(f"Training of {symbol.value} {interval.value} failed")
+                result = {
+                    "symbol": symbol.value,
+                    "interval": interval.value,
+                    "status": "failed",
+                    "error": traceback.format_exc(),
+                }
+            logging.info(f"Finished {symbol.value} {interval.value}: {result['status']}")
+            results.append(result)
+
+    summary = {
+        "start_time": start_time.isoformat(),
+        "end_time": end_time.isoformat(),
+        "workers": workers,
+        "threads_per_job": threads_per_job,
+        "seconds": round(time.perf_counter() - start, 3),
+        "jobs": sorted(results, key=lambda r: (r["symbol"], r["interval"])),
+    }
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+    logging.info(f"Fleet summary saved to {summary_path}")
+    return summary
+
+
+if __name__ == "__main__":
+    from cryptobot import load_environment
+
+    load_environment()
+
+    parser = argparse.ArgumentParser(description="Trains the models of every symbol and interval")
+    parser.add_argument("--start", default="2018-02-01", help="YYYY-MM-DD")
+    parser.add_argument("--end", default=datetime.now().strftime("%Y-%m-%d"), help="YYYY-MM-DD")
+    parser.add_argument("--symbols", nargs="+", default=[s.value for s in Symbols])
+    parser.add_argument("--intervals", nargs="+", default=[i.value for i in Intervals])
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--threads-per-job", type=int)
+    parser.add_argument("--summary", default="fleet_summary.json")
+    parser.add_argument("--compact", action="store_true")
+    args = parser.parse_args()
+
+    train_fleet(
+        datetime.strptime(args.start, "%Y-%m-%d"),
+        datetime.strptime(args.end, "%Y-%m-%d"),
+        [Symbols(s) for s in args.symbols],
+        [Intervals(i) for i in args.intervals],
+        args.workers,
+        args.threads_per_job,
+        args.summary,
+        compact=args.compact,
+    )
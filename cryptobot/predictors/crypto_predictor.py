@@ -1,77 +1,272 @@
 from datetime import datetime, timedelta
+from functools import partial
 import os
 
+import numpy as np
 import pandas as pd
-from cryptobot.brokers.binance_client import BinanceClient
+from numpy.lib.stride_tricks import sliding_window_view
+from cryptobot.brokers.broker_interface import BrokerInterface
 from cryptobot.brokers.enums import Intervals, Symbols
 from cryptobot.data import (
     add_target,
     clean_data,
-    get_binance_dominance_data,
     get_candles_from_binance,
+    get_daily_data,
 )
-from cryptobot.readers.fear_greed_index_reader import FearGreedIndexReader
-from cryptobot.readers.yahoo_market_reader import YahooMarketReader
+from cryptobot.predictors.model_registry import ModelRegistry, load_model_and_pipeline
+from cryptobot.stores.candle_store import to_datetime
+from cryptobot.stores.prediction_store import PredictionStore
+from cryptobot.utils.daily_data_helper import attach_daily_data
 from cryptobot.utils.feature_engineering import add_metrics
-from cryptobot.utils.model_name_helper import generate_latest_model_path
-from cryptobot.utils.pipeline_helper import create_pipeline
-from tensorflow.keras.preprocessing.sequence import pad_sequences
-from tensorflow.keras.models import load_model
+from cryptobot.utils.instrumentation import increment, log_metrics, timed, timer
+from cryptobot.utils.pipeline_helper import create_pipeline, transform_with_pipeline
 
 
 class CryptoPredictor:
 
     trained_models = [Symbols.ETHUSDT]
 
-    limit_by_interval = {Intervals.ONE_HOUR: 168 + 200}
+    WINDOW = 168
 
-    def __init__(self):
+    limit_by_interval = {Intervals.ONE_HOUR: WINDOW + 200}
 
-        self.models = {}
-        self.preprocessors = {}
+    # The broker of the candles. Without broker, it's the shared Binance client.
+    broker = None
 
-        for symbol in self.trained_models:
-            self.models[symbol] = load_model(generate_latest_model_path(symbol))
+    def __init__(
+        self,
+        prediction_store: PredictionStore = None,
+        model_registry: ModelRegistry = None,
+        backend: str = None,
+        broker: BrokerInterface = None,
+        daily_data=None,
+    ):
+        """
+        The models are loaded by the model registry on first use of each symbol and interval,
+        with the given inference backend: keras, function, tflite or tflite-quantized.
+        By default, it's the value of the INFERENCE_BACKEND environment variable, or keras.
+        See :mod:`cryptobot.predictors.inference_backends`.
 
-        one_year_ago = datetime.now() - timedelta(days=365)
-        self.binance_client = BinanceClient(
-            os.getenv("API_KEY"), os.getenv("API_SECRET")
+        The candles are requested to the broker, and its clock is the time of the predictor
+        and of its prediction store, so a ReplayBroker runs the predictions over past candles.
+        The daily data, built by get_daily_data, is by default the one of the last year.
+        """
+        self.backend = backend or os.getenv("INFERENCE_BACKEND", "keras")
+        self.model_registry = model_registry or ModelRegistry(
+            loader=partial(load_model_and_pipeline, backend=self.backend)
         )
-        self.dominance_data = get_binance_dominance_data()
-        self.yahoo_data = YahooMarketReader(one_year_ago, datetime.now()).get_data()
-        self.fear_greed_data = FearGreedIndexReader(one_year_ago).get_data()
 
-    def predict(self, symbol: Symbols, start_time: datetime, interval: Intervals):
-        data = self.prepare_X(symbol, start_time, interval)
-        return self.models[symbol].predict(data)
+        self.broker = broker
+        if daily_data is None:
+            daily_data = get_daily_data(self.now() - timedelta(days=365), self.now())
+        self.daily_data = daily_data
+        self.prediction_store = prediction_store or PredictionStore(clock=self.now)
 
-    def prepare_X(self, symbol: Symbols, date_time: datetime, interval: Intervals):
+    def now(self):
+        """
+        Returns the time of the broker, or the local time if there's no broker.
+        """
+        return self.broker.now() if self.broker is not None else datetime.now()
 
-        df = get_candles_from_binance(
-            symbol, interval, None, date_time, self.limit_by_interval[interval]
-        )
-        df = df.merge(self.fear_greed_data, on="close_time_day", how="left")
-        df = df.merge(self.dominance_data, on="close_time_day", how="left")
-        df = df.merge(self.yahoo_data, on="close_time_day", how="left")
-
-        df = add_metrics(df)
-        df = clean_data(df)
-        df = add_target(df)
-
-        pipeline = create_pipeline(df)
-        df = pd.DataFrame(
-            pipeline.fit_transform(df),
-            columns=pipeline.get_feature_names_out(),
+    @timed("predict")
+    def predict(
+        self,
+        symbol: Symbols,
+        start_time: datetime,
+        interval: Intervals,
+        predict_function=None,
+    ):
+        """
+        Returns the prediction of the next candle, with the candles closed at start_time.
+        The predictions are cached by model version and last closed candle, so the requests
+        until the next candle closes don't fetch the candles nor call the model again.
+
+        Parameters
+        ----------
+        predict_function : callable
+            It receives the prepared windows and returns their predictions.
+            By default, the model of the symbol predicts them.
+        """
+        open_time = self.last_closed_open_time(start_time, interval)
+        version = self.model_version(symbol, interval)
+        prediction = self.prediction_store.get(symbol, interval, version, open_time)
+        increment("prediction_cache", result="miss" if prediction is None else "hit")
+        if prediction is None:
+            close_time = to_datetime(open_time + interval.to_milliseconds() - 1)
+            data = self.prepare_X(symbol, close_time, interval)
+            predict_function = predict_function or (
+                lambda X: self.predict_windows(symbol, X, interval=interval)
+            )
+            prediction = float(np.asarray(predict_function(data)).reshape(-1)[0])
+            self.prediction_store.set(symbol, interval, version, open_time, prediction)
+        return np.array([[prediction]], dtype=np.float32)
+
+    def get_model(self, symbol: Symbols, interval: Intervals):
+        """
+        Returns the dict with the latest model of the symbol and interval, and its preprocessor.
+        """
+        if symbol not in self.trained_models:
+            raise ValueError(f"There's no model for {symbol.value}")
+        return self.model_registry.get(symbol, interval)
+
+    def model_version(self, symbol: Symbols, interval: Intervals):
+        """
+        Returns the version of the model of the symbol, saved with its pipeline.
+        """
+        preprocessor = self.get_model(symbol, interval)["preprocessor"]
+        return (preprocessor or {}).get("version") or "unknown"
+
+    def last_closed_open_time(self, date_time: datetime, interval: Intervals):
+        """
+        Returns the open time, in ms, of the last candle closed at date_time, or now if it's later.
+        """
+        step = interval.to_milliseconds()
+        timestamp = round(min(date_time, self.now()).timestamp() * 1000)
+        return (timestamp // step - 1) * step
+
+    def predict_range(
+        self,
+        symbol: Symbols,
+        interval: Intervals,
+        start_time: datetime,
+        end_time: datetime,
+        batch_size: int = 1024,
+    ):
+        """
+        Returns the predictions for every candle that opens between start_time and end_time.
+        The candles covering the whole range are fetched once, the features are computed once,
+        and the windows of every prediction are strided views over the same array, that are
+        sent to the model in batches of batch_size.
+
+        As the metrics are computed over the whole range, instead of over the window of each
+        prediction, the long EMAs may differ slightly from the ones used by predict.
+
+        Returns
+        -------
+        pd.DataFrame
+            Contains the open_time of each candle and its predictions.
+        """
+        open_time, windows = self.prepare_range(symbol, interval, start_time, end_time)
+        return pd.DataFrame(
+            {
+                "open_time": open_time,
+                "predictions": self.predict_windows(
+                    symbol, windows, batch_size, interval
+                ),
+            }
         )
 
-        return pad_sequences([df], dtype="float32", value=-999, maxlen=168)
+    def prepare_range(
+        self,
+        symbol: Symbols,
+        interval: Intervals,
+        start_time: datetime,
+        end_time: datetime,
+    ):
+        """
+        Returns the open_time of every candle between start_time and end_time, and the windows
+        to predict them, as a strided view of shape (candles, WINDOW, features).
+        """
+        limit = self.limit_by_interval[interval]
+        warm_up = timedelta(milliseconds=interval.to_milliseconds() * (limit - 1))
+        with timer("predictor_stage", stage="candles"):
+            df = get_candles_from_binance(
+                symbol, interval, start_time - warm_up, end_time, broker=self.broker
+            )
+        open_time = df["open_time"].iloc[limit - self.WINDOW :].reset_index(drop=True)
+
+        X = self.transform(symbol, self.add_features(df), interval).astype(np.float32)
+        if len(X) < self.WINDOW:
+            return open_time.iloc[0:0].values, np.empty((0, self.WINDOW, X.shape[1]), np.float32)
+
+        windows = sliding_window_view(X, self.WINDOW, axis=0).transpose(0, 2, 1)
+        return open_time.iloc[self.WINDOW - 1 :].values, windows
+
+    def predict_windows(
+        self,
+        symbol: Symbols,
+        windows,
+        batch_size: int = 1024,
+        interval: Intervals = Intervals.ONE_HOUR,
+    ):
+        """
+        Returns the predictions of the model of the symbol for windows already prepared,
+        like the ones of prepare_X or prepare_range, as a 1D array.
+        The windows are sent to the model in batches of batch_size.
+        """
+        model = self.get_model(symbol, interval)["model"]
+        increment("predicted_windows", len(windows), symbol=symbol.value)
+        with timer("predictor_stage", stage="model_predict"):
+            return np.concatenate(
+                [
+                    model.predict(np.ascontiguousarray(windows[i : i + batch_size]))
+                    for i in range(0, len(windows), batch_size)
+                ]
+                or [np.empty(0, np.float32)]
+            )
+
+    @timed("prepare_X")
+    def prepare_X(self, symbol: Symbols, date_time: datetime, interval: Intervals):
+        with timer("predictor_stage", stage="candles"):
+            df = get_candles_from_binance(
+                symbol,
+                interval,
+                None,
+                date_time,
+                self.limit_by_interval[interval],
+                broker=self.broker,
+            )
+
+        return pad_window(self.transform(symbol, self.add_features(df), interval), self.WINDOW)
+
+    def add_features(self, df):
+        """
+        Adds the exogenous data, the metrics and the target to the candles, and removes
+        the first candles, that are only needed to compute the metrics.
+        """
+        with timer("predictor_stage", stage="attach_daily_data"):
+            df = attach_daily_data(df, self.daily_data)
+        with timer("predictor_stage", stage="add_metrics"):
+            df = add_metrics(df)
+        with timer("predictor_stage", stage="clean_data"):
+            df = clean_data(df)
+            df = add_target(df)
+        return df
+
+    def transform(
+        self, symbol: Symbols, df, interval: Intervals = Intervals.ONE_HOUR
+    ):
+        """
+        Scales and encodes the features with the pipeline fitted at training time.
+        Models saved without their pipeline fall back to fitting a new one on df.
+        """
+        preprocessor = self.get_model(symbol, interval)["preprocessor"]
+        if preprocessor:
+            with timer("predictor_stage", stage="pipeline_transform"):
+                return transform_with_pipeline(preprocessor, df)
+
+        with timer("predictor_stage", stage="pipeline_fit"):
+            pipeline = create_pipeline(df)
+            return pipeline.fit_transform(df)
+
+
+def pad_window(X, window: int, value: float = -999):
+    """
+    Returns the last window rows of X as a batch of one float32 window, padded at the start
+    with value if X has fewer rows, like keras pad_sequences does.
+    """
+    padded = np.full((1, window, X.shape[1]), value, dtype=np.float32)
+    X = np.asarray(X, dtype=np.float32)[-window:]
+    if len(X):
+        padded[0, window - len(X) :] = X
+    return padded
 
 
 if __name__ == "__main__":
-    from dotenv import load_dotenv, find_dotenv
+    from cryptobot import load_environment
 
-    # Uncomment next line in case that you create and execute any main function inside this folder.
-    load_dotenv(find_dotenv())
+    load_environment()
 
     res = CryptoPredictor().predict(Symbols.ETHUSDT, datetime.now(), Intervals.ONE_HOUR)
     print(res)
+    log_metrics()
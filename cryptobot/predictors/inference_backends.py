@@ -0,0 +1,247 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import fsspec
+import numpy as np
+import pandas as pd
+
+"""
+Backends to run the LSTM models on CPU. All of them receive windows of shape
+(batch, window, features) and return one prediction per window:
+
+- keras: the Keras model, with predict_on_batch.
+- function: a concrete function traced once with a fixed input signature, that avoids the
+  per-call overhead of Keras.
+- tflite: the model converted to TFLite, optionally with dynamic-range quantization
+  (tflite-quantized), run by the TFLite interpreter.
+"""
+
+BACKENDS = ["keras", "function", "tflite", "tflite-quantized"]
+
+
+class InferenceBackend(ABC):
+    """
+    Base class of the inference backends. Every backend must implement predict and the
+    name and size attributes, a backend without any of them can't be created.
+
+    Abstract Attributes
+    ----------
+    name : str
+        It's the name of the backend, one of BACKENDS.
+
+    size : int
+        It's the size in bytes of the weights of the model.
+
+    Instance methods
+    -------
+    predict(X)
+        Returns the predictions of the windows X as a 1D array.
+    """
+
+    @property
+    @abstractmethod
+    def name(self):
+        pass
+
+    @property
+    @abstractmethod
+    def size(self):
+        pass
+
+    @abstractmethod
+    def predict(self, X):
+        """Returns the predictions of the windows X as a 1D array"""
+
+
+class KerasBackend(InferenceBackend):
+
+    name = "keras"
+
+    def __init__(self, model):
+        self.model = model
+
+    @property
+    def size(self):
+        return self.model.count_params() * 4
+
+    def predict(self, X):
+        return np.asarray(self.model.predict_on_batch(X)).reshape(-1)
+
+
+class ConcreteFunctionBackend(InferenceBackend):
+
+    name = "function"
+
+    def __init__(self, model, window: int = 168):
+        import tensorflow as tf
+
+        self.model = model
+        self.function = tf.function(
+            lambda X: model(X, training=False),
+            input_signature=[
+                tf.TensorSpec([None, window, model.input_shape[-1]], tf.float32)
+            ],
+        ).get_concrete_function()
+
+    @property
+    def size(self):
+        return self.model.count_params() * 4
+
+    def predict(self, X):
+        return self.function(np.asarray(X, dtype=np.float32)).numpy().reshape(-1)
+
+
+class TFLiteBackend(InferenceBackend):
+    """
+    Runs a TFLite model. The interpreter isn't thread safe, so the calls are serialized, and
+    the input is resized when the batch size changes.
+    """
+
+    name = "tflite"
+
+    def __init__(self, model_content: bytes, quantized: bool = False, num_threads: int = None):
+        import tensorflow as tf
+
+        if quantized:
+            self.name = "tflite-quantized"
+        self.model_content = model_content
+        self.interpreter = tf.lite.Interpreter(
+            model_content=model_content, num_threads=num_threads
+        )
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self.input_shape = tuple(self.interpreter.get_input_details()[0]["shape"])
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_path(cls, path: str, quantized: bool = False, num_threads: int = None):
+        with fsspec.open(path, "rb") as f:
+            return cls(f.read(), quantized, num_threads)
+
+    @property
+    def size(self):
+        return len(self.model_content)
+
+    def predict(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        with self._lock:
+            if X.shape != self.input_shape:
+                self.interpreter.resize_tensor_input(self.input_index, X.shape)
+                self.interpreter.allocate_tensors()
+                self.input_shape = X.shape
+            self.interpreter.set_tensor(self.input_index, X)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output_index).reshape(-1).copy()
+
+
+def convert_to_tflite(model, window: int = 168, quantize: bool = False):
+    """
+    Returns the TFLite flatbuffer of a Keras model, traced with windows of the given length.
+    The LSTM layers keep their TensorFlow ops, so the TFLite builtins are extended with
+    SELECT_TF_OPS. With quantize, the weights are quantized to int8 (dynamic range).
+    """
+    import tensorflow as tf
+
+    function = tf.function(lambda X: model(X, training=False)).get_concrete_function(
+        tf.TensorSpec([None, window, model.input_shape[-1]], tf.float32)
+    )
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([function], model)
+    converter.target_spec.supported_ops = [
+        tf.lite.OpsSet.TFLITE_BUILTINS,
+        tf.lite.OpsSet.SELECT_TF_OPS,
+    ]
+    converter._experimental_lower_tensor_list_ops = False
+    if quantize:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    return converter.convert()
+
+
+def get_tflite_path(model_path: str, quantized: bool = False):
+    """
+    Returns the path of the TFLite export saved next to the SavedModel at model_path.
+    """
+    return f"{model_path}-quantized.tflite" if quantized else f"{model_path}.tflite"
+
+
+def create_backend(name: str, model, window: int = 168):
+    """
+    Returns the backend with the given name for the Keras model.
+    """
+    if name == "keras":
+        return KerasBackend(model)
+    if name == "function":
+        return ConcreteFunctionBackend(model, window)
+    if name in ["tflite", "tflite-quantized"]:
+        quantized = name == "tflite-quantized"
+        return TFLiteBackend(convert_to_tflite(model, window, quantized), quantized)
+    raise ValueError(f"Unknown inference backend {name}, it should be one of {BACKENDS}")
+
+
+def load_backend(name: str, model_path: str, window: int = 168):
+    """
+    Returns the backend with the given name for the SavedModel at model_path. The TFLite
+    backends load the export saved by the Trainer, or convert the model if there's none.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {name}, it should be one of {BACKENDS}")
+
+    if name in ["tflite", "tflite-quantized"]:
+        quantized = name == "tflite-quantized"
+        tflite_path = get_tflite_path(model_path, quantized)
+        try:
+            return TFLiteBackend.from_path(tflite_path, quantized)
+        except FileNotFoundError:
+            logging.warning(f"There's no model at {tflite_path}, converting the model")
+
+    from tensorflow.keras.models import load_model
+
+    return create_backend(name, load_model(model_path), window)
+
+
+def compare_backends(backends, X, y=None, repeat: int = 20):
+    """
+    Returns the latency and the accuracy delta of each backend on the windows X, compared
+    with the first backend, usually keras.
+
+    Returns
+    -------
+    pd.DataFrame
+        Indexed by backend name, with the median latency of one window and the latency per
+        window of the whole batch (in ms), the maximum absolute difference of the predictions
+        with the first backend, and, if y is given, the accuracy and its delta with the first
+        backend.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    rows = []
+    reference = None
+    for backend in backends:
+        single = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            backend.predict(X[:1])
+            single.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        predictions = backend.predict(X)
+        batch = time.perf_counter() - start
+
+        if reference is None:
+            reference = predictions
+        row = {
+            "backend": backend.name,
+            "latency_ms": float(np.median(single) * 1000),
+            "batch_latency_ms_per_window": batch * 1000 / len(X),
+            "max_abs_delta": float(np.max(np.abs(predictions - reference))),
+            "size_bytes": backend.size,
+        }
+        if y is not None:
+            accuracy = float(np.mean((predictions > 0.5) == np.asarray(y).reshape(-1)))
+            reference_accuracy = rows[0]["accuracy"] if rows else accuracy
+            row["accuracy"] = accuracy
+            row["accuracy_delta"] = accuracy - reference_accuracy
+        rows.append(row)
+
+    return pd.DataFrame(rows).set_index("backend")
@@ -0,0 +1,161 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from cryptobot.brokers.enums import Intervals, Symbols
+from cryptobot.predictors.inference_backends import load_backend
+from cryptobot.utils.model_name_helper import generate_model_path, generate_pipeline_path
+from cryptobot.utils.pipeline_helper import load_pipeline
+
+
+class ModelRegistry:
+    """
+    Loads the models, with their pipelines, on first use and keeps the most recently used
+    ones in memory, under a memory cap.
+
+    The models are keyed by symbol, interval and version. Concurrent callers of the same key
+    share one load, and the loads of different keys don't wait for each other.
+
+    Instance Attributes
+    ----------
+    max_memory : int
+        It's the maximum size, in bytes, of the loaded models. When it's exceeded, the least
+        recently used models are evicted, but the last one loaded is always kept. By default,
+        it's the value of the MODEL_REGISTRY_MAX_MEMORY_MB environment variable, in MB, or
+        unlimited if it isn't set.
+
+    loader : callable
+        It receives the symbol, interval and version, and returns a dict with the model (an
+        inference backend) and its preprocessor. By default, load_model_and_pipeline.
+
+    latest_ttl : float
+        It's the time, in seconds, that a model of the "latest" version is kept before it's
+        loaded again, so a new trained model is used without restarting. The fixed versions
+        never change, so they are kept until they are evicted. By default, it's the value of
+        the MODEL_REGISTRY_LATEST_TTL environment variable, or 600.
+
+    Instance methods
+    -------
+    get(symbol, interval, version)
+        Returns the dict with the model, preprocessor and size of the key, loading it if needed.
+
+    evict(symbol, interval, version)
+        Removes the model of the key from memory.
+    """
+
+    def __init__(self, max_memory: int = None, loader=None, latest_ttl: float = None):
+        if max_memory is None and os.getenv("MODEL_REGISTRY_MAX_MEMORY_MB"):
+            max_memory = int(float(os.getenv("MODEL_REGISTRY_MAX_MEMORY_MB")) * 2**20)
+        if latest_ttl is None:
+            latest_ttl = float(os.getenv("MODEL_REGISTRY_LATEST_TTL", "600"))
+        self.max_memory = max_memory
+        self.loader = loader or load_model_and_pipeline
+        self.latest_ttl = latest_ttl
+        self.memory = 0
+
+        self._models = OrderedDict()
+        self._loaded_at = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get(self, symbol: Symbols, interval: Intervals, version: str = "latest"):
+        key = (symbol, interval, version)
+        with self._lock:
+            entry = self._get_loaded(key)
+            if entry is not None:
+                return entry
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        try:
+            with key_lock:
+                with self._lock:
+                    entry = self._get_loaded(key)
+                    if entry is not None:
+                        return entry
+
+                logging.info(f"Loading model of {symbol.value} {interval.value} {version}")
+                entry = self.loader(symbol, interval, version)
+                entry.setdefault("size", estimate_model_size(entry["model"]))
+
+                with self._lock:
+                    self._remove(key)
+                    self._models[key] = entry
+                    self._loaded_at[key] = time.monotonic()
+                    self.memory += entry["size"]
+                    self._evict_least_recently_used()
+                return entry
+        finally:
+            # The lock is removed even if the load fails, the next caller tries again.
+            with self._lock:
+                self._key_locks.pop(key, None)
+
+    def evict(self, symbol: Symbols, interval: Intervals, version: str = "latest"):
+        with self._lock:
+            self._remove((symbol, interval, version))
+
+    def loaded(self):
+        """
+        Returns the keys of the models in memory, from the least to the most recently used.
+        """
+        with self._lock:
+            return list(self._models)
+
+    def _get_loaded(self, key):
+        if key not in self._models:
+            return None
+        if key[2] == "latest" and time.monotonic() - self._loaded_at[key] >= self.latest_ttl:
+            return None
+        self._models.move_to_end(key)
+        return self._models[key]
+
+    def _remove(self, key):
+        entry = self._models.pop(key, None)
+        self._loaded_at.pop(key, None)
+        if entry is not None:
+            self.memory -= entry["size"]
+
+    def _evict_least_recently_used(self):
+        while (
+            self.max_memory is not None
+            and self.memory > self.max_memory
+            and len(self._models) > 1
+        ):
+            key = next(iter(self._models))
+            self._remove(key)
+            logging.info(f"Evicting model of {key[0].value} {key[1].value} {key[2]}")
+
+
+def load_model_and_pipeline(
+    symbol: Symbols, interval: Intervals, version: str, backend: str = "keras"
+):
+    """
+    Loads the model of the key, with the given inference backend, and its pipeline.
+    If the model wasn't saved by interval, the legacy path, without interval, is used.
+    See :func:`cryptobot.predictors.inference_backends.load_backend`.
+    """
+    try:
+        model = load_backend(backend, generate_model_path(symbol, version, interval))
+        pipeline_path = generate_pipeline_path(symbol, version, interval)
+    except (IOError, OSError):
+        logging.info(f"There's no model for {interval.value}, loading the legacy path")
+        model = load_backend(backend, generate_model_path(symbol, version))
+        pipeline_path = generate_pipeline_path(symbol, version)
+
+    try:
+        preprocessor = load_pipeline(pipeline_path)
+    except FileNotFoundError:
+        logging.warning(
+            f"There's no pipeline at {pipeline_path}, it will be fitted on every prediction"
+        )
+        preprocessor = None
+
+    return {"model": model, "preprocessor": preprocessor, "size": model.size}
+
+
+def estimate_model_size(model):
+    """
+    Returns the size in bytes of the weights of a Keras model, assuming they are float32.
+    """
+    return model.count_params() * 4 if hasattr(model, "count_params") else 0
@@ -4,6 +4,9 @@ import pandas as pd
 from datetime import datetime, date
 import requests
 
+from cryptobot.stores.daily_store import DailyStore
+from cryptobot.utils.instrumentation import increment, timer
+
 """
 Creates a pandas dataframe with the fear_greed_index
 Columns
@@ -18,33 +21,49 @@ class FearGreedIndexReader:
     """
     The goal of this reader is to get the data from the api once and then keep it in memory.
     So, after initialize the object we have to use the get_data method.
-    TODO Use cache to store the data in memory.
+    The days before today are cached on disk, so only the new days are requested to the api.
     """
 
     FIRST_DATE = datetime.strptime("2018-02-01", "%Y-%m-%d")
-    DATA_API = os.getenv("FEAR_GREED_INDEX_API")
+    DATA_API = None
+
+    SOURCE = "fear_greed_index"
 
-    def __init__(self, initial_date=FIRST_DATE):
-        self.data = self.fear_greed_index(initial_date)
+    def __init__(self, initial_date=FIRST_DATE, use_cache=True):
+        if use_cache:
+            self.data = DailyStore().get_data(
+                self.SOURCE,
+                initial_date.strftime("%Y-%m-%d"),
+                lambda day: self.fear_greed_index(
+                    datetime.strptime(day, "%Y-%m-%d"), include_initial_date=True
+                ),
+            )
+        else:
+            self.data = self.fear_greed_index(initial_date)
 
     def get_data(self):
         return self.data
 
     @classmethod
-    def fear_greed_index(cls, initial_date: datetime):
+    def fear_greed_index(cls, initial_date: datetime, include_initial_date: bool = False):
         """
         gets data from the api
         initial date = initial data to start gathering the index. Oldest data possible 2018-02-01
+        include_initial_date = the api returns the last days until today, by default without the
+        initial date. The cache includes it, so the incremental requests don't leave a gap.
         """
-        logging.info(f"Getting data from {cls.DATA_API} from {initial_date}")
+        data_api = cls.DATA_API or os.getenv("FEAR_GREED_INDEX_API")
+        logging.info(f"Getting data from {data_api} from {initial_date}")
 
         if initial_date >= cls.FIRST_DATE:
             today = date.today()
             num_days = today - initial_date.date()
 
-            api_data = requests.get(
-                cls.DATA_API, params={"limit": num_days.days}
-            ).json()
+            with timer("reader_request", source=cls.SOURCE):
+                response = requests.get(data_api, params={"limit": num_days.days + include_initial_date})
+            increment("reader_requests", source=cls.SOURCE)
+            increment("reader_response_bytes", len(response.content), source=cls.SOURCE)
+            api_data = response.json()
             fear_greed_df = pd.DataFrame(api_data["data"])
             fear_greed_df = cls.parse_data(fear_greed_df)
             return fear_greed_df
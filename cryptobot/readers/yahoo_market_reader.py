@@ -1,17 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 import logging
-import yfinance as yf
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from cryptobot.brokers.enums import Intervals
+from cryptobot.stores.daily_store import DailyStore
+from cryptobot.utils.instrumentation import increment, timer
 
 
 class YahooMarketReader:
     """
     The goal of this reader is to get the data from the api once and then keep it in memory.
     So, after initialize the object we have to use the get_data method.
-    TODO Use cache to store the data in memory.
+    The days before today are cached on disk, so only the new days are requested to the api.
     """
 
     class YahooSymbol(Enum):
@@ -33,24 +35,66 @@ class YahooMarketReader:
         TNX = "^TNX"
         DXY_NYB = "DX-Y.NYB"
 
-    def __init__(self, start_date: datetime, end_date: datetime):
+    def __init__(
+        self, start_date: datetime, end_date: datetime, use_cache=True, workers=None
+    ):
         indices = [s for s in self.YahooSymbol]
-
-        df = None
-        for index in indices:
-            df_aux = self.get_yahoo_data(index, start_date, end_date)
-            df_aux = self.parse_data(df_aux, index)
-            df = (
-                df_aux
-                if df is None
-                else df.merge(df_aux, on="close_time_day", how="left")
+        store = DailyStore() if use_cache else None
+
+        with ThreadPoolExecutor(max_workers=workers or len(indices)) as executor:
+            dfs = list(
+                executor.map(
+                    lambda index: self.get_symbol_data(
+                        index, start_date, end_date, store
+                    ),
+                    indices,
+                )
             )
 
-        self.data = df
+        # The days of the first symbol are kept, like in a chain of left merges.
+        dfs = [df.drop_duplicates("close_time_day").set_index("close_time_day") for df in dfs]
+        self.data = (
+            pd.concat(dfs, axis=1)
+            .reindex(dfs[0].index)
+            .rename_axis("close_time_day")
+            .reset_index()
+        )
+
+    @classmethod
+    def get_symbol_data(
+        cls,
+        symbol: YahooSymbol,
+        start_date: datetime,
+        end_date: datetime,
+        store: DailyStore = None,
+    ):
+        """
+        Returns the parsed data of the symbol, from the store if it's given.
+        """
+        if store is None:
+            return cls.get_parsed_data(symbol, start_date, end_date)
+
+        return store.get_data(
+            symbol.value,
+            start_date.strftime("%Y-%m-%d"),
+            lambda day: cls.get_parsed_data(symbol, datetime.strptime(day, "%Y-%m-%d")),
+            end_date.strftime("%Y-%m-%d"),
+        )
 
     def get_data(self):
         return self.data
 
+    @classmethod
+    def get_parsed_data(
+        cls, symbol: YahooSymbol, start_date: datetime, end_date: datetime = None
+    ):
+        """
+        Returns the parsed data of the symbol from start_date to end_date (excluded).
+        By default, it returns the data until today (included).
+        """
+        end_date = end_date or datetime.utcnow() + timedelta(days=1)
+        return cls.parse_data(cls.get_yahoo_data(symbol, start_date, end_date), symbol)
+
     @classmethod
     def get_yahoo_data(
         cls, symbol: YahooSymbol, start_date: datetime, end_date: datetime
@@ -59,18 +103,22 @@ class YahooMarketReader:
         This function returns the historical data of a determime symbol (check https://finance.yahoo.com/)
         and start_date (YYYY-MM-DD) and end_date (YYYY-MM-DD) for the time series, the period of the date is 1d
         """
+        import yfinance as yf
+
         logging.info(f"Getting data about {symbol.value} from Yahoo Finances")
 
         ticker = yf.Ticker(symbol.value)
 
-        df = ticker.history(
-            interval=Intervals.ONE_DAY.value,
-            start=start_date.strftime("%Y-%m-%d"),
-            end=end_date.strftime("%Y-%m-%d"),
-        )
+        with timer("reader_request", source="yahoo"):
+            df = ticker.history(
+                interval=Intervals.ONE_DAY.value,
+                start=start_date.strftime("%Y-%m-%d"),
+                end=end_date.strftime("%Y-%m-%d"),
+            )
+        increment("reader_requests", source="yahoo", symbol=symbol.value)
 
         df = df.reset_index()
-        df = df.drop(columns=["Dividends", "Stock Splits", "Volume"])
+        df = df.drop(columns=["Dividends", "Stock Splits", "Volume"], errors="ignore")
         df["timestamp"] = df["Date"].apply(lambda x: x.timestamp())
 
         columns = df.columns
@@ -0,0 +1,323 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from cryptobot.brokers.enums import Intervals, Symbols
+from cryptobot.utils.instrumentation import increment, metrics, timer
+
+"""
+Serves the predictions of one CryptoPredictor held in memory, with the endpoints used by the
+dashboard:
+
+    GET /candles?symbol=ETHUSDT&interval=1h&start_time=<s>&end_time=<s>
+    GET /predict-range?symbol=ETHUSDT&interval=1h&init=<s>&end=<s>
+    GET /predict?symbol=ETHUSDT&interval=1h&time=<s>
+    GET /metrics  # the instrumentation metrics, in the Prometheus text format
+
+The windows of the concurrent requests of the same symbol are coalesced by a PredictionBatcher
+into a single call to the model.
+
+Usage:
+    python -m cryptobot.serving  # listens on $HOST:$PORT, 0.0.0.0:8080 by default
+"""
+
+
+class PredictionBatcher:
+    """
+    Coalesces the windows submitted by concurrent callers into batches, that are predicted
+    by a single worker thread with one call to the predict function.
+
+    The worker waits up to max_delay seconds after the first pending request for more
+    requests, until the batch has max_batch_size windows. A request is never split, so a
+    batch can have more windows than max_batch_size if a single request does.
+
+    Instance Attributes
+    ----------
+    predict_function : callable
+        It receives an array of windows of shape (batch, WINDOW, features) and returns one
+        prediction per window.
+
+    max_batch_size : int
+        It's the number of windows that stops the wait for more requests.
+
+    max_delay : float
+        It's the maximum time, in seconds, that a request waits for other ones.
+
+    Instance methods
+    -------
+    predict(X)
+        Returns the predictions of X, after waiting for the batch it belongs to.
+
+    submit(X)
+        Returns a Future with the predictions of X.
+
+    close()
+        Stops the worker thread.
+    """
+
+    def __init__(self, predict_function, max_batch_size: int = 256, max_delay: float = 0.005):
+        self.predict_function = predict_function
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.batches = 0
+
+        self._requests = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def predict(self, X):
+        return self.submit(X).result()
+
+    def submit(self, X):
+        future = Future()
+        self._requests.put((np.asarray(X, dtype=np.float32), future))
+        return future
+
+    def close(self):
+        self._requests.put(None)
+        self._worker.join()
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+
+            batch, size = [request], len(request[0])
+            deadline = time.monotonic() + self.max_delay
+            while size < self.max_batch_size:
+                try:
+                    request = self._requests.get(
+                        timeout=max(deadline - time.monotonic(), 0)
+                    )
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._predict(batch)
+                    return
+                batch.append(request)
+                size += len(request[0])
+
+            self._predict(batch)
+
+    def _predict(self, batch):
+        self.batches += 1
+        increment("prediction_batches")
+        increment("prediction_batch_requests", len(batch))
+        futures = [future for _, future in batch]
+        try:
+            predictions = np.asarray(
+                self.predict_function(np.concatenate([X for X, _ in batch]))
+            ).reshape(-1)
+        except Exception as error:
+            for future in futures:
+                future.set_exception(error)
+            return
+
+        offsets = np.cumsum([0] + [len(X) for X, _ in batch])
+        for future, start, end in zip(futures, offsets[:-1], offsets[1:]):
+            future.set_result(predictions[start:end])
+
+
+class PredictionService:
+    """
+    Holds one predictor and one PredictionBatcher per symbol and interval, and answers the
+    requests of the endpoints.
+
+    Instance Attributes
+    ----------
+    predictor : CryptoPredictor
+        It's the predictor that prepares the windows and holds the models. By default, a new
+        CryptoPredictor, that loads the models.
+    """
+
+    def __init__(self, predictor=None, max_batch_size: int = 256, max_delay: float = 0.005):
+        if predictor is None:
+            from cryptobot.predictors.crypto_predictor import CryptoPredictor
+
+            predictor = CryptoPredictor()
+
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.batchers = {}
+        self._lock = threading.Lock()
+
+    def candles(self, symbol: Symbols, interval: Intervals, start_time: datetime, end_time: datetime):
+        """
+        Returns the candles of the range as records, with the times in ms since epoch.
+        """
+        from cryptobot.data import candle_store, get_binance_client
+
+        df = candle_store.get_candles(get_binance_client(), symbol, interval, start_time, end_time)
+        return df.to_dict(orient="records")
+
+    def predict(self, symbol: Symbols, interval: Intervals, date_time: datetime):
+        """
+        Returns the prediction of the next candle after date_time, from the cache of the
+        predictor if the last closed candle was already predicted.
+        """
+        batcher = self._batcher(symbol, interval)
+        prediction = self.predictor.predict(symbol, date_time, interval, batcher.predict)
+        return float(np.asarray(prediction).reshape(-1)[0])
+
+    def predict_range(self, symbol: Symbols, interval: Intervals, start_time: datetime, end_time: datetime):
+        """
+        Returns the open_time, in ms since epoch, and the prediction of every candle of the range.
+        """
+        open_time, windows = self.predictor.prepare_range(symbol, interval, start_time, end_time)
+        predictions = self._batcher(symbol, interval).predict(windows)
+        open_time = np.asarray(open_time, dtype="datetime64[ms]").astype(np.int64)
+        return [
+            {"open_time": int(t), "predictions": float(p)}
+            for t, p in zip(open_time, predictions)
+        ]
+
+    def close(self):
+        with self._lock:
+            batchers = list(self.batchers.values())
+        for batcher in batchers:
+            batcher.close()
+
+    def _batcher(self, symbol: Symbols, interval: Intervals):
+        if symbol not in self.predictor.trained_models:
+            raise ValueError(f"There's no model for {symbol.value}")
+
+        with self._lock:
+            if (symbol, interval) not in self.batchers:
+                self.batchers[(symbol, interval)] = PredictionBatcher(
+                    lambda X: self.predictor.predict_windows(symbol, X, interval=interval),
+                    self.max_batch_size,
+                    self.max_delay,
+                )
+            return self.batchers[(symbol, interval)]
+
+
+class PredictionRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes the GET requests to the PredictionService of the server and writes the JSON responses.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        route = ROUTES.get(url.path)
+        if route is None:
+            return self._send(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {url.path}"})
+
+        # Only the errors of the parameters are errors of the request, the rest are internal.
+        parse, handle = route
+        try:
+            args = parse(self.server.service, params)
+        except (KeyError, ValueError) as error:
+            return self._send(HTTPStatus.BAD_REQUEST, {"error": f"Invalid request: {error}"})
+
+        try:
+            with timer("http_request", path=url.path):
+                response = handle(self.server.service, *args)
+        except Exception as error:
+            logging.exception(f"Error serving {self.path}")
+            return self._send(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(error)})
+        self._send(HTTPStatus.OK, response)
+
+    def log_message(self, format, *args):
+        logging.info(f"{self.address_string()} {format % args}")
+
+    def _send(self, status: HTTPStatus, body):
+        # The text bodies are the metrics, in the Prometheus text format.
+        if isinstance(body, str):
+            content, content_type = body.encode(), "text/plain; version=0.0.4"
+        else:
+            content, content_type = json.dumps(body).encode(), "application/json"
+        path = urlparse(self.path).path
+        increment("http_responses", path=path if path in ROUTES else "other", status=int(status))
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def _symbol_and_interval(params):
+    return Symbols(params["symbol"]), Intervals(params["interval"])
+
+
+def _model_symbol_and_interval(service, params):
+    symbol, interval = _symbol_and_interval(params)
+    if symbol not in service.predictor.trained_models:
+        raise ValueError(f"There's no model for {symbol.value}")
+    return symbol, interval
+
+
+def _to_datetime(params, name, default=None):
+    if name not in params and default is not None:
+        return default
+    return datetime.fromtimestamp(int(params[name]))
+
+
+# Each route: the function that parses and validates the parameters into the arguments of the
+# handler, and the handler, that receives the service and the arguments.
+ROUTES = {
+    "/candles": (
+        lambda service, params: (
+            *_symbol_and_interval(params),
+            _to_datetime(params, "start_time"),
+            _to_datetime(params, "end_time"),
+        ),
+        lambda service, *args: service.candles(*args),
+    ),
+    "/predict-range": (
+        lambda service, params: (
+            *_model_symbol_and_interval(service, params),
+            _to_datetime(params, "init"),
+            _to_datetime(params, "end"),
+        ),
+        lambda service, *args: service.predict_range(*args),
+    ),
+    "/predict": (
+        lambda service, params: (
+            *_model_symbol_and_interval(service, params),
+            _to_datetime(params, "time", datetime.now()),
+        ),
+        lambda service, *args: {"prediction": service.predict(*args)},
+    ),
+    "/metrics": (
+        lambda service, params: (),
+        lambda service: metrics.to_prometheus(),
+    ),
+}
+
+
+def create_server(service: PredictionService, host: str = "0.0.0.0", port: int = 8080):
+    """
+    Returns a threaded HTTP server for the service, not started yet.
+    """
+    server = ThreadingHTTPServer((host, port), PredictionRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+if __name__ == "__main__":
+    from cryptobot import load_environment
+
+    load_environment()
+
+    server = create_server(
+        PredictionService(), os.getenv("HOST", "0.0.0.0"), int(os.getenv("PORT", "8080"))
+    )
+    logging.info(f"Serving predictions on {server.server_address}")
+    try:
+        server.serve_forever()
+    finally:
+        server.service.close()
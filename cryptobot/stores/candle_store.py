@@ -0,0 +1,357 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from cryptobot.brokers.binance_client import CANDLE_COLUMN_DTYPES, BinanceClient
+from cryptobot.brokers.broker_interface import BrokerInterface
+from cryptobot.brokers.enums import Intervals, Symbols
+
+DEFAULT_STORE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "candles"
+)
+
+
+class CandleStore:
+    """
+    Local columnar store of complete candles.
+    The candles are saved as Parquet files partitioned by symbol, interval and month:
+        {root}/{symbol}/{interval}/{YYYY-MM}.parquet
+
+    Next to the partitions, a coverage file keeps the time ranges (by open time) that
+    were already requested to the broker, so only the missing gaps or the new tail are
+    downloaded again. Candles that are not complete yet are never stored. The complete
+    candles are the ones closed at the time of the broker, see broker_now.
+
+    Instance Attributes
+    ----------
+    root : str
+        It's the folder where the candles are stored. By default, it's the value of the
+        CANDLE_STORE_PATH environment variable or cryptobot/data/candles.
+
+    workers : int
+        It's the number of concurrent requests used to download the missing candles.
+        If it's None, the broker requests the pages one after another.
+
+    Instance methods
+    -------
+    get_candles(broker, symbol, interval, start_time, end_time, limit)
+        Returns the candles of the range, only requesting to the broker what is missing.
+
+    sync(broker, symbol, interval, start, end)
+        Downloads and stores the complete candles of the range that are not stored yet.
+
+    missing_ranges(symbol, interval, start, end)
+        Returns the sub-ranges of the range that are not stored yet.
+
+    read(symbol, interval, start, end)
+        Returns the stored candles of the range.
+
+    write(symbol, interval, df)
+        Stores the given candles.
+    """
+
+    COVERAGE_FILE = "coverage.json"
+    FLUSH_SIZE = 10000
+
+    def __init__(self, root: str = None, workers: int = None):
+        self.root = root or os.getenv("CANDLE_STORE_PATH", DEFAULT_STORE_PATH)
+        self.workers = workers
+        self._lock = threading.RLock()
+
+    def get_candles(
+        self,
+        broker: BrokerInterface,
+        symbol: Symbols,
+        interval: Intervals,
+        start_time: datetime = None,
+        end_time: datetime = None,
+        limit: int = None,
+    ):
+        """
+        Returns the candles of the given range, with the same semantics that
+        :get_candles:`cryptobot.brokers.binance_client.BinanceClient.get_candles`, but only
+        the candles that aren't stored yet, and the current incomplete candle, are requested
+        to the broker.
+
+        Parameters
+        ----------
+        broker : BrokerInterface
+            It's the broker used to download the missing candles.
+
+        symbol : Symbols
+            It's the symbol of the candles.
+
+        interval : Intervals
+            It's the interval of the candles.
+
+        start_time : datetime
+            It's the open time of the first candle. If it's None, the last `limit` candles
+            before end_time are returned.
+
+        end_time : datetime
+            It's the open time limit of the last candle.
+
+        limit : int
+            It's the maximum number of candles to return.
+
+        Returns
+        -------
+        pd.DataFrame
+            Contains one row per candle and the columns of BinanceClient.COLUMNS_CANDLE.
+        """
+        if start_time is None and limit is None:
+            return to_candles_frame(
+                broker.get_candles(symbol, interval, start_time, end_time, limit)
+            )
+
+        step = interval.to_milliseconds()
+        now = broker_now(broker).timestamp()
+        # The end is floored, so a close time (...:59.999) doesn't reach the next candle.
+        end = int((min(end_time.timestamp(), now) if end_time else now) * 1000)
+        complete_end = int(now * 1000) // step * step
+
+        if start_time is None:
+            start = (end // step - (limit - 1)) * step
+        else:
+            # The first candle is the first one that opens at or after start_time.
+            start = -(-round(start_time.timestamp()) * 1000 // step) * step
+
+        # Ranges are kept aligned to the candles, so they cover every open time <= end.
+        stored_end = min((end // step + 1) * step, complete_end)
+        frames = []
+        tail = None
+        with self._lock:
+            gaps = self.missing_ranges(symbol, interval, start, stored_end)
+            if end >= complete_end and gaps and gaps[-1][1] == complete_end:
+                # The last gap and the incomplete tail are requested at once.
+                gap_start, gap_end = gaps.pop()
+                fetched = self._fetch(broker, symbol, interval, gap_start, end)
+                self._store(
+                    symbol,
+                    interval,
+                    fetched[fetched["open_time"] < gap_end],
+                    gap_start,
+                    gap_end,
+                )
+                tail = fetched[fetched["open_time"] >= gap_end]
+
+            self._fill(broker, symbol, interval, gaps)
+            if start < stored_end:
+                frames.append(self.read(symbol, interval, start, stored_end))
+
+        if end >= complete_end:
+            if tail is None:
+                tail = self._fetch(broker, symbol, interval, max(start, complete_end), end)
+            frames.append(tail)
+
+        df = pd.concat(frames, ignore_index=True) if frames else empty_candles_frame()
+        if limit:
+            df = df.head(limit) if start_time else df.tail(limit)
+        return df.reset_index(drop=True)
+
+    def sync(
+        self,
+        broker: BrokerInterface,
+        symbol: Symbols,
+        interval: Intervals,
+        start: int,
+        end: int,
+    ):
+        """
+        Downloads and stores the complete candles with open time in [start, end) that are
+        not stored yet. Both limits are timestamps in milliseconds.
+        """
+        step = interval.to_milliseconds()
+        end = min(end, int(broker_now(broker).timestamp() * 1000) // step * step)
+        with self._lock:
+            self._fill(
+                broker, symbol, interval, self.missing_ranges(symbol, interval, start, end)
+            )
+
+    def missing_ranges(self, symbol: Symbols, interval: Intervals, start: int, end: int):
+        """
+        Returns the list of [start, end) sub-ranges, in milliseconds, that aren't covered
+        by the store.
+        """
+        return subtract_ranges(start, end, self._load_coverage(symbol, interval))
+
+    def read(self, symbol: Symbols, interval: Intervals, start: int, end: int):
+        """
+        Returns the stored candles with open time in [start, end), sorted by open time.
+        """
+        if start >= end:
+            return empty_candles_frame()
+
+        months = pd.period_range(
+            start=pd.to_datetime(start, unit="ms"),
+            end=pd.to_datetime(end - 1, unit="ms"),
+            freq="M",
+        )
+        frames = [
+            pd.read_parquet(path)
+            for path in (
+                self._partition_path(symbol, interval, month.strftime("%Y-%m"))
+                for month in months
+            )
+            if os.path.isfile(path)
+        ]
+        if not frames:
+            return empty_candles_frame()
+
+        df = pd.concat(frames, ignore_index=True)
+        df = df[(df["open_time"] >= start) & (df["open_time"] < end)]
+        return df.reset_index(drop=True)
+
+    def write(self, symbol: Symbols, interval: Intervals, df: pd.DataFrame):
+        """
+        Stores the given candles in their monthly partitions. Candles that were already
+        stored are replaced.
+        """
+        if df.empty:
+            return
+
+        df = df[BinanceClient.COLUMNS_CANDLE].astype(CANDLE_COLUMN_DTYPES)
+        months = pd.to_datetime(df["open_time"], unit="ms").dt.strftime("%Y-%m")
+        with self._lock:
+            for month, df_month in df.groupby(months.values):
+                path = self._partition_path(symbol, interval, month)
+                if os.path.isfile(path):
+                    df_month = pd.concat([pd.read_parquet(path), df_month])
+                df_month = (
+                    df_month.drop_duplicates(subset="open_time", keep="last")
+                    .sort_values("open_time")
+                    .reset_index(drop=True)
+                )
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                df_month.to_parquet(f"{path}.tmp", index=False)
+                os.replace(f"{path}.tmp", path)
+
+    def _fill(self, broker, symbol, interval, gaps):
+        """
+        Downloads the gaps batch by batch, flushing the candles to disk every FLUSH_SIZE
+        candles, so the whole range is never held in memory.
+        """
+        step = interval.to_milliseconds()
+        for gap_start, gap_end in gaps:
+            frames = []
+            for batch in self._iter_batches(
+                broker, symbol, interval, gap_start, gap_end - step
+            ):
+                frames.append(to_candles_frame(batch))
+                if sum(len(frame) for frame in frames) >= self.FLUSH_SIZE:
+                    self.write(symbol, interval, pd.concat(frames, ignore_index=True))
+                    frames = []
+            df = pd.concat(frames, ignore_index=True) if frames else empty_candles_frame()
+            self._store(symbol, interval, df, gap_start, gap_end)
+
+    def _iter_batches(self, broker, symbol, interval, start, end):
+        logging.info(
+            f"Getting candles from broker for symbol: {symbol.value}, interval: {interval.value}, "
+            f"start: {to_datetime(start)}, end: {to_datetime(end)}"
+        )
+        kwargs = {"workers": self.workers} if self.workers else {}
+        if not hasattr(broker, "iter_candle_batches"):
+            return [
+                broker.get_candles(
+                    symbol, interval, to_datetime(start), to_datetime(end), **kwargs
+                )
+            ]
+        return broker.iter_candle_batches(
+            symbol,
+            interval,
+            to_datetime(start),
+            to_datetime(end),
+            columns=BinanceClient.COLUMNS_CANDLE,
+            **kwargs,
+        )
+
+    def _fetch(self, broker, symbol, interval, start, end):
+        logging.info(
+            f"Getting candles from broker for symbol: {symbol.value}, interval: {interval.value}, "
+            f"start: {to_datetime(start)}, end: {to_datetime(end)}"
+        )
+        kwargs = {"workers": self.workers} if self.workers else {}
+        return to_candles_frame(
+            broker.get_candles(
+                symbol, interval, to_datetime(start), to_datetime(end), **kwargs
+            )
+        )
+
+    def _store(self, symbol, interval, df, start, end):
+        self.write(symbol, interval, df)
+        coverage = self._load_coverage(symbol, interval)
+        self._save_coverage(symbol, interval, merge_ranges(coverage + [[start, end]]))
+
+    def _base_path(self, symbol: Symbols, interval: Intervals):
+        return os.path.join(self.root, symbol.value, interval.value)
+
+    def _partition_path(self, symbol: Symbols, interval: Intervals, month: str):
+        return os.path.join(self._base_path(symbol, interval), f"{month}.parquet")
+
+    def _load_coverage(self, symbol: Symbols, interval: Intervals):
+        path = os.path.join(self._base_path(symbol, interval), self.COVERAGE_FILE)
+        if not os.path.isfile(path):
+            return []
+        with open(path) as coverage_file:
+            return json.load(coverage_file)
+
+    def _save_coverage(self, symbol: Symbols, interval: Intervals, coverage: list):
+        path = os.path.join(self._base_path(symbol, interval), self.COVERAGE_FILE)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "w") as coverage_file:
+            json.dump(coverage, coverage_file)
+        os.replace(f"{path}.tmp", path)
+
+
+def to_datetime(timestamp: int):
+    """Converts a timestamp in milliseconds to the naive local datetime used by the brokers"""
+    return datetime.fromtimestamp(timestamp / 1000)
+
+
+def broker_now(broker):
+    """Returns the time of the broker, or the local time if the broker doesn't have a clock"""
+    return broker.now() if hasattr(broker, "now") else datetime.now()
+
+
+def empty_candles_frame():
+    return pd.DataFrame(columns=BinanceClient.COLUMNS_CANDLE).astype(CANDLE_COLUMN_DTYPES)
+
+
+def to_candles_frame(candles):
+    """Converts a list of parsed candles, or a dict of candle columns, to a typed dataframe"""
+    if not len(candles):
+        return empty_candles_frame()
+    if isinstance(candles, dict):
+        return pd.DataFrame(candles).astype(CANDLE_COLUMN_DTYPES)
+    return pd.DataFrame(candles, columns=BinanceClient.COLUMNS_CANDLE).astype(
+        CANDLE_COLUMN_DTYPES
+    )
+
+
+def merge_ranges(ranges):
+    """Merges overlapping or contiguous [start, end) ranges"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def subtract_ranges(start, end, ranges):
+    """Returns the parts of [start, end) that aren't covered by the given sorted ranges"""
+    missing = []
+    for range_start, range_end in ranges:
+        if range_end <= start or range_start >= end:
+            continue
+        if range_start > start:
+            missing.append([start, range_start])
+        start = max(start, range_end)
+    if start < end:
+        missing.append([start, end])
+    return missing
@@ -0,0 +1,115 @@
+import logging
+import os
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+DEFAULT_STORE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "daily"
+)
+
+DAY_FORMAT = "%Y-%m-%d"
+
+
+class DailyStore:
+    """
+    Local columnar cache of daily data, like the Fear and Greed index or the Yahoo tickers.
+    Each source is saved as one Parquet file with one row per day, keyed by the
+    close_time_day column ("YYYY-MM-DD"):
+        {root}/{source}.parquet
+
+    Only complete days (before today, in UTC) are saved, so the days after the last cached
+    one, today included, are the only ones requested to the source again.
+
+    Instance Attributes
+    ----------
+    root : str
+        It's the folder where the data is stored. By default, it's the value of the
+        DAILY_STORE_PATH environment variable or cryptobot/data/daily.
+
+    Instance methods
+    -------
+    get_data(source, start_day, fetch, end_day)
+        Returns the data of the source between start_day and end_day, only fetching the new days.
+
+    read(source)
+        Returns all the cached data of the source.
+
+    write(source, df)
+        Replaces the cached data of the source.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or os.getenv("DAILY_STORE_PATH", DEFAULT_STORE_PATH)
+        self._lock = threading.Lock()
+        self._source_locks = defaultdict(threading.Lock)
+
+    def get_data(self, source: str, start_day: str, fetch, end_day: str = None):
+        """
+        Returns the rows of the source with close_time_day in [start_day, end_day).
+
+        Parameters
+        ----------
+        source : str
+            It's the name of the source, used as file name.
+
+        start_day : str
+            It's the first day to return, as "YYYY-MM-DD".
+
+        fetch : callable
+            It receives a day as "YYYY-MM-DD" and returns the dataframe of the source from that
+            day until today, with the close_time_day column.
+
+        end_day : str
+            It's the day after the last one to return. By default, there's no limit.
+        """
+        today = datetime.utcnow().strftime(DAY_FORMAT)
+        with self._lock:
+            source_lock = self._source_locks[source]
+        with source_lock:
+            cached = self.read(source)
+            if cached.empty or start_day < cached["close_time_day"].iloc[0]:
+                since = start_day
+                cached = cached.iloc[0:0]
+            else:
+                since = next_day(cached["close_time_day"].iloc[-1])
+
+            if end_day is not None and since >= end_day:
+                df = cached
+            else:
+                logging.info(f"Getting {source} data since {since}, the rest is cached")
+                fetched = fetch(since)
+                fetched = fetched[fetched["close_time_day"] >= since]
+                if not cached.empty:
+                    fetched = pd.concat([cached, fetched], ignore_index=True)
+                df = fetched.drop_duplicates(
+                    subset="close_time_day", keep="last"
+                ).sort_values("close_time_day", ignore_index=True)
+                self.write(source, df[df["close_time_day"] < today])
+
+        df = df[df["close_time_day"] >= start_day]
+        if end_day is not None:
+            df = df[df["close_time_day"] < end_day]
+        return df.reset_index(drop=True)
+
+    def read(self, source: str):
+        path = self._path(source)
+        if not os.path.isfile(path):
+            return pd.DataFrame(columns=["close_time_day"])
+        return pd.read_parquet(path)
+
+    def write(self, source: str, df: pd.DataFrame):
+        path = self._path(source)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_parquet(f"{path}.tmp", index=False)
+        os.replace(f"{path}.tmp", path)
+
+    def _path(self, source: str):
+        return os.path.join(self.root, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', source)}.parquet")
+
+
+def next_day(day: str):
+    return (datetime.strptime(day, DAY_FORMAT) + timedelta(days=1)).strftime(DAY_FORMAT)
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime
+from importlib import metadata
+
+import numpy as np
+import pandas as pd
+
+from cryptobot.brokers.enums import Intervals, Symbols
+
+DEFAULT_STORE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "datasets"
+)
+
+# The libraries that compute the features and fit the pipelines. A new version of any of them
+# changes the keys, like a change in the source code of the package.
+DEPENDENCIES = ["numpy", "pandas", "pandas_ta", "scikit-learn"]
+
+
+class DatasetStore:
+    """
+    Local content-addressed store of the preprocessed training datasets.
+    Each dataset is saved in a folder named by its key:
+        {root}/{key}/data.npy         the preprocessed matrix, loaded memory-mapped
+        {root}/{key}/columns.json     the feature names, the input columns and the key fields
+        {root}/{key}/pipeline.joblib  the fitted pipeline
+
+    The key is the sha256 of the symbol, interval, date range, feature config and the hash
+    of the source code of the package and the versions of its dependencies that build the
+    datasets, so a change in any of them uses a new key.
+
+    Instance Attributes
+    ----------
+    root : str
+        It's the folder where the datasets are stored. By default, it's the value of the
+        DATASET_STORE_PATH environment variable or cryptobot/data/datasets.
+
+    Instance methods
+    -------
+    key(symbol, interval, start_time, end_time, config)
+        Returns the key of the dataset.
+
+    load(key)
+        Returns the stored dataset, or None.
+
+    save(key, data, pipeline, columns)
+        Stores the dataset.
+
+    invalidate(key)
+        Removes the dataset of the key, or every dataset without key.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or os.getenv("DATASET_STORE_PATH", DEFAULT_STORE_PATH)
+
+    def key(
+        self,
+        symbol: Symbols,
+        interval: Intervals,
+        start_time: datetime,
+        end_time: datetime,
+        config: dict = None,
+    ):
+        fields = {
+            "symbol": symbol.value,
+            "interval": interval.value,
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat(),
+            "config": config or {},
+            "source": source_hash(),
+        }
+        return hashlib.sha256(
+            json.dumps(fields, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def load(self, key: str):
+        """
+        Returns a dict with the preprocessed data, as a dataframe over a read-only memory map,
+        the fitted pipeline and the input columns of the pipeline, or None if it isn't stored.
+        """
+        from cryptobot.utils.pipeline_helper import load_pipeline
+
+        path = os.path.join(self.root, key)
+        if not os.path.isdir(path):
+            return None
+
+        with open(os.path.join(path, "columns.json")) as f:
+            columns = json.load(f)
+        data = np.load(os.path.join(path, "data.npy"), mmap_mode="r")
+        logging.info(f"Loading the preprocessed dataset {key} from {self.root}")
+        return {
+            "data": pd.DataFrame(data, columns=columns["features"], copy=False),
+            "pipeline": load_pipeline(os.path.join(path, "pipeline.joblib"))["pipeline"],
+            "columns": columns["columns"],
+        }
+
+    def save(self, key: str, data: pd.DataFrame, pipeline, columns):
+        """
+        Stores the preprocessed data, the fitted pipeline and its input columns. The folder is
+        written aside and renamed at the end, so a dataset is never read half written.
+        """
+        from cryptobot.utils.pipeline_helper import save_pipeline
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, f".{key}.{uuid.uuid4().hex}")
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, "data.npy"), data.to_numpy())
+        with open(os.path.join(tmp_path, "columns.json"), "w") as f:
+            json.dump(
+                {"features": list(data.columns), "columns": list(columns)}, f
+            )
+        save_pipeline(pipeline, columns, os.path.join(tmp_path, "pipeline.joblib"))
+
+        path = os.path.join(self.root, key)
+        self.invalidate(key)
+        os.replace(tmp_path, path)
+        logging.info(f"Preprocessed dataset {key} saved to {self.root}")
+
+    def invalidate(self, key: str = None):
+        path = self.root if key is None else os.path.join(self.root, key)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def source_hash():
+    """
+    Returns the sha256 of the source files of the package, the readers, stores, broker and
+    trainer included, and of the versions of the DEPENDENCIES.
+    """
+    package = os.path.dirname(os.path.dirname(__file__))
+    digest = hashlib.sha256()
+    source_files = sorted(
+        os.path.relpath(os.path.join(folder, file_name), package)
+        for folder, _, file_names in os.walk(package)
+        for file_name in file_names
+        if file_name.endswith(".py")
+    )
+    for source_file in source_files:
+        digest.update(source_file.encode())
+        with open(os.path.join(package, source_file), "rb") as f:
+            digest.update(f.read())
+    digest.update(json.dumps(dependency_versions(), sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def dependency_versions():
+    versions = {}
+    for dependency in DEPENDENCIES:
+        try:
+            versions[dependency] = metadata.version(dependency)
+        except metadata.PackageNotFoundError:
+            versions[dependency] = None
+    return versions
@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from cryptobot.brokers.enums import Intervals, Symbols
+
+
+class PredictionStore:
+    """
+    Cache of the predictions of the models, keyed by symbol, interval, model version and the
+    open time of the last closed candle used by the prediction.
+
+    The predictions are kept in memory until the next candle closes, that's when the latest
+    prediction uses a new key. If a path is given, every prediction is also saved in a SQLite
+    file, so the historical predictions are looked up there instead of computed again.
+
+    Instance Attributes
+    ----------
+    path : str
+        It's the SQLite file where the predictions are saved. By default, it's the value of the
+        PREDICTION_STORE_PATH environment variable, and if it isn't set, the predictions are
+        only kept in memory.
+
+    clock : callable
+        It returns the current datetime, that decides when the next candle closes. By default,
+        datetime.now. With a replay broker, it's its now method.
+
+    Instance methods
+    -------
+    get(symbol, interval, version, open_time)
+        Returns the cached prediction, or None.
+
+    set(symbol, interval, version, open_time, prediction)
+        Caches the prediction until the next candle closes, and saves it if there's a path.
+    """
+
+    def __init__(self, path: str = None, clock=None):
+        self.path = path or os.getenv("PREDICTION_STORE_PATH")
+        self.clock = clock or datetime.now
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._connection = None
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "symbol TEXT, interval TEXT, version TEXT, open_time INTEGER, prediction REAL, "
+                "PRIMARY KEY (symbol, interval, version, open_time))"
+            )
+            self._connection.commit()
+
+    def get(self, symbol: Symbols, interval: Intervals, version: str, open_time: int):
+        key = (symbol, interval, version, open_time)
+        entry = self._memory.get(key)
+        if entry is not None and entry[1] > self.clock().timestamp():
+            return entry[0]
+        if self._connection is None:
+            return None
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT prediction FROM predictions "
+                "WHERE symbol = ? AND interval = ? AND version = ? AND open_time = ?",
+                (symbol.value, interval.value, version, open_time),
+            ).fetchone()
+        if row is None:
+            return None
+        self._remember(key, row[0])
+        return row[0]
+
+    def set(
+        self,
+        symbol: Symbols,
+        interval: Intervals,
+        version: str,
+        open_time: int,
+        prediction: float,
+    ):
+        self._remember((symbol, interval, version, open_time), prediction)
+        if self._connection is None:
+            return
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)",
+                (symbol.value, interval.value, version, open_time, prediction),
+            )
+            self._connection.commit()
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+
+    def _remember(self, key, prediction):
+        # The prediction is kept until the next candle closes. For the latest prediction,
+        # it's when the candle after the last closed one closes, and a new key is used.
+        step = key[1].to_milliseconds()
+        now = self.clock().timestamp()
+        expires_at = (int(now * 1000) // step + 1) * step / 1000
+        with self._lock:
+            for expired in [k for k, v in self._memory.items() if v[1] <= now]:
+                del self._memory[expired]
+            self._memory[key] = (prediction, expires_at)
@@ -1,29 +1,34 @@
 from datetime import datetime
 import logging
-import os
 
+import fsspec
 import numpy as np
 import pandas as pd
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import OrdinalEncoder, RobustScaler
-from cryptobot.utils.pipeline_helper import create_pipeline
-from tensorflow.keras.preprocessing.sequence import pad_sequences
-from tensorflow.keras import Sequential, layers
-from tensorflow.keras.layers.experimental.preprocessing import Normalization
-from tensorflow.keras.optimizers import RMSprop
-from tensorflow.keras.callbacks import EarlyStopping
-from tensorflow.keras.models import save_model
-
+from cryptobot.utils.pipeline_helper import create_pipeline, save_pipeline
 
+from cryptobot import load_environment
 from cryptobot.brokers.enums import Intervals, Symbols
+from cryptobot.predictors.inference_backends import (
+    BACKENDS,
+    compare_backends,
+    convert_to_tflite,
+    create_backend,
+    get_tflite_path,
+)
 from cryptobot.data import (
     add_target,
     clean_data,
     get_data,
 )
 from cryptobot.utils.feature_engineering import add_metrics
-from cryptobot.utils.data_train_split_helper import get_X_y, split_train_test_data
+from cryptobot.utils.instrumentation import log_metrics
+from cryptobot.utils.memory_helper import compact_frame, log_memory_usage
+from cryptobot.utils.data_train_split_helper import (
+    WindowSampler,
+    split_train_test_data,
+)
+from cryptobot.utils.model_name_helper import generate_model_path, generate_pipeline_path
+from cryptobot.stores.dataset_store import DatasetStore
 
 
 class Trainer(object):
@@ -42,18 +47,67 @@ class Trainer(object):
 
         self.kwargs = kwargs
         self.local = kwargs.get("local", True)
+        self.compact = kwargs.get("compact", False)
+        self.daily_data = kwargs.get("daily_data")
+        self.dataset_store = (
+            kwargs.get("dataset_store") or DatasetStore()
+            if kwargs.get("use_dataset_store", True)
+            else None
+        )
 
     def preprocess_data(self):
-        self.data = get_data(self.symbol, self.interval, self.start_time, self.end_time)
+        """
+        Returns the preprocessed data. If the dataset store has it, with the same symbol,
+        interval, dates, feature config and code, it's loaded with its fitted pipeline instead
+        of built again.
+        """
+        if self.dataset_store is not None:
+            key = self.dataset_store.key(
+                self.symbol,
+                self.interval,
+                self.start_time,
+                self.end_time,
+                {"compact": self.compact},
+            )
+            dataset = self.dataset_store.load(key)
+            if dataset is not None:
+                self.pipeline = dataset["pipeline"]
+                self.columns = dataset["columns"]
+                self.preprocessed_data = dataset["data"]
+                return self.preprocessed_data
+
+        self.data = get_data(
+            self.symbol,
+            self.interval,
+            self.start_time,
+            self.end_time,
+            compact=self.compact,
+            daily_data=self.daily_data,
+        )
         self.data = add_metrics(self.data)
+        if self.compact:
+            compact_frame(self.data)
+        log_memory_usage(self.data, "add_metrics")
         self.data = clean_data(self.data)
         self.data = add_target(self.data)
+        log_memory_usage(self.data, "clean_data")
 
         self.set_pipeline()
+        preprocessed_data = self.pipeline.fit_transform(self.data)
+        if self.compact:
+            preprocessed_data = preprocessed_data.astype(np.float32, copy=False)
         self.preprocessed_data = pd.DataFrame(
-            self.pipeline.fit_transform(self.data),
+            preprocessed_data,
             columns=self.pipeline.get_feature_names_out(),
+            copy=False,
         )
+        log_memory_usage(self.preprocessed_data, "pipeline")
+        self.columns = list(self.data.columns)
+
+        if self.dataset_store is not None:
+            self.dataset_store.save(
+                key, self.preprocessed_data, self.pipeline, self.columns
+            )
         return self.preprocessed_data
 
     def set_pipeline(self):
@@ -63,8 +117,11 @@ class Trainer(object):
         self.pipeline = create_pipeline(self.data)
 
     def set_model(self):
+        from tensorflow.keras import Sequential, layers
+        from tensorflow.keras.layers.experimental.preprocessing import Normalization
+
         normalizer = Normalization()
-        normalizer.adapt(self.X_train_pad)
+        normalizer.adapt(self.get_datasets()[0].map(lambda X, y: X))
         self.model = Sequential()
         self.model.add(normalizer)
         self.model.add(layers.Masking(mask_value=-1))
@@ -82,18 +139,15 @@ class Trainer(object):
         df_train, df_test = split_train_test_data(self.preprocessed_data)
 
         length_of_observations = np.random.randint(120, 168, 10000)
-        X_train, y_train = get_X_y(df_train, length_of_observations)
-        self.X_train = X_train
-        self.y_train = y_train
+        self.train_windows = WindowSampler(df_train).sample(length_of_observations)
 
         length_of_observations = np.random.randint(120, 168, 1000)
-        X_test, y_test = get_X_y(df_test, length_of_observations)
-        self.X_test = X_test
-        self.y_test = y_test
-
-        self.X_train_pad = pad_sequences(self.X_train, dtype="float32", value=-999)
+        self.test_windows = WindowSampler(df_test).sample(length_of_observations)
+        self.X_test, self.y_test = self.test_windows.get_batch()
 
     def train_model(self):
+        from tensorflow.keras.optimizers import RMSprop
+        from tensorflow.keras.callbacks import EarlyStopping
 
         logging.info(f"Starting training for {self.symbol.value}")
 
@@ -103,29 +157,115 @@ class Trainer(object):
             metrics="accuracy",
         )
 
+        train_dataset, validation_dataset = self.get_datasets()
         self.model.fit(
-            self.X_train_pad,
-            np.array(self.y_train),
+            train_dataset,
             epochs=50,
             callbacks=[EarlyStopping(patience=5)],
-            batch_size=128,
-            validation_split=0.3,
+            validation_data=validation_dataset,
+        )
+
+    def get_datasets(self, batch_size=128, validation_split=0.3):
+        """
+        Returns the train and validation tf.data datasets of the train windows. Like the
+        validation_split of Keras, the validation samples are the last ones.
+
+        The batches are grouped by length, so they are only padded to their longest window,
+        and they are built from the train data while the previous ones are trained.
+        See :func:`cryptobot.utils.data_train_split_helper.WindowSampler.iter_batches`.
+        """
+        import tensorflow as tf
+
+        n_train = int(len(self.train_windows) * (1 - validation_split))
+        signature = (
+            tf.TensorSpec((None, None, self.train_windows.data.shape[1]), tf.float32),
+            tf.TensorSpec((None,), tf.float32),
         )
 
+        def create_dataset(indices, shuffle):
+            def generator():
+                for X, y in self.train_windows.iter_batches(
+                    batch_size, indices, shuffle=shuffle
+                ):
+                    yield X, y.astype(np.float32)
+
+            return tf.data.Dataset.from_generator(
+                generator, output_signature=signature
+            ).prefetch(tf.data.AUTOTUNE)
+
+        return (
+            create_dataset(np.arange(n_train), True),
+            create_dataset(np.arange(n_train, len(self.train_windows)), False),
+        )
+
+    def compare_backends(self, backends=BACKENDS):
+        """
+        Returns the latency and the accuracy delta of the inference backends on the test
+        windows, padded to the prediction window.
+        See :func:`cryptobot.predictors.inference_backends.compare_backends`.
+        """
+        X, y = self.test_windows.get_batch(maxlen=self.test_windows.maxlen)
+        report = compare_backends(
+            [create_backend(name, self.model, X.shape[1]) for name in backends], X, y
+        )
+        logging.info(f"Inference backends of {self.symbol.value}:\n{report}")
+        return report
+
     def save_model(self):
-        bucket = os.getenv("GOOGLE_CLOUD_STORAGE_BUCKET")
+        """
+        Saves the model, its TFLite exports and the fitted pipeline, with its columns order, in
+        a new version folder and then in the latest folder. The latest folder is written last,
+        so it isn't updated until the new version is complete.
+        """
+        from tensorflow.keras.models import save_model
+
         version = datetime.now().strftime("%Y%m%d-%H%M%S")
-        latest_path = f"gs://{bucket}/trained_models/{self.symbol.value}/latest/model"
-        version_path = (
-            f"gs://{bucket}/trained_models/{self.symbol.value}/{version}/model"
-        )
+        tflite_exports = self.export_tflite()
+
+        for path_version in [version, "latest"]:
+            model_path = generate_model_path(self.symbol, path_version, self.interval)
+            logging.info(f"Saving model to {model_path}")
+            save_model(self.model, model_path, overwrite=True, save_format="tf")
 
-        logging.info(f"Saving model to {version_path}")
-        save_model(self.model, version_path, overwrite=True, save_format="tf")
-        save_model(self.model, latest_path, overwrite=True, save_format="tf")
+            # The TFLite exports are saved next to the SavedModel, for the tflite backends.
+            for quantize in [False, True]:
+                tflite_path = get_tflite_path(model_path, quantize)
+                if quantize in tflite_exports:
+                    with fsspec.open(tflite_path, "wb") as f:
+                        f.write(tflite_exports[quantize])
+                else:
+                    # An export of the previous model would be loaded with the new one.
+                    fs, path = fsspec.core.url_to_fs(tflite_path)
+                    if fs.exists(path):
+                        fs.rm(path)
+
+            save_pipeline(
+                self.pipeline,
+                self.columns,
+                generate_pipeline_path(self.symbol, path_version, self.interval),
+                version,
+            )
+        return version
+
+    def export_tflite(self):
+        """
+        Returns the TFLite exports of the model, keyed by quantize. The exports are optional,
+        the ones that fail are logged and skipped, and the tflite backends convert the
+        SavedModel when it's loaded.
+        """
+        tflite_exports = {}
+        for quantize in [False, True]:
+            try:
+                tflite_exports[quantize] = convert_to_tflite(self.model, quantize=quantize)
+            except Exception as error:
+                logging.warning(
+                    f"The TFLite export (quantize={quantize}) of {self.symbol.value} failed: {error}"
+                )
+        return tflite_exports
 
 
 if __name__ == "__main__":
+    load_environment()
 
     symbol = Symbols.ETHUSDT
     interval = Intervals.ONE_HOUR
@@ -137,4 +277,6 @@ if __name__ == "__main__":
     trainer.split_data()
     trainer.set_model()
     trainer.train_model()
+    trainer.compare_backends()
     trainer.save_model()
+    log_metrics()
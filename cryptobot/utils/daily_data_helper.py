@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+"""
+Joins the daily data (Fear and Greed index, BTC dominance, Yahoo tickers) to the candles
+by day number (days since epoch), instead of merging them on the close_time_day string.
+"""
+
+MILLISECONDS_IN_A_DAY = 24 * 60 * 60 * 1000
+
+
+def to_day_numbers(values):
+    """
+    Returns the days since epoch of datetimes or "YYYY-MM-DD" strings, as int64.
+    """
+    return pd.to_datetime(values).to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+def align_daily_data(*dfs):
+    """
+    Aligns daily dataframes with the close_time_day column into one dataframe, indexed by a
+    contiguous range of day numbers, with the columns of every dataframe in order.
+    The days that a dataframe doesn't have are NaN, and only the first row of each day is kept.
+    The last row is always NaN, it's the row of the days out of the range.
+    """
+    frames = []
+    for df in dfs:
+        days = to_day_numbers(df["close_time_day"])
+        frame = df.drop(columns="close_time_day").set_axis(days)
+        frames.append(frame[~frame.index.duplicated()])
+
+    days = np.concatenate([frame.index.to_numpy() for frame in frames])
+    if len(days) == 0:
+        return pd.concat(frames, axis=1)
+
+    return pd.concat(frames, axis=1).reindex(np.arange(days.min(), days.max() + 2))
+
+
+def attach_daily_data(df, daily):
+    """
+    Adds the columns of the daily dataframe, built with align_daily_data, to the candles.
+    Each candle takes the row of the day of its close_time, as datetime or ms since epoch,
+    with a single gather, which is the same as a left merge on close_time_day.
+    """
+    if daily.empty:
+        return pd.concat([df, daily.reindex(df.index)], axis=1)
+
+    close_time = df["close_time"]
+    if pd.api.types.is_integer_dtype(close_time):
+        days = close_time.to_numpy() // MILLISECONDS_IN_A_DAY
+    else:
+        days = to_day_numbers(close_time)
+
+    positions = days - daily.index[0]
+    positions[(positions < 0) | (positions >= len(daily))] = len(daily) - 1
+
+    gathered = daily.iloc[positions].set_axis(df.index)
+    return pd.concat([df, gathered], axis=1)
@@ -32,6 +32,98 @@ def get_X_y(df, length_of_observations):
     return X, y
 
 
+class WindowSampler:
+    """
+    Samples sequences of the data without copying them.
+    The data is kept once as a contiguous float32 array, and each sample is only a
+    (start, length) pair of indexes over it. The padded batches are built on demand.
+
+    Each sample has the same semantics that subsample_sequence: X are the rows
+    [start, start + length) and y is the target of the row start + length + 1.
+
+    Instance methods
+    -------
+    sample(length_of_observations)
+        Draws one random start for each length, like get_X_y does.
+
+    get_batch(indices, maxlen)
+        Returns X, padded at the beginning like pad_sequences does, and y of the given samples.
+
+    iter_batches(batch_size, indices, bucket_width, shuffle, seed)
+        Yields the batches of the samples grouped by length, each one padded to its longest sample.
+    """
+
+    def __init__(
+        self,
+        df,
+        target_column="remainder__target",
+        maxlen=168,
+        pad_value=-999,
+        dtype=np.float32,
+    ):
+        self.maxlen = maxlen
+        self.pad_value = pad_value
+        self.n_rows = df.shape[0]
+        # The data is prefixed with maxlen padding rows, so every window is a plain slice.
+        self.data = np.full((maxlen + df.shape[0], df.shape[1]), pad_value, dtype=dtype)
+        self.data[maxlen:] = df.values
+        self.target = df[target_column].to_numpy()
+        self.starts = np.empty(0, dtype=np.int64)
+        self.lengths = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def sample(self, length_of_observations):
+        lengths = np.asarray(length_of_observations, dtype=np.int64)
+        if lengths.max(initial=0) > self.maxlen:
+            raise ValueError(f"The lengths can't be greater than {self.maxlen}")
+
+        last_possible = self.n_rows - lengths - 1
+        self.starts = np.random.randint(0, last_possible).astype(np.int64)
+        self.lengths = lengths
+        return self
+
+    def get_batch(self, indices=None, maxlen=None):
+        """
+        Returns X and y of the samples with the given indices (all of them by default).
+        X has shape (samples, maxlen, features), where maxlen is by default the longest
+        length of the batch, and the missing steps are filled with pad_value at the beginning.
+        """
+        starts = self.starts if indices is None else self.starts[indices]
+        lengths = self.lengths if indices is None else self.lengths[indices]
+        maxlen = maxlen or int(lengths.max(initial=0))
+
+        ends = starts + lengths + self.maxlen
+        X = self.data[(ends - maxlen)[:, None] + np.arange(maxlen)]
+        X[np.arange(maxlen) < (maxlen - lengths)[:, None]] = self.pad_value
+        y = self.target[starts + lengths + 1]
+        return X, y
+
+    def iter_batches(
+        self, batch_size=128, indices=None, bucket_width=8, shuffle=True, seed=None
+    ):
+        """
+        Yields (X, y) batches of the samples with the given indices (all of them by default).
+        The samples are grouped in buckets of similar length (bucket_width steps), so each batch
+        is only padded to its longest sample instead of maxlen. Every batch is built from the
+        data when it's requested, so the whole padded dataset is never in memory.
+
+        With shuffle, the samples inside each bucket and the order of the batches are shuffled.
+        """
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices)
+        rng = np.random.default_rng(seed)
+        if shuffle:
+            indices = rng.permutation(indices)
+
+        # The stable sort keeps the shuffled order inside each bucket.
+        indices = indices[np.argsort(self.lengths[indices] // bucket_width, kind="stable")]
+        batches = [indices[i : i + batch_size] for i in range(0, len(indices), batch_size)]
+        order = rng.permutation(len(batches)) if shuffle else range(len(batches))
+        for i in order:
+            yield self.get_batch(batches[i])
+
+
 """
 Splitting data into train and test dataframes
 """
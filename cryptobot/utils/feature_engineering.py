@@ -1,8 +1,8 @@
 import pandas as pd
-import pandas_ta as ta
 
 """
-Uses pandas_ta library
+Uses pandas_ta library. It's imported on first use, as it's slow to import, and importing it
+registers the DataFrame.ta accessor.
 """
 
 
@@ -15,6 +15,8 @@ def ema_metric(df, close_series, interval=10):
     the time frame of the data, smaller intervals are more suitable for shorter
     time frames
     """
+    import pandas_ta  # noqa: F401
+
     df[f"EMA_{interval}"] = df.ta.ema(interval, close=close_series)
     return df
 
@@ -26,6 +28,8 @@ def rsi_metric(df, close_series, interval=14):
     RSI = Relative Strength Index
     interval = 14 (default)
     """
+    import pandas_ta  # noqa: F401
+
     df[f"RSI_{interval}"] = df.ta.rsi(interval, close=close_series)
     return df
 
@@ -40,6 +44,8 @@ def adx_dmp_dmn_metric(df, high_series, low_series, close_series, interval=14):
 
     interval = 14 (default)
     """
+    import pandas_ta  # noqa: F401
+
     aux_df = df.ta.adx(interval, high=high_series, low=low_series, close=close_series)
 
     df[f"ADX_{interval}"] = aux_df[f"ADX_{interval}"]
@@ -56,6 +62,8 @@ def atr_metric(df, high_series, low_series, close_series, interval=14):
 
     interval = 14 (default)
     """
+    import pandas_ta  # noqa: F401
+
     df[f"ATR_{interval}"] = df.ta.atr(
         interval, high=high_series, low=low_series, close=close_series
     )
@@ -65,6 +73,7 @@ def atr_metric(df, high_series, low_series, close_series, interval=14):
 def add_metrics(df):
     """
     Add EMA, RSI, ADX, DMP, DMN, ATR metrics to dataframe
+    See streaming_indicators.StreamingMetrics to update them candle by candle.
     """
     df = ema_metric(df, df["close"], 10)
     df = ema_metric(df, df["close"], 50)
@@ -0,0 +1,255 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from itertools import groupby
+
+"""
+Lightweight instrumentation of the stages of the data, features and inference: timers,
+counters and histograms, exported as Prometheus text or as one structured log line.
+
+It's disabled by default. It's enabled with the INSTRUMENTATION environment variable (1, true),
+that is read on every check, so it can be set by load_environment after the import, or with
+enable(), that overrides the variable. While it's disabled, every call only checks the flag
+and returns, and the timers are a shared no-op context manager.
+
+Usage:
+    with timer("get_data", stage="candles"):
+        ...
+    increment("broker_requests", broker="binance", endpoint="klines")
+    observe("candles", len(candles), symbol="ETHUSDT")
+"""
+
+PREFIX = "cryptobot_"
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf")
+)
+
+# It's set by enable(), and then the environment variable is ignored.
+_enabled = None
+
+
+def is_enabled():
+    if _enabled is not None:
+        return _enabled
+    return os.getenv("INSTRUMENTATION", "").lower() in ["1", "true", "yes"]
+
+
+def enable(enabled: bool = True):
+    """
+    Enables or disables the instrumentation, whatever the environment variable is.
+    With None, it depends on the environment variable again.
+    """
+    global _enabled
+    _enabled = enabled
+
+
+class Histogram:
+    """
+    Counts the observations in cumulative buckets, like the Prometheus histograms.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        total, counts = 0, []
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+class Metrics:
+    """
+    Registry of the counters and histograms, keyed by name and labels.
+
+    Instance methods
+    -------
+    increment(name, value, **labels)
+        Adds value to the counter.
+
+    observe(name, value, **labels)
+        Adds the observation to the histogram.
+
+    snapshot()
+        Returns the counters and histograms as a dict.
+
+    to_prometheus()
+        Returns the metrics in the Prometheus text format.
+
+    reset()
+        Removes every metric.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self.counters.items()
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                    }
+                    for (name, labels), histogram in self.histograms.items()
+                ],
+            }
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+
+        for name, group in groupby(counters, key=lambda item: item[0][0]):
+            lines.append(f"# TYPE {PREFIX}{name}_total counter")
+            for (_, labels), value in group:
+                lines.append(f"{PREFIX}{name}_total{format_labels(labels)} {value}")
+
+        for name, group in groupby(histograms, key=lambda item: item[0][0]):
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            for (_, labels), histogram in group:
+                for bucket, count in zip(histogram.buckets, histogram.cumulative_counts()):
+                    le = "+Inf" if bucket == float("inf") else repr(float(bucket))
+                    lines.append(
+                        f"{PREFIX}{name}_bucket{format_labels(labels + (('le', le),))} {count}"
+                    )
+                lines.append(f"{PREFIX}{name}_sum{format_labels(labels)} {histogram.sum}")
+                lines.append(f"{PREFIX}{name}_count{format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+metrics = Metrics()
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def increment(name: str, value: float = 1, **labels):
+    if is_enabled():
+        metrics.increment(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    if is_enabled():
+        metrics.observe(name, value, **labels)
+
+
+@contextmanager
+def _timer(name, labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe(f"{name}_seconds", time.perf_counter() - start, **labels)
+
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def timer(name: str, **labels):
+    """
+    Returns a context manager that observes its duration in the {name}_seconds histogram.
+    """
+    if not is_enabled():
+        return _NOOP_TIMER
+    return _timer(name, labels)
+
+
+def timed(name: str, **labels):
+    """
+    Decorator that observes the duration of each call in the {name}_seconds histogram.
+    """
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return function(*args, **kwargs)
+            with _timer(name, labels):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_session(session, service: str):
+    """
+    Adds a hook to a requests session that counts its requests and the bytes of the responses.
+    """
+
+    def count_response(response, *args, **kwargs):
+        if is_enabled():
+            path = response.request.path_url.split("?")[0] if response.request else ""
+            labels = {"service": service, "path": path, "status": response.status_code}
+            metrics.increment("http_requests", **labels)
+            metrics.increment("http_response_bytes", len(response.content), **labels)
+        return response
+
+    session.hooks["response"].append(count_response)
+    return session
+
+
+def log_metrics(level: int = logging.INFO):
+    """
+    Logs the counters and the count and sum of the histograms as one JSON line.
+    """
+    if is_enabled():
+        logging.log(level, json.dumps({"metrics": metrics.snapshot()}))
@@ -0,0 +1,42 @@
+import logging
+
+import numpy as np
+
+"""
+Helpers of the compact mode of the data pipeline, that keeps the numeric columns as float32
+and the Fear and Greed classification as a categorical column.
+"""
+
+CATEGORICAL_COLUMNS = ["FG_val_clasif"]
+
+
+def compact_frame(df, categorical_columns=CATEGORICAL_COLUMNS):
+    """
+    Casts the float64 columns of df to float32 and the categorical columns to category,
+    in place, and returns df.
+    """
+    for column in df.columns:
+        if df[column].dtype == np.float64:
+            df[column] = df[column].astype(np.float32)
+
+    for column in categorical_columns:
+        if column in df.columns and df[column].dtype != "category":
+            df[column] = df[column].astype("category")
+    return df
+
+
+def memory_usage(df):
+    """
+    Returns the memory used by df in bytes, including the content of the object columns.
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def log_memory_usage(df, stage):
+    """
+    Logs the shape and the memory used by df after the given stage of the pipeline.
+    """
+    logging.info(
+        f"Memory usage after {stage}: {memory_usage(df) / 2 ** 20:.1f} MB, {df.shape[0]} rows x {df.shape[1]} columns"
+    )
+    return df
@@ -1,10 +1,51 @@
 import os
 
-from cryptobot.brokers.enums import Symbols
+from cryptobot.brokers.enums import Intervals, Symbols
 
-GCM_BUCKET = os.getenv("GOOGLE_CLOUD_STORAGE_BUCKET")
 PATH_FORMAT = "gs://{bucket}/trained_models/{symbol}/{version}/model"
+PIPELINE_PATH_FORMAT = "gs://{bucket}/trained_models/{symbol}/{version}/pipeline.joblib"
+INTERVAL_PATH_FORMAT = "gs://{bucket}/trained_models/{symbol}/{interval}/{version}/model"
+INTERVAL_PIPELINE_PATH_FORMAT = (
+    "gs://{bucket}/trained_models/{symbol}/{interval}/{version}/pipeline.joblib"
+)
 
 
-def generate_latest_model_path(symbol: Symbols):
-    return PATH_FORMAT.format(bucket=GCM_BUCKET, symbol=symbol.value, version="latest")
+def get_bucket():
+    return os.getenv("GOOGLE_CLOUD_STORAGE_BUCKET")
+
+
+def __getattr__(name):
+    # GCM_BUCKET is read on access, so importing the module doesn't depend on load_environment.
+    if name == "GCM_BUCKET":
+        return get_bucket()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def generate_latest_model_path(symbol: Symbols, interval: Intervals = None):
+    return generate_model_path(symbol, "latest", interval)
+
+
+def generate_model_path(symbol: Symbols, version: str, interval: Intervals = None):
+    """
+    Returns the path of the model. Without interval, it's the legacy path of the models
+    trained before they were saved by interval.
+    """
+    if interval is None:
+        return PATH_FORMAT.format(bucket=get_bucket(), symbol=symbol.value, version=version)
+    return INTERVAL_PATH_FORMAT.format(
+        bucket=get_bucket(), symbol=symbol.value, interval=interval.value, version=version
+    )
+
+
+def generate_latest_pipeline_path(symbol: Symbols, interval: Intervals = None):
+    return generate_pipeline_path(symbol, "latest", interval)
+
+
+def generate_pipeline_path(symbol: Symbols, version: str, interval: Intervals = None):
+    if interval is None:
+        return PIPELINE_PATH_FORMAT.format(
+            bucket=get_bucket(), symbol=symbol.value, version=version
+        )
+    return INTERVAL_PIPELINE_PATH_FORMAT.format(
+        bucket=get_bucket(), symbol=symbol.value, interval=interval.value, version=version
+    )
@@ -1,13 +1,15 @@
+import fsspec
 import numpy as np
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import OrdinalEncoder, RobustScaler
 
 
 def create_pipeline(df):
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OrdinalEncoder, RobustScaler
+
     num_cat_list = (
         df.drop(columns=["target"])
-        .select_dtypes(include=["float64", "int64"])
+        .select_dtypes(include=["float64", "float32", "int64", "int32"])
         .columns.values.tolist()
     )
     cat_col_list = ["FG_val_clasif"]
@@ -29,3 +31,33 @@ def create_pipeline(df):
     )
 
     return Pipeline(steps=[("Col_transformer", col_transformer)])
+
+
+def save_pipeline(pipeline, columns, path, version=None):
+    """
+    Serializes the fitted pipeline, with the order of the columns it was fitted with
+    and the version of the model it belongs to. The path can be local or gs://.
+    """
+    import joblib
+
+    with fsspec.open(path, "wb") as f:
+        joblib.dump(
+            {"pipeline": pipeline, "columns": list(columns), "version": version}, f
+        )
+
+
+def load_pipeline(path):
+    """
+    Returns the dict with the pipeline, columns and version saved by save_pipeline.
+    """
+    import joblib
+
+    with fsspec.open(path, "rb") as f:
+        return joblib.load(f)
+
+
+def transform_with_pipeline(preprocessor, df):
+    """
+    Transforms df with a preprocessor loaded by load_pipeline, without fitting it again.
+    """
+    return preprocessor["pipeline"].transform(df[preprocessor["columns"]])
@@ -0,0 +1,258 @@
+import math
+from abc import ABC, abstractmethod
+
+"""
+Stateful versions of the metrics of feature_engineering.add_metrics.
+Each indicator keeps its recursive state, so adding one new candle costs O(1) instead of
+recomputing the metric over the whole dataframe. They reproduce the formulas of pandas_ta
+(without TA-Lib), so the values match add_metrics within float tolerance when both start
+from the same first candle.
+
+The state of every indicator can be saved with get_state and restored with set_state.
+The state is a dict of plain values that can be pickled or serialized to JSON.
+"""
+
+
+class StreamingIndicator(ABC):
+    """
+    Base class of the streaming indicators.
+    The attributes of the indicators are their state, so they must be plain values,
+    lists or other streaming indicators.
+    """
+
+    @abstractmethod
+    def update(self, *args):
+        """Adds a new value or candle to the state and returns the value of the indicator"""
+
+    def get_state(self):
+        return {
+            key: value.get_state()
+            if isinstance(value, StreamingIndicator)
+            else list(value)
+            if isinstance(value, list)
+            else value
+            for key, value in vars(self).items()
+        }
+
+    def set_state(self, state: dict):
+        for key, value in state.items():
+            attribute = getattr(self, key)
+            if isinstance(attribute, StreamingIndicator):
+                attribute.set_state(value)
+            else:
+                setattr(self, key, list(value) if isinstance(value, list) else value)
+        return self
+
+
+class EwmMean(StreamingIndicator):
+    """
+    Exponentially weighted mean, with the same recursion than pandas.Series.ewm(...).mean()
+    with ignore_na=False. NaN values are accepted, as pandas does.
+    """
+
+    def __init__(self, alpha: float, adjust: bool = True, min_periods: int = 0):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.min_periods = max(min_periods, 1)
+        self.weighted = math.nan
+        self.old_weight = 1.0
+        self.observations = 0
+
+    def update(self, value: float):
+        is_observation = not math.isnan(value)
+        self.observations += is_observation
+        if not math.isnan(self.weighted):
+            self.old_weight *= 1 - self.alpha
+            if is_observation:
+                new_weight = 1.0 if self.adjust else self.alpha
+                if self.weighted != value:
+                    self.weighted = (
+                        self.old_weight * self.weighted + new_weight * value
+                    ) / (self.old_weight + new_weight)
+                self.old_weight = self.old_weight + new_weight if self.adjust else 1.0
+        elif is_observation:
+            self.weighted = value
+
+        return self.weighted if self.observations >= self.min_periods else math.nan
+
+
+def rma(length: int):
+    """Wilder's moving average, as pandas_ta.rma"""
+    return EwmMean(1.0 / length, adjust=True, min_periods=length)
+
+
+class EMA(StreamingIndicator):
+    """
+    Exponential Moving Average, seeded with the simple average of the first `length` values.
+    """
+
+    def __init__(self, length: int = 10):
+        self.length = length
+        self.seed = []
+        self.ewm = EwmMean(2.0 / (length + 1), adjust=False)
+
+    def update(self, close: float):
+        if len(self.seed) < self.length:
+            self.seed.append(close)
+            if len(self.seed) < self.length:
+                return math.nan
+            close = sum(self.seed) / self.length
+        return self.ewm.update(close)
+
+
+class RSI(StreamingIndicator):
+    """
+    Relative Strength Index, with Wilder-smoothed gains and losses.
+    """
+
+    def __init__(self, length: int = 14):
+        self.previous_close = math.nan
+        self.gains = rma(length)
+        self.losses = rma(length)
+
+    def update(self, close: float):
+        change = close - self.previous_close
+        self.previous_close = close
+        gains = self.gains.update(max(change, 0.0) if not math.isnan(change) else change)
+        losses = self.losses.update(min(change, 0.0) if not math.isnan(change) else change)
+        return divide(100 * gains, gains + abs(losses))
+
+
+class TrueRange(StreamingIndicator):
+    def __init__(self):
+        self.previous_close = math.nan
+
+    def update(self, high: float, low: float, close: float):
+        previous_close = self.previous_close
+        self.previous_close = close
+        if math.isnan(previous_close):
+            return math.nan
+        return max(high - low, abs(high - previous_close), abs(previous_close - low))
+
+
+class ATR(StreamingIndicator):
+    """
+    Average True Range, Wilder-smoothed.
+    """
+
+    def __init__(self, length: int = 14):
+        self.true_range = TrueRange()
+        self.average = rma(length)
+
+    def update(self, high: float, low: float, close: float):
+        return self.average.update(self.true_range.update(high, low, close))
+
+
+class ADX(StreamingIndicator):
+    """
+    Average directional movement index, with the positive and negative directional
+    movement indexes. update returns the tuple (ADX, DMP, DMN).
+    """
+
+    def __init__(self, length: int = 14):
+        self.previous_high = math.nan
+        self.previous_low = math.nan
+        self.atr = ATR(length)
+        self.positive = rma(length)
+        self.negative = rma(length)
+        self.average = rma(length)
+
+    def update(self, high: float, low: float, close: float):
+        atr = self.atr.update(high, low, close)
+        up = high - self.previous_high
+        down = self.previous_low - low
+        self.previous_high = high
+        self.previous_low = low
+
+        if math.isnan(up) or math.isnan(down):
+            positive = negative = math.nan
+        else:
+            positive = up if up > down and up > 0 else 0.0
+            negative = down if down > up and down > 0 else 0.0
+
+        k = divide(100, atr)
+        dmp = k * self.positive.update(positive)
+        dmn = k * self.negative.update(negative)
+        dx = divide(100 * abs(dmp - dmn), dmp + dmn)
+        return self.average.update(dx), dmp, dmn
+
+
+class StreamingMetrics(StreamingIndicator):
+    """
+    Streaming version of feature_engineering.add_metrics.
+    It keeps the EMA 10/50/200, RSI 14, ADX/DMP/DMN 14 and ATR 14 of a series of candles.
+
+    Instance methods
+    -------
+    update(high, low, close)
+        Adds one candle and returns the metrics of that candle.
+
+    add_metrics(df)
+        Adds the candles of the dataframe and the columns of the metrics, like add_metrics does.
+    """
+
+    COLUMNS = [
+        "EMA_10",
+        "EMA_50",
+        "EMA_200",
+        "RSI_14",
+        "ADX_14",
+        "DMP_14",
+        "DMN_14",
+        "ATR_14",
+    ]
+
+    def __init__(self):
+        self.ema_10 = EMA(10)
+        self.ema_50 = EMA(50)
+        self.ema_200 = EMA(200)
+        self.rsi_14 = RSI(14)
+        self.adx_14 = ADX(14)
+        self.atr_14 = ATR(14)
+
+    def update(self, high: float, low: float, close: float):
+        adx, dmp, dmn = self.adx_14.update(high, low, close)
+        return dict(
+            zip(
+                self.COLUMNS,
+                [
+                    self.ema_10.update(close),
+                    self.ema_50.update(close),
+                    self.ema_200.update(close),
+                    self.rsi_14.update(close),
+                    adx,
+                    dmp,
+                    dmn,
+                    self.atr_14.update(high, low, close),
+                ],
+            )
+        )
+
+    def add_metrics(self, df):
+        """
+        Returns df with the metrics columns, continuing from the current state.
+        """
+        rows = [
+            self.update(high, low, close)
+            for high, low, close in zip(
+                df["high"].to_numpy(float),
+                df["low"].to_numpy(float),
+                df["close"].to_numpy(float),
+            )
+        ]
+        for column in self.COLUMNS:
+            df[column] = [row[column] for row in rows]
+        return df
+
+    @classmethod
+    def from_state(cls, state: dict):
+        return cls().set_state(state)
+
+
+def divide(numerator: float, denominator: float):
+    """Divides like numpy does, returning inf or NaN instead of raising on zero"""
+    if denominator == 0:
+        if numerator == 0 or math.isnan(numerator):
+            return math.nan
+        return math.copysign(math.inf, numerator)
+    return numerator / denominator
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cryptobot.backtest import (
+    backtest,
+    backtest_predictions,
+    backtest_symbols,
+    compute_metrics,
+    predictions_to_positions,
+    simulate_portfolio,
+    sweep_parameters,
+)
+
+
+@pytest.fixture
+def df_stock():
+    rng = np.random.default_rng(1)
+    close = 2000 + np.cumsum(rng.normal(0, 10, 500))
+    return pd.DataFrame({"close": close, "symbol": rng.integers(0, 2, 500)})
+
+
+def iterrows_simulation(df_stock, initial_invest):
+    """The row by row simulation that the dashboard used to run."""
+    df_stock = df_stock.copy()
+    df_stock["USD"] = 0.0
+    df_stock["ETH"] = 0.0
+    for index, row in df_stock.iterrows():
+        if index == 0:
+            df_stock.loc[index, "USD"] = initial_invest
+        else:
+            df_stock.loc[index, "USD"] = df_stock.loc[index - 1, "USD"] - (df_stock.loc[index, "symbol"] * df_stock.loc[index - 1, "USD"] - (1 - df_stock.loc[index, "symbol"]) * (df_stock.loc[index - 1, "ETH"] * df_stock.loc[index - 1, "close"]))
+            df_stock.loc[index, "ETH"] = df_stock.loc[index - 1, "ETH"] - ((1 - df_stock.loc[index, "symbol"]) * df_stock.loc[index - 1, "ETH"] - df_stock.loc[index, "symbol"] * (df_stock.loc[index - 1, "USD"] / df_stock.loc[index - 1, "close"]))
+    df_stock["TOTAL_VALUE_IN_USD"] = df_stock["USD"] + df_stock["ETH"] * df_stock["close"]
+    return df_stock
+
+
+def test_backtest_matches_iterrows_simulation(df_stock):
+    expected = iterrows_simulation(df_stock, 10000)
+    result = backtest(df_stock, 10000)
+
+    for column in ["USD", "ETH", "TOTAL_VALUE_IN_USD"]:
+        np.testing.assert_allclose(result[column], expected[column], rtol=1e-9, atol=1e-9)
+
+
+def test_fees_are_paid_on_every_trade():
+    close = np.array([100.0, 110.0, 121.0, 121.0])
+    simulation = simulate_portfolio(close, [1, 1, 0, 0], 1000, fee=0.01)
+
+    # Buys at 100 paying 1%, holds while the price goes to 110, and sells paying 1% again.
+    np.testing.assert_allclose(simulation["TOTAL_VALUE_IN_USD"], [1000, 1089, 1089 * 0.99, 1089 * 0.99])
+
+
+def test_backtest_symbols_simulates_each_symbol():
+    close = pd.DataFrame({"ETHUSDT": [100.0, 50.0, 100.0], "BTCUSDT": [10.0, 20.0, 40.0]})
+    predictions = pd.DataFrame({"ETHUSDT": [0.1, 0.9, 0.9], "BTCUSDT": [0.9, 0.1, 0.9]})
+
+    total_value, metrics = backtest_symbols(close, predictions, 0.5, 100)
+
+    np.testing.assert_allclose(total_value["ETHUSDT"], [100, 50, 100])
+    np.testing.assert_allclose(total_value["BTCUSDT"], [100, 100, 200])
+    assert metrics.loc["ETHUSDT", "max_drawdown"] == 0.5
+    assert metrics.loc["BTCUSDT", "trades"] == 1
+
+
+def test_compute_metrics():
+    metrics = compute_metrics([100.0, 120.0, 90.0, 110.0], [0, 1, 1, 0])
+    assert metrics["final_value"] == 110.0
+    assert metrics["total_return"] == pytest.approx(0.1)
+    assert metrics["max_drawdown"] == pytest.approx(0.25)
+    assert metrics["trades"] == 2
+    assert predictions_to_positions([0.2, 0.5, 0.7], 0.5).tolist() == [0, 0, 1]
+
+
+def test_candles_without_prediction_are_not_simulated():
+    candles = pd.DataFrame({"open_time": range(5), "open": 100.0, "close": [100.0, 110.0, 120.0, 130.0, 140.0]})
+    predictions = pd.Series([0.9, 0.1, 0.9], index=[0, 2, 4])
+
+    df = backtest_predictions(candles, predictions, 0.5, 1000)
+
+    assert df["open_time"].tolist() == [0, 2, 4]
+    assert df["symbol"].tolist() == [1, 0, 1]
+
+
+def test_sweep_parameters_matches_simulations(df_stock):
+    rng = np.random.default_rng(2)
+    predictions = rng.uniform(0.4, 0.6, len(df_stock))
+    thresholds = np.linspace(0.45, 0.55, 11)
+
+    results = sweep_parameters(predictions, df_stock["close"], thresholds, fees=[0.0, 0.001])
+
+    assert len(results) == 22
+    assert results["final_value"].is_monotonic_decreasing
+    for row in results.itertuples():
+        positions = predictions_to_positions(predictions, row.threshold)
+        simulation = simulate_portfolio(df_stock["close"], positions, 10000, row.fee)
+        metrics = compute_metrics(simulation["TOTAL_VALUE_IN_USD"], positions)
+        assert row.final_value == pytest.approx(metrics["final_value"])
+        assert row.max_drawdown == pytest.approx(metrics["max_drawdown"])
+        assert row.trades == metrics["trades"]
+
+
+def test_sweep_parameters_min_hold():
+    close = np.full(6, 100.0)
+    predictions = [0.0, 0.9, 0.1, 0.9, 0.1, 0.1]
+
+    results = sweep_parameters(predictions, close, [0.5], min_holds=[1, 2]).set_index("min_hold")
+
+    assert results.loc[1, "trades"] == 4
+    assert results.loc[2, "trades"] == 2
@@ -1 +1,89 @@
-# TODO Create some methods to unit test the methods of the BinanceClient class.
\ No newline at end of file
+from datetime import datetime, timedelta
+import threading
+import numpy as np
+import pytest
+
+from cryptobot.brokers.binance_client import BinanceClient, parse_candle, parse_candle_columns
+from cryptobot.brokers.enums import Intervals, Symbols
+
+HOUR = 3600 * 1000
+
+
+class FakeKlinesClient:
+    """Mimics the klines endpoint of Binance with one synthetic candle per hour."""
+
+    def __init__(self):
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def get_klines(self, symbol, interval, startTime=None, endTime=None, limit=None):
+        with self.lock:
+            self.requests += 1
+        limit = min(limit or 500, 1000)
+        first = -(-startTime // HOUR) * HOUR
+        open_times = range(first, endTime + 1, HOUR)[:limit]
+        return [
+            [t, "1.0", "2.0", "0.5", str(t / HOUR), "10.0", t + HOUR - 1, "100.0", 5, "1.0", "10.0", "0"]
+            for t in open_times
+        ]
+
+
+@pytest.fixture
+def binance_client():
+    client = BinanceClient(None, None)
+    client.client = FakeKlinesClient()
+    return client
+
+
+def test_get_candles_concurrently_matches_sequential(binance_client):
+    start_time = datetime(2019, 1, 1, 0, 30)
+    end_time = datetime(2019, 6, 1)
+
+    sequential = binance_client.get_candles(Symbols.ETHUSDT, Intervals.ONE_HOUR, start_time, end_time)
+    concurrent = binance_client.get_candles(Symbols.ETHUSDT, Intervals.ONE_HOUR, start_time, end_time, workers=4)
+
+    assert len(sequential) > 3 * BinanceClient.KLINES_PAGE_SIZE
+    assert concurrent == sequential
+
+
+def test_get_candles_concurrently_with_limit(binance_client):
+    start_time = datetime(2019, 1, 1)
+    end_time = start_time + timedelta(days=200)
+
+    sequential = binance_client.get_candles(Symbols.ETHUSDT, Intervals.ONE_HOUR, start_time, end_time, 2500)
+    concurrent = binance_client.get_candles(Symbols.ETHUSDT, Intervals.ONE_HOUR, start_time, end_time, 2500, workers=3)
+
+    assert len(concurrent) == 2500
+    assert concurrent == sequential
+
+
+def test_iter_candle_batches_yields_pages_in_order(binance_client):
+    start_time = datetime(2019, 1, 1)
+    end_time = datetime(2019, 3, 1)
+
+    batches = list(binance_client.iter_candle_batches(Symbols.ETHUSDT, Intervals.ONE_HOUR, start_time, end_time))
+    candles = [candle for batch in batches for candle in batch]
+
+    assert len(batches) == binance_client.client.requests
+    assert candles == binance_client.get_candles(Symbols.ETHUSDT, Intervals.ONE_HOUR, start_time, end_time)
+
+
+def test_parse_candle_columns():
+    dirty_candle = [1654686000000, '30382.79000000', '30504.86000000', '30340.73000000', '30419.64000000',
+                        '217.16036200', 1654689599999, '6608879.30388600', 6047, '125.00703900', '3804377.38752454', '0']
+    columns = parse_candle_columns([dirty_candle, dirty_candle], ["open_time", "close", "number_of_trades"])
+
+    assert list(columns.keys()) == ["open_time", "close", "number_of_trades"]
+    assert columns["open_time"].dtype == np.int64
+    assert columns["close"].tolist() == [30419.64, 30419.64]
+    assert columns["number_of_trades"].tolist() == [parse_candle(dirty_candle)[8]] * 2
+
+
+def test_get_candles_until_a_close_time_excludes_the_next_candle(binance_client):
+    start_time = datetime(2019, 1, 1)
+    end_time = datetime(2019, 1, 1, 9, 59, 59, 999000)
+
+    candles = binance_client.get_candles(Symbols.ETHUSDT, Intervals.ONE_HOUR, start_time, end_time)
+
+    assert len(candles) == 10
+    assert candles[-1][0] == round(datetime(2019, 1, 1, 9).timestamp() * 1000)
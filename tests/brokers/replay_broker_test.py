@@ -0,0 +1,160 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cryptobot import data
+from cryptobot.brokers.binance_client import parse_candle
+from cryptobot.brokers.enums import Intervals, Symbols
+from cryptobot.brokers.replay_broker import ReplayBroker
+from cryptobot.data import parse_candles_data
+from cryptobot.predictors import crypto_predictor
+from cryptobot.predictors.crypto_predictor import CryptoPredictor
+from cryptobot.predictors.model_registry import ModelRegistry
+from cryptobot.stores.candle_store import CandleStore, to_candles_frame, to_datetime
+from cryptobot.utils.daily_data_helper import align_daily_data
+from cryptobot.utils.pipeline_helper import create_pipeline
+
+HOUR = 3600 * 1000
+FIRST_OPEN_TIME = 1546300800000  # 2019-01-01 00:00 UTC
+
+
+def raw_klines(count, price=100.0):
+    """Raw klines of Binance, one per hour, with the close price growing one per hour"""
+    return [
+        [t, str(price + i), str(price + i + 2), str(price + i - 1), str(price + i + 1), "10.0",
+         t + HOUR - 1, "1000.0", 5, "4.0", "400.0", "0"]
+        for i, t in enumerate(range(FIRST_OPEN_TIME, FIRST_OPEN_TIME + count * HOUR, HOUR))
+    ]
+
+
+@pytest.fixture
+def broker():
+    return ReplayBroker(
+        {(Symbols.ETHUSDT, Intervals.ONE_HOUR): raw_klines(2000)},
+        start_time=to_datetime(FIRST_OPEN_TIME + 10 * HOUR + 30 * 60 * 1000),
+        fee=0.001,
+    )
+
+
+def test_candles_stop_at_the_clock_without_lookahead(broker):
+    current = broker.get_current_candle(Symbols.ETHUSDT, Intervals.ONE_HOUR)
+    last = broker.get_last_complete_candle(Symbols.ETHUSDT, Intervals.ONE_HOUR)
+
+    # The candle in progress opened at 10:00 and only its open price is known.
+    assert current == [FIRST_OPEN_TIME + 10 * HOUR, 110.0, 110.0, 110.0, 110.0, 0.0,
+                       FIRST_OPEN_TIME + 11 * HOUR - 1, 0.0, 0, 0.0, 0.0]
+    assert last == parse_candle(raw_klines(10)[9])
+
+    candles = broker.get_candles(Symbols.ETHUSDT, Intervals.ONE_HOUR, to_datetime(FIRST_OPEN_TIME), datetime(2030, 1, 1))
+    assert [c[0] for c in candles] == list(range(FIRST_OPEN_TIME, FIRST_OPEN_TIME + 11 * HOUR, HOUR))
+    assert candles[:10] == [parse_candle(k) for k in raw_klines(10)]
+
+    broker.advance(Intervals.ONE_HOUR)
+    assert broker.get_last_complete_candle(Symbols.ETHUSDT, Intervals.ONE_HOUR)[0] == FIRST_OPEN_TIME + 10 * HOUR
+
+
+def test_an_end_at_a_close_time_excludes_the_candle_in_progress(broker):
+    # The clock is at 10:30, and the end is the close time of the candle of 9:00.
+    end_time = to_datetime(FIRST_OPEN_TIME + 10 * HOUR - 1)
+
+    candles = broker.get_candles(Symbols.ETHUSDT, Intervals.ONE_HOUR, None, end_time, limit=3)
+    df = data.get_candles_from_binance(Symbols.ETHUSDT, Intervals.ONE_HOUR, None, end_time, 3, use_store=False, broker=broker)
+
+    assert [c[0] for c in candles] == [FIRST_OPEN_TIME + h * HOUR for h in [7, 8, 9]]
+    assert candles == [parse_candle(k) for k in raw_klines(10)[7:]]
+    assert df["close_time"].iloc[-1] == pd.to_datetime(FIRST_OPEN_TIME + 10 * HOUR - 1, unit="ms")
+
+
+def test_get_candles_pages_and_limits_like_binance(broker):
+    broker.advance(timedelta(days=60))
+
+    latest = broker.get_candles(Symbols.ETHUSDT, Intervals.ONE_HOUR, limit=3)
+    assert [c[0] for c in latest] == [FIRST_OPEN_TIME + h * HOUR for h in [1448, 1449, 1450]]
+    assert len(broker.get_candles(Symbols.ETHUSDT, Intervals.ONE_HOUR)) == 500
+
+    start_time = to_datetime(FIRST_OPEN_TIME + 5 * HOUR)
+    batches = list(broker.iter_candle_batches(
+        Symbols.ETHUSDT, Intervals.ONE_HOUR, start_time, None, 1200, columns=["open_time", "close"]
+    ))
+    candles = broker.get_candles(Symbols.ETHUSDT, Intervals.ONE_HOUR, start_time, limit=1200)
+    assert [len(batch["close"]) for batch in batches] == [1000, 200]
+    np.testing.assert_array_equal(np.concatenate([b["open_time"] for b in batches]), [c[0] for c in candles])
+    np.testing.assert_array_equal(np.concatenate([b["close"] for b in batches]), [c[4] for c in candles])
+
+
+def test_market_orders_update_the_balances_with_fees(broker):
+    order = broker.create_buy_order(Symbols.ETHUSDT, 1100.0)
+
+    assert order["status"] == "FILLED"
+    assert order["fills"][0]["price"] == 110.0
+    assert broker.balances["USDT"] == pytest.approx(10000.0 - 1100.0)
+    assert broker.balances["ETH"] == pytest.approx(10 * 0.999)
+
+    broker.advance(Intervals.ONE_HOUR)
+    broker.create_sell_order(Symbols.ETHUSDT, broker.balances["ETH"])
+    assert broker.balances["ETH"] == 0
+    assert broker.balances["USDT"] == pytest.approx(8900.0 + 10 * 0.999 * 111.0 * 0.999)
+
+    status = broker.get_account_status()
+    assert status["balances"] == [{"asset": "USDT", "free": broker.balances["USDT"], "locked": 0.0}]
+
+    with pytest.raises(Exception, match="Insufficient balance"):
+        broker.create_sell_order(Symbols.ETHUSDT, 1.0)
+
+
+class WindowsModel:
+    """Predicts the first feature of the last candle of each window, and records the windows."""
+
+    size = 0
+
+    def __init__(self):
+        self.windows = []
+
+    def predict(self, X):
+        self.windows.append(X)
+        return X[:, -1, 0]
+
+
+def test_predictor_runs_over_the_replay(broker, tmp_path, monkeypatch):
+    # The candles are stored in a temporary store, and the metrics don't need pandas_ta.
+    monkeypatch.setattr(data, "candle_store", CandleStore(str(tmp_path)))
+    monkeypatch.setattr(crypto_predictor, "add_metrics", lambda df: df.assign(spread=df["high"] - df["low"]))
+    days = pd.date_range("2018-12-31", "2019-04-01", freq="D")
+    daily_data = align_daily_data(
+        pd.DataFrame({
+            "close_time_day": days.strftime("%Y-%m-%d"),
+            "FG_value": np.arange(len(days), dtype=float),
+            "FG_val_clasif": ["Fear", "Greed"] * (len(days) // 2) + ["Fear"] * (len(days) % 2),
+        })
+    )
+
+    model = WindowsModel()
+
+    def load(symbol, interval, version):
+        candles = broker.get_candles(symbol, interval, limit=1000)
+        df = predictor.add_features(parse_candles_data(to_candles_frame(candles)))
+        preprocessor = {"pipeline": create_pipeline(df).fit(df), "columns": list(df.columns), "version": "replay"}
+        return {"model": model, "preprocessor": preprocessor}
+
+    predictor = CryptoPredictor(model_registry=ModelRegistry(loader=load), broker=broker, daily_data=daily_data)
+    broker.set_time(to_datetime(FIRST_OPEN_TIME + 400 * HOUR + 30 * 60 * 1000))
+
+    first = predictor.predict(Symbols.ETHUSDT, datetime(2030, 1, 1), Intervals.ONE_HOUR)
+    assert predictor.predict(Symbols.ETHUSDT, broker.now(), Intervals.ONE_HOUR) == first
+    broker.advance(Intervals.ONE_HOUR)
+    second = predictor.predict(Symbols.ETHUSDT, broker.now(), Intervals.ONE_HOUR)
+
+    # The second prediction is the only new call to the model, with the window one candle later.
+    assert len(model.windows) == 2
+    assert model.windows[0].shape[:2] == (1, CryptoPredictor.WINDOW)
+    assert (model.windows[0] != -999).all()
+    np.testing.assert_allclose(model.windows[1][0, :-1], model.windows[0][0, 1:], rtol=1e-6)
+    assert first[0, 0] == model.windows[0][0, -1, 0] and second[0, 0] == model.windows[1][0, -1, 0]
+
+    # The store only covers the candles closed at the time of the replay.
+    stored = data.candle_store.read(Symbols.ETHUSDT, Intervals.ONE_HOUR, FIRST_OPEN_TIME, FIRST_OPEN_TIME + 2000 * HOUR)
+    assert stored["open_time"].iloc[-1] == FIRST_OPEN_TIME + 400 * HOUR
+    missing = data.candle_store.missing_ranges(Symbols.ETHUSDT, Intervals.ONE_HOUR, FIRST_OPEN_TIME, FIRST_OPEN_TIME + 2000 * HOUR)
+    assert missing[-1] == [FIRST_OPEN_TIME + 401 * HOUR, FIRST_OPEN_TIME + 2000 * HOUR]
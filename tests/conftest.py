@@ -0,0 +1,4 @@
+from cryptobot import load_environment
+
+# The integration tests read the API keys from the .env file.
+load_environment()
@@ -0,0 +1,44 @@
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from cryptobot.brokers.enums import Intervals, Symbols
+from cryptobot.fleet import train_fleet
+
+
+def fake_train_job(symbol, interval, start_time, end_time, daily_data, threads, **kwargs):
+    if interval == Intervals.ONE_DAY:
+        raise ValueError("Not enough candles")
+    return {
+        "symbol": symbol.value,
+        "interval": interval.value,
+        "version": f"{len(daily_data)}-{os.environ['OMP_NUM_THREADS']}-{kwargs['compact']}",
+    }
+
+
+def test_train_fleet_writes_a_summary_of_every_job(tmp_path):
+    path = str(tmp_path / "summary.json")
+    daily_data = pd.DataFrame({"FG_value": range(10)})
+
+    summary = train_fleet(
+        datetime(2022, 1, 1),
+        datetime(2022, 2, 1),
+        intervals=[Intervals.ONE_HOUR, Intervals.ONE_DAY],
+        workers=2,
+        threads_per_job=3,
+        summary_path=path,
+        train_function=fake_train_job,
+        daily_data=daily_data,
+        compact=True,
+    )
+
+    with open(path) as f:
+        assert json.load(f) == summary
+    jobs = {(job["symbol"], job["interval"]): job for job in summary["jobs"]}
+    assert len(jobs) == len(Symbols) * 2
+    assert jobs[("ETHUSDT", "1h")]["version"] == "10-3-True"
+    assert jobs[("ETHUSDT", "1h")]["status"] == "ok"
+    assert jobs[("BTCUSDT", "1d")]["status"] == "failed"
+    assert "Not enough candles" in jobs[("BTCUSDT", "1d")]["error"]
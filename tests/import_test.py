@@ -0,0 +1,34 @@
+import subprocess
+import sys
+
+import pytest
+
+SCRIPT = """
+import socket, sys
+
+def no_network(*args, **kwargs):
+    raise AssertionError("Importing the package shouldn't use the network")
+
+socket.create_connection = no_network
+socket.socket.connect = no_network
+
+import {module}
+
+heavy = [name for name in ["tensorflow", "pandas_ta", "sklearn", "binance", "yfinance"] if name in sys.modules]
+assert not heavy, heavy
+"""
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "cryptobot.brokers.enums",
+        "cryptobot.brokers.binance_client",
+        "cryptobot.data",
+        "cryptobot.trainer",
+        "cryptobot.predictors.crypto_predictor",
+    ],
+)
+def test_import_does_no_io_nor_loads_heavy_dependencies(module):
+    result = subprocess.run([sys.executable, "-c", SCRIPT.format(module=module)], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
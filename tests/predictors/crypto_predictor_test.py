@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from cryptobot.brokers.enums import Intervals, Symbols
+from cryptobot.predictors.crypto_predictor import CryptoPredictor
+from cryptobot.predictors.model_registry import ModelRegistry
+from cryptobot.stores.prediction_store import PredictionStore
+
+
+class CountingPredictor(CryptoPredictor):
+    """A predictor without models, that predicts the hour of the last candle it receives."""
+
+    def __init__(self):
+        self.model_registry = ModelRegistry(loader=lambda *key: {"model": None, "preprocessor": {"version": "20220601"}})
+        self.prediction_store = PredictionStore()
+        self.prepared = []
+
+    def prepare_X(self, symbol, date_time, interval):
+        self.prepared.append(date_time)
+        return np.full((1, 168, 3), date_time.hour, dtype=np.float32)
+
+    def predict_windows(self, symbol, windows, batch_size=1024, interval=Intervals.ONE_HOUR):
+        return windows[:, -1, 0]
+
+
+def test_predict_is_cached_until_the_next_candle_closes():
+    predictor = CountingPredictor()
+    start_time = datetime(2022, 6, 1, 10, 5)
+
+    first = predictor.predict(Symbols.ETHUSDT, start_time, Intervals.ONE_HOUR)
+    second = predictor.predict(Symbols.ETHUSDT, start_time + timedelta(minutes=50), Intervals.ONE_HOUR)
+    third = predictor.predict(Symbols.ETHUSDT, start_time + timedelta(hours=1), Intervals.ONE_HOUR)
+
+    # The last closed candle opens at 9:00 and closes just before 10:00.
+    assert predictor.prepared == [datetime(2022, 6, 1, 9, 59, 59, 999000), datetime(2022, 6, 1, 10, 59, 59, 999000)]
+    assert first.tolist() == second.tolist() == [[9.0]]
+    assert third.tolist() == [[10.0]]
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from cryptobot.predictors.inference_backends import (
+    InferenceBackend,
+    compare_backends,
+    create_backend,
+    get_tflite_path,
+    load_backend,
+)
+
+
+class MeanBackend(InferenceBackend):
+    """Predicts the sigmoid of the mean of each window, rounded to the given decimals."""
+
+    name = "mean"
+    size = 0
+
+    def __init__(self, name, decimals=None):
+        self.name = name
+        self.decimals = decimals
+
+    def predict(self, X):
+        predictions = 1 / (1 + np.exp(-X.mean(axis=(1, 2))))
+        return predictions if self.decimals is None else predictions.round(self.decimals)
+
+
+def test_backends_must_implement_predict_name_and_size():
+    class Incomplete(InferenceBackend):
+        name = "incomplete"
+
+        def predict(self, X):
+            return X
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_compare_backends_reports_the_delta_with_the_first_backend():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 168, 3))
+    y = rng.integers(0, 2, 200)
+
+    report = compare_backends([MeanBackend("keras"), MeanBackend("tflite", decimals=1)], X, y, repeat=2)
+
+    assert list(report.index) == ["keras", "tflite"]
+    assert report.loc["keras", "max_abs_delta"] == 0
+    assert 0 < report.loc["tflite", "max_abs_delta"] <= 0.05
+    assert report.loc["keras", "accuracy_delta"] == 0
+    assert (report["latency_ms"] > 0).all()
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        load_backend("onnx", "gs://bucket/model")
+    assert get_tflite_path("gs://bucket/latest/model", quantized=True) == "gs://bucket/latest/model-quantized.tflite"
+
+
+def test_backends_match_keras():
+    tf = pytest.importorskip("tensorflow")
+    model = tf.keras.Sequential(
+        [tf.keras.Input((168, 3)), tf.keras.layers.LSTM(4), tf.keras.layers.Dense(1, activation="sigmoid")]
+    )
+    X = np.random.default_rng(0).normal(size=(8, 168, 3)).astype(np.float32)
+
+    report = compare_backends([create_backend(name, model) for name in ["keras", "function", "tflite"]], X, repeat=2)
+
+    assert (report["max_abs_delta"] < 1e-4).all()
@@ -0,0 +1,76 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cryptobot.brokers.enums import Intervals, Symbols
+from cryptobot.predictors.model_registry import ModelRegistry
+
+
+class FakeLoader:
+    """Loads models of 100 bytes, slowly, and counts the loads of each key."""
+
+    def __init__(self):
+        self.loads = []
+        self.lock = threading.Lock()
+
+    def __call__(self, symbol, interval, version):
+        time.sleep(0.05)
+        with self.lock:
+            self.loads.append((symbol, interval, version))
+        return {"model": object(), "preprocessor": None, "size": 100}
+
+
+def test_concurrent_callers_share_one_load():
+    loader = FakeLoader()
+    registry = ModelRegistry(loader=loader)
+
+    with ThreadPoolExecutor(8) as executor:
+        entries = list(executor.map(lambda _: registry.get(Symbols.ETHUSDT, Intervals.ONE_HOUR), range(8)))
+
+    assert len(loader.loads) == 1
+    assert all(entry is entries[0] for entry in entries)
+
+
+def test_least_recently_used_models_are_evicted():
+    loader = FakeLoader()
+    registry = ModelRegistry(max_memory=250, loader=loader)
+
+    registry.get(Symbols.ETHUSDT, Intervals.ONE_HOUR)
+    registry.get(Symbols.BTCUSDT, Intervals.ONE_HOUR)
+    registry.get(Symbols.ETHUSDT, Intervals.ONE_HOUR)
+    registry.get(Symbols.ETHUSDT, Intervals.ONE_DAY)
+
+    assert registry.loaded() == [(Symbols.ETHUSDT, Intervals.ONE_HOUR, "latest"), (Symbols.ETHUSDT, Intervals.ONE_DAY, "latest")]
+    assert registry.memory == 200
+    assert len(loader.loads) == 3
+
+
+def test_latest_models_are_reloaded_after_the_ttl():
+    loader = FakeLoader()
+    registry = ModelRegistry(loader=loader, latest_ttl=0.1)
+
+    first = registry.get(Symbols.ETHUSDT, Intervals.ONE_HOUR)
+    assert registry.get(Symbols.ETHUSDT, Intervals.ONE_HOUR) is first
+    registry.get(Symbols.ETHUSDT, Intervals.ONE_HOUR, "20220601-000000")
+
+    time.sleep(0.1)
+    assert registry.get(Symbols.ETHUSDT, Intervals.ONE_HOUR) is not first
+    registry.get(Symbols.ETHUSDT, Intervals.ONE_HOUR, "20220601-000000")
+
+    assert len(loader.loads) == 3
+    assert registry.memory == 200
+
+
+def test_failed_loads_release_their_lock():
+    def fail(symbol, interval, version):
+        raise FileNotFoundError(version)
+
+    registry = ModelRegistry(loader=fail)
+
+    with pytest.raises(FileNotFoundError):
+        registry.get(Symbols.ETHUSDT, Intervals.ONE_HOUR)
+
+    assert registry._key_locks == {}
+    assert registry.loaded() == []
@@ -0,0 +1,48 @@
+import calendar
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from cryptobot.readers import fear_greed_index_reader
+from cryptobot.readers.fear_greed_index_reader import FearGreedIndexReader
+
+
+class FakeResponse:
+    """Returns the last limit days until today, the newest first, like the api."""
+
+    def __init__(self, limit):
+        days = [date.today() - timedelta(days=i) for i in range(limit)]
+        self.data = [
+            {
+                "value": str(i),
+                "value_classification": "Neutral",
+                "timestamp": str(calendar.timegm(day.timetuple())),
+                "time_until_update": "",
+            }
+            for i, day in enumerate(days)
+        ]
+        self.content = b""
+
+    def json(self):
+        return {"data": self.data}
+
+
+@pytest.fixture(autouse=True)
+def requests_get(monkeypatch, tmp_path):
+    monkeypatch.setenv("DAILY_STORE_PATH", str(tmp_path))
+    monkeypatch.setattr(FearGreedIndexReader, "DATA_API", "https://fear-greed.test")
+    monkeypatch.setattr(
+        fear_greed_index_reader.requests, "get", lambda url, params: FakeResponse(params["limit"])
+    )
+
+
+def test_the_initial_date_is_only_requested_by_the_cache():
+    initial_date = datetime.combine(date.today() - timedelta(days=10), datetime.min.time())
+
+    data = FearGreedIndexReader(initial_date, use_cache=False).get_data()
+    cached = FearGreedIndexReader(initial_date, use_cache=True).get_data()
+
+    assert len(data) == 10
+    assert data["close_time_day"].min() == (initial_date + timedelta(days=1)).strftime("%Y-%m-%d")
+    assert len(cached) == 11
+    assert cached["close_time_day"].iloc[0] == initial_date.strftime("%Y-%m-%d")
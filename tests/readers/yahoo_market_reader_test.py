@@ -0,0 +1,35 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from cryptobot.readers.yahoo_market_reader import YahooMarketReader
+
+
+def fake_parsed_data(symbol, start_date, end_date=None):
+    """Every symbol trades on different days, like the indices and the futures."""
+    days = pd.date_range(start_date, end_date or "2022-03-01", freq="D", inclusive="left")
+    days = days[(days.day * len(symbol.value)) % 5 != 0]
+    return pd.DataFrame(
+        {"close_time_day": days.strftime("%Y-%m-%d"), f"{symbol.value}_avg": days.day * len(symbol.value) / 10}
+    )
+
+
+@pytest.fixture(autouse=True)
+def parsed_data(monkeypatch, tmp_path):
+    monkeypatch.setenv("DAILY_STORE_PATH", str(tmp_path))
+    monkeypatch.setattr(YahooMarketReader, "get_parsed_data", classmethod(lambda cls, *args: fake_parsed_data(*args)))
+
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_data_matches_the_chain_of_left_merges(use_cache):
+    start_date, end_date = datetime(2022, 1, 1), datetime(2022, 2, 1)
+
+    expected = None
+    for symbol in YahooMarketReader.YahooSymbol:
+        df = fake_parsed_data(symbol, start_date, end_date)
+        expected = df if expected is None else expected.merge(df, on="close_time_day", how="left")
+
+    data = YahooMarketReader(start_date, end_date, use_cache=use_cache).get_data()
+
+    pd.testing.assert_frame_equal(data, expected)
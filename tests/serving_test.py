@@ -0,0 +1,150 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cryptobot import data
+from cryptobot.brokers.enums import Intervals, Symbols
+from cryptobot.serving import PredictionBatcher, PredictionService, create_server
+from cryptobot.utils import instrumentation
+
+
+class FakePredictor:
+    """Predicts the mean of each window, and records the size of every call to the model."""
+
+    trained_models = [Symbols.ETHUSDT]
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, symbol, start_time, interval, predict_function):
+        return predict_function(np.full((1, 168, 3), start_time.hour, dtype=np.float32))
+
+    def prepare_range(self, symbol, interval, start_time, end_time):
+        open_time = pd.date_range(start_time, end_time, freq="h").values
+        windows = np.arange(len(open_time), dtype=np.float32)[:, None, None] * np.ones((1, 168, 3), np.float32)
+        return open_time, windows
+
+    def predict_windows(self, symbol, windows, batch_size=1024, interval=Intervals.ONE_HOUR):
+        self.batch_sizes.append(len(windows))
+        return windows.mean(axis=(1, 2))
+
+
+@pytest.fixture
+def server():
+    service = PredictionService(FakePredictor(), max_delay=0.05)
+    server = create_server(service, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    service.close()
+
+
+def get(server, path):
+    with urlopen(f"http://127.0.0.1:{server.server_address[1]}{path}") as response:
+        return json.loads(response.read())
+
+
+def test_batcher_coalesces_concurrent_requests():
+    batch_sizes = []
+
+    def predict(X):
+        batch_sizes.append(len(X))
+        return X[:, 0, 0] * 2
+
+    batcher = PredictionBatcher(predict, max_batch_size=1000, max_delay=0.2)
+    with ThreadPoolExecutor(16) as executor:
+        results = list(executor.map(lambda i: batcher.predict(np.full((1, 4, 2), i)), range(16)))
+    batcher.close()
+
+    assert [result.tolist() for result in results] == [[i * 2] for i in range(16)]
+    assert sum(batch_sizes) == 16
+    assert len(batch_sizes) < 16
+
+
+def test_batcher_sends_errors_to_every_request():
+    batcher = PredictionBatcher(lambda X: 1 / 0, max_delay=0)
+    with pytest.raises(ZeroDivisionError):
+        batcher.predict(np.zeros((1, 4, 2)))
+    batcher.close()
+
+
+def test_predict_endpoints(server):
+    time = round(datetime(2022, 6, 1, 5).timestamp())
+    assert get(server, f"/predict?symbol=ETHUSDT&interval=1h&time={time}") == {"prediction": 5.0}
+
+    end = round(datetime(2022, 6, 1, 9).timestamp())
+    predictions = get(server, f"/predict-range?symbol=ETHUSDT&interval=1h&init={time}&end={end}")
+    assert [p["predictions"] for p in predictions] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert predictions[0]["open_time"] == round(pd.Timestamp(datetime(2022, 6, 1, 5)).value / 1e6)
+
+
+def test_invalid_requests(server):
+    with pytest.raises(HTTPError) as error:
+        get(server, "/predict?symbol=DOGEUSDT&interval=1h")
+    assert error.value.code == 400
+
+    with pytest.raises(HTTPError) as error:
+        get(server, "/predict?symbol=BTCUSDT&interval=1h")
+    assert error.value.code == 400
+
+    with pytest.raises(HTTPError) as error:
+        get(server, "/unknown")
+    assert error.value.code == 404
+
+
+def test_candles_endpoint(server, monkeypatch):
+    requests = []
+
+    class FakeCandleStore:
+        def get_candles(self, client, symbol, interval, start_time, end_time):
+            requests.append((symbol, interval, start_time, end_time))
+            return pd.DataFrame({"open_time": [1654041600000], "close": [1800.5]})
+
+    monkeypatch.setattr(data, "candle_store", FakeCandleStore())
+    monkeypatch.setattr(data, "_binance_client", object())
+
+    start, end = round(datetime(2022, 6, 1).timestamp()), round(datetime(2022, 6, 2).timestamp())
+    candles = get(server, f"/candles?symbol=ETHUSDT&interval=1h&start_time={start}&end_time={end}")
+
+    assert candles == [{"open_time": 1654041600000, "close": 1800.5}]
+    assert requests == [(Symbols.ETHUSDT, Intervals.ONE_HOUR, datetime(2022, 6, 1), datetime(2022, 6, 2))]
+
+    with pytest.raises(HTTPError) as error:
+        get(server, f"/candles?symbol=ETHUSDT&interval=1h&start_time=yesterday&end_time={end}")
+    assert error.value.code == 400
+    assert len(requests) == 1
+
+
+def test_internal_errors_are_not_invalid_requests(server, monkeypatch):
+    def fail(*args):
+        raise ValueError("The model returned NaN")
+
+    monkeypatch.setattr(server.service.predictor, "predict_windows", fail)
+    time = round(datetime(2022, 6, 1, 5).timestamp())
+
+    with pytest.raises(HTTPError) as error:
+        get(server, f"/predict?symbol=ETHUSDT&interval=1h&time={time}")
+    assert error.value.code == 500
+
+
+def test_metrics_endpoint(server, monkeypatch):
+    monkeypatch.setattr(instrumentation, "_enabled", True)
+    instrumentation.metrics.reset()
+
+    time = round(datetime(2022, 6, 1, 5).timestamp())
+    get(server, f"/predict?symbol=ETHUSDT&interval=1h&time={time}")
+    with urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+        content_type = response.headers["Content-Type"]
+        text = response.read().decode()
+    instrumentation.metrics.reset()
+
+    assert content_type.startswith("text/plain")
+    assert 'cryptobot_http_request_seconds_count{path="/predict"} 1' in text
+    assert 'cryptobot_http_responses_total{path="/predict",status="200"} 1' in text
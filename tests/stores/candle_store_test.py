@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+import pytest
+
+from cryptobot.brokers.enums import Intervals, Symbols
+from cryptobot.stores.candle_store import CandleStore, merge_ranges, subtract_ranges
+
+HOUR = 3600 * 1000
+
+
+class FakeBroker:
+    """Returns one synthetic candle per hour and records the requested ranges."""
+
+    def __init__(self):
+        self.calls = []
+
+    def get_candles(self, symbol, interval, start_time=None, end_time=None, limit=None):
+        start = round(start_time.timestamp()) * 1000
+        end = round(min(end_time.timestamp(), datetime.now().timestamp())) * 1000
+        self.calls.append((start, end))
+        first = -(-start // HOUR) * HOUR
+        return [
+            [t, 1.0, 2.0, 0.5, t / HOUR, 10.0, t + HOUR - 1, 100.0, 5, 1.0, 10.0]
+            for t in range(first, end + 1, HOUR)
+        ]
+
+
+@pytest.fixture
+def broker():
+    return FakeBroker()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CandleStore(str(tmp_path))
+
+
+def test_get_candles_only_requests_missing_ranges(store, broker):
+    start_time = datetime(2021, 1, 30)
+    end_time = datetime(2021, 2, 2)
+
+    df = store.get_candles(broker, Symbols.ETHUSDT, Intervals.ONE_HOUR, start_time, end_time)
+    assert len(df) == 3 * 24 + 1
+    assert len(broker.calls) == 1
+
+    df_again = store.get_candles(broker, Symbols.ETHUSDT, Intervals.ONE_HOUR, start_time, end_time)
+    assert len(broker.calls) == 1
+    assert df.equals(df_again)
+
+    df_longer = store.get_candles(
+        broker, Symbols.ETHUSDT, Intervals.ONE_HOUR, start_time - timedelta(days=1), end_time + timedelta(days=1)
+    )
+    assert len(df_longer) == 5 * 24 + 1
+    assert len(broker.calls) == 3
+    assert df_longer["open_time"].is_monotonic_increasing
+    assert df_longer["open_time"].is_unique
+
+
+def test_get_candles_with_limit_returns_last_candles(store, broker):
+    end_time = datetime(2021, 3, 1)
+
+    df = store.get_candles(broker, Symbols.ETHUSDT, Intervals.ONE_HOUR, None, end_time, 10)
+    assert len(df) == 10
+    assert df["open_time"].iloc[-1] == round(end_time.timestamp()) * 1000 // HOUR * HOUR
+
+    store.get_candles(broker, Symbols.ETHUSDT, Intervals.ONE_HOUR, None, end_time, 10)
+    assert len(broker.calls) == 1
+
+
+def test_get_candles_does_not_store_incomplete_candles(store, broker):
+    df = store.get_candles(broker, Symbols.ETHUSDT, Intervals.ONE_HOUR, None, datetime.now(), 5)
+    assert len(df) == 5
+
+    now = round(datetime.now().timestamp()) * 1000
+    stored = store.read(Symbols.ETHUSDT, Intervals.ONE_HOUR, 0, now + HOUR)
+    assert len(stored) == 4
+    assert stored["open_time"].iloc[-1] + HOUR <= now
+
+
+def test_ranges_helpers():
+    assert merge_ranges([[5, 8], [0, 2], [2, 4]]) == [[0, 4], [5, 8]]
+    assert subtract_ranges(0, 10, [[2, 4], [6, 7]]) == [[0, 2], [4, 6], [7, 10]]
+    assert subtract_ranges(3, 5, [[0, 10]]) == []
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from cryptobot.stores.daily_store import DailyStore
+
+
+class FakeSource:
+    """Returns one row per day from the requested day until today and records the requests."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, since):
+        self.calls.append(since)
+        days = pd.date_range(since, datetime.utcnow().date(), freq="D").strftime("%Y-%m-%d")
+        return pd.DataFrame({"close_time_day": days, "value": range(len(days))})
+
+
+def day(days_ago):
+    return (datetime.utcnow() - timedelta(days=days_ago)).strftime("%Y-%m-%d")
+
+
+def test_get_data_only_fetches_the_days_after_the_cache(tmp_path):
+    store = DailyStore(str(tmp_path))
+    fetch = FakeSource()
+
+    first = store.get_data("source", day(10), fetch)
+    second = store.get_data("source", day(5), fetch)
+
+    assert fetch.calls == [day(10), day(0)]
+    assert first["close_time_day"].tolist() == [day(n) for n in range(10, -1, -1)]
+    assert second["close_time_day"].tolist() == [day(n) for n in range(5, -1, -1)]
+    # Today is never cached, as it isn't complete yet.
+    assert store.read("source")["close_time_day"].iloc[-1] == day(1)
+
+
+def test_get_data_refetches_when_start_is_before_the_cache(tmp_path):
+    store = DailyStore(str(tmp_path))
+    fetch = FakeSource()
+
+    store.get_data("source", day(5), fetch)
+    df = store.get_data("source", day(8), fetch, end_day=day(2))
+
+    assert fetch.calls == [day(5), day(8)]
+    assert df["close_time_day"].tolist() == [day(n) for n in range(8, 2, -1)]
+
+
+def test_get_data_does_not_fetch_when_the_range_is_cached(tmp_path):
+    store = DailyStore(str(tmp_path))
+    fetch = FakeSource()
+
+    store.get_data("^IXIC", day(10), fetch)
+    df = store.get_data("^IXIC", day(10), fetch, end_day=day(3))
+
+    assert fetch.calls == [day(10)]
+    assert len(df) == 7
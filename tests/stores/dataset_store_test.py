@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cryptobot.brokers.enums import Intervals, Symbols
+from cryptobot.stores import dataset_store
+from cryptobot.stores.dataset_store import DatasetStore
+from cryptobot.utils.pipeline_helper import create_pipeline
+
+
+def create_dataset():
+    data = pd.DataFrame(
+        {
+            "close": np.linspace(1, 2, 50),
+            "FG_val_clasif": ["Fear", "Greed"] * 25,
+            "target": [0, 1] * 25,
+        }
+    )
+    pipeline = create_pipeline(data)
+    preprocessed_data = pd.DataFrame(
+        pipeline.fit_transform(data), columns=pipeline.get_feature_names_out()
+    )
+    return data, pipeline, preprocessed_data
+
+
+def key(store, **config):
+    return store.key(
+        Symbols.BTCUSDT,
+        Intervals.ONE_HOUR,
+        datetime(2022, 1, 1),
+        datetime(2022, 2, 1),
+        config,
+    )
+
+
+def test_save_and_load_the_dataset_memory_mapped(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    data, pipeline, preprocessed_data = create_dataset()
+
+    assert store.load(key(store)) is None
+    store.save(key(store), preprocessed_data, pipeline, data.columns)
+    dataset = store.load(key(store))
+
+    pd.testing.assert_frame_equal(dataset["data"], preprocessed_data.astype(float))
+    assert not dataset["data"].values.flags.writeable
+    assert dataset["columns"] == list(data.columns)
+    np.testing.assert_array_equal(
+        dataset["pipeline"].transform(data), pipeline.transform(data)
+    )
+
+
+def test_key_changes_with_the_inputs(tmp_path, monkeypatch):
+    store = DatasetStore(str(tmp_path))
+
+    assert key(store) == key(store)
+    assert key(store) != key(store, compact=True)
+    assert key(store) != store.key(
+        Symbols.ETHUSDT,
+        Intervals.ONE_HOUR,
+        datetime(2022, 1, 1),
+        datetime(2022, 2, 1),
+    )
+
+    original = key(store)
+    versions = dict(dataset_store.dependency_versions(), pandas="0.0.1")
+    monkeypatch.setattr(dataset_store, "dependency_versions", lambda: versions)
+    assert key(store) != original
+
+
+def test_invalidate(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    data, pipeline, preprocessed_data = create_dataset()
+    store.save(key(store), preprocessed_data, pipeline, data.columns)
+    store.save(key(store, compact=True), preprocessed_data, pipeline, data.columns)
+
+    store.invalidate(key(store))
+    assert store.load(key(store)) is None
+    assert store.load(key(store, compact=True)) is not None
+
+    store.invalidate()
+    assert store.load(key(store, compact=True)) is None
@@ -0,0 +1,26 @@
+from cryptobot.brokers.enums import Intervals, Symbols
+from cryptobot.stores.prediction_store import PredictionStore
+
+OPEN_TIME = 1654041600000
+
+
+def test_predictions_are_cached_in_memory():
+    store = PredictionStore()
+    assert store.path is None
+    assert store.get(Symbols.ETHUSDT, Intervals.ONE_HOUR, "v1", OPEN_TIME) is None
+
+    store.set(Symbols.ETHUSDT, Intervals.ONE_HOUR, "v1", OPEN_TIME, 0.7)
+
+    assert store.get(Symbols.ETHUSDT, Intervals.ONE_HOUR, "v1", OPEN_TIME) == 0.7
+    assert store.get(Symbols.ETHUSDT, Intervals.ONE_HOUR, "v2", OPEN_TIME) is None
+
+
+def test_predictions_are_persisted(tmp_path):
+    path = str(tmp_path / "predictions.sqlite")
+    store = PredictionStore(path)
+    store.set(Symbols.ETHUSDT, Intervals.ONE_HOUR, "v1", OPEN_TIME, 0.7)
+    store.close()
+
+    store = PredictionStore(path)
+    assert store.get(Symbols.ETHUSDT, Intervals.ONE_HOUR, "v1", OPEN_TIME) == 0.7
+    assert store.get(Symbols.BTCUSDT, Intervals.ONE_HOUR, "v1", OPEN_TIME) is None
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from cryptobot.utils.daily_data_helper import align_daily_data, attach_daily_data
+
+
+def daily(days, **columns):
+    return pd.DataFrame({"close_time_day": pd.DatetimeIndex(days).strftime("%Y-%m-%d"), **columns})
+
+
+def test_attach_daily_data_matches_the_left_merges():
+    rng = np.random.default_rng(0)
+    close_time = pd.date_range("2022-01-01", "2022-02-10", freq="h") + pd.Timedelta("59min 59.999s")
+    candles = pd.DataFrame({"close": rng.normal(size=len(close_time)), "close_time": close_time})
+    candles["close_time_day"] = candles["close_time"].dt.strftime("%Y-%m-%d")
+
+    fear_greed_days = pd.date_range("2022-01-05", "2022-02-20")
+    fear_greed = daily(
+        fear_greed_days,
+        FG_value=rng.uniform(0, 100, len(fear_greed_days)),
+        FG_val_clasif=rng.choice(["Fear", "Greed"], len(fear_greed_days)),
+    )
+    dominance_days = pd.date_range("2021-12-01", "2022-01-20")
+    dominance = daily(dominance_days, btc_avg=rng.normal(size=len(dominance_days)))
+    yahoo_days = pd.bdate_range("2021-12-20", "2022-02-05")
+    yahoo = daily(yahoo_days, **{"^IXIC_avg": rng.normal(size=len(yahoo_days)), "^DJI_avg": rng.normal(size=len(yahoo_days))})
+
+    expected = candles
+    for df in [fear_greed, dominance, yahoo]:
+        expected = expected.merge(df, on="close_time_day", how="left")
+
+    result = attach_daily_data(candles, align_daily_data(fear_greed, dominance, yahoo))
+
+    pd.testing.assert_frame_equal(result, expected)
+
+    candles["close_time"] = candles["close_time"].to_numpy().astype("datetime64[ms]").astype(np.int64)
+    result = attach_daily_data(candles, align_daily_data(fear_greed, dominance, yahoo))
+    pd.testing.assert_frame_equal(result.drop(columns="close_time"), expected.drop(columns="close_time"))
+    assert result["FG_value"].dtype == np.float64
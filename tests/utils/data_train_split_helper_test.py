@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cryptobot.utils.data_train_split_helper import WindowSampler
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(500, 3)), columns=["num_tr__close", "num_tr__volume", "cat_tr__FG"])
+    df["remainder__target"] = rng.integers(0, 2, 500)
+    return df
+
+
+def test_window_sampler_batches_are_padded_subsequences(df):
+    sampler = WindowSampler(df).sample(np.random.randint(120, 168, 50))
+    X, y = sampler.get_batch()
+
+    assert X.shape == (50, sampler.lengths.max(), 4)
+    assert X.dtype == np.float32
+    for i, (start, length) in enumerate(zip(sampler.starts, sampler.lengths)):
+        padding = X.shape[1] - length
+        np.testing.assert_array_equal(X[i, :padding], -999)
+        np.testing.assert_array_equal(X[i, padding:], df[start : start + length].values.astype(np.float32))
+        assert y[i] == df.iloc[start + length + 1]["remainder__target"]
+
+
+def test_window_sampler_batch_of_indices_with_maxlen(df):
+    sampler = WindowSampler(df).sample([5, 168, 10])
+    X, y = sampler.get_batch([0, 2], maxlen=168)
+
+    assert X.shape == (2, 168, 4)
+    assert (X[0, :163] == -999).all()
+    assert (X[1, :158] == -999).all()
+    np.testing.assert_array_equal(y, df["remainder__target"].values[sampler.starts[[0, 2]] + sampler.lengths[[0, 2]] + 1])
+
+
+def test_iter_batches_groups_the_samples_by_length(df):
+    sampler = WindowSampler(df).sample(np.random.randint(120, 168, 300))
+    batches = list(sampler.iter_batches(batch_size=32, indices=np.arange(250), seed=0))
+
+    assert sum(len(y) for _, y in batches) == 250
+    assert sum(X.size for X, _ in batches) < 250 * 168 * 4
+    for X, y in batches:
+        # Every window is padded to the longest window of its batch only.
+        lengths = (X[:, :, 0] != -999).sum(axis=1)
+        assert X.shape[1] == lengths.max()
+        assert lengths.max() - lengths.min() < 16
@@ -0,0 +1,76 @@
+import json
+import logging
+
+import pytest
+
+from cryptobot.utils import instrumentation
+from cryptobot.utils.instrumentation import increment, log_metrics, metrics, observe, timed, timer
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_enabled", True)
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_disabled_instrumentation_records_nothing(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_enabled", False)
+    metrics.reset()
+
+    with timer("stage"):
+        increment("requests")
+        observe("size", 3)
+
+    assert timed("call")(lambda x: x + 1)(1) == 2
+    assert metrics.snapshot() == {"counters": [], "histograms": []}
+
+
+def test_the_environment_variable_is_read_on_every_check(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_enabled", None)
+
+    monkeypatch.delenv("INSTRUMENTATION", raising=False)
+    assert not instrumentation.is_enabled()
+    monkeypatch.setenv("INSTRUMENTATION", "true")
+    assert instrumentation.is_enabled()
+    monkeypatch.setenv("INSTRUMENTATION", "0")
+    assert not instrumentation.is_enabled()
+
+    instrumentation.enable()
+    assert instrumentation.is_enabled()
+
+
+def test_prometheus_text(enabled):
+    increment("broker_requests", broker="binance", endpoint="klines")
+    increment("broker_requests", 2, broker="binance", endpoint="klines")
+    observe("stage_seconds", 0.003, stage="candles")
+    observe("stage_seconds", 0.2, stage="candles")
+
+    text = metrics.to_prometheus()
+
+    assert '# TYPE cryptobot_broker_requests_total counter' in text
+    assert 'cryptobot_broker_requests_total{broker="binance",endpoint="klines"} 3' in text
+    assert '# TYPE cryptobot_stage_seconds histogram' in text
+    assert 'cryptobot_stage_seconds_bucket{stage="candles",le="0.001"} 0' in text
+    assert 'cryptobot_stage_seconds_bucket{stage="candles",le="0.005"} 1' in text
+    assert 'cryptobot_stage_seconds_bucket{stage="candles",le="+Inf"} 2' in text
+    assert 'cryptobot_stage_seconds_count{stage="candles"} 2' in text
+
+
+def test_timers_and_structured_log(enabled, caplog):
+    @timed("call", function="double")
+    def double(x):
+        return 2 * x
+
+    with timer("stage", stage="features"):
+        assert double(2) == 4
+
+    with caplog.at_level(logging.INFO):
+        log_metrics()
+
+    snapshot = json.loads(caplog.records[-1].getMessage())["metrics"]
+    histograms = {h["name"]: h for h in snapshot["histograms"]}
+    assert histograms["call_seconds"]["labels"] == {"function": "double"}
+    assert histograms["stage_seconds"]["count"] == 1
+    assert histograms["stage_seconds"]["sum"] >= histograms["call_seconds"]["sum"]
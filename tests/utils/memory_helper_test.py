@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from cryptobot.utils.memory_helper import compact_frame, memory_usage
+from cryptobot.utils.pipeline_helper import create_pipeline
+
+
+def test_compact_frame_keeps_the_pipeline_output():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "open_time": np.arange(1000, dtype=np.int64),
+            "close": rng.normal(size=1000),
+            "FG_val_clasif": rng.choice(["Fear", "Greed", "Neutral"], 1000),
+            "target": rng.integers(0, 2, 1000),
+        }
+    )
+    expected = create_pipeline(df.drop(columns="open_time")).fit_transform(df.drop(columns="open_time"))
+    size = memory_usage(df)
+
+    assert compact_frame(df) is df
+    assert df["close"].dtype == np.float32
+    assert df["open_time"].dtype == np.int64
+    assert df["FG_val_clasif"].dtype == "category"
+    assert memory_usage(df) < size * 0.6
+
+    result = create_pipeline(df.drop(columns="open_time")).fit_transform(df.drop(columns="open_time"))
+    np.testing.assert_allclose(result, expected, rtol=1e-6, atol=1e-6)
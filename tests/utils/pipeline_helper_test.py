@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from cryptobot.utils.pipeline_helper import (
+    create_pipeline,
+    load_pipeline,
+    save_pipeline,
+    transform_with_pipeline,
+)
+
+
+def test_saved_pipeline_transforms_like_the_fitted_one(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "close": rng.normal(100, 10, 50),
+            "FG_val_clasif": rng.choice(["Fear", "Greed", "Neutral"], 50),
+            "volume": rng.normal(10, 1, 50),
+            "target": rng.integers(0, 2, 50),
+        }
+    )
+    pipeline = create_pipeline(df)
+    expected = pipeline.fit_transform(df)
+
+    path = str(tmp_path / "pipeline.joblib")
+    save_pipeline(pipeline, df.columns, path, "20220601-000000")
+    preprocessor = load_pipeline(path)
+
+    assert preprocessor["version"] == "20220601-000000"
+    assert preprocessor["columns"] == list(df.columns)
+    reordered = df[["target", "volume", "FG_val_clasif", "close"]]
+    np.testing.assert_array_equal(transform_with_pipeline(preprocessor, reordered), expected)
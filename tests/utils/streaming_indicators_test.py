@@ -0,0 +1,63 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+from cryptobot.utils.streaming_indicators import EwmMean, StreamingIndicator, StreamingMetrics
+
+
+@pytest.fixture
+def candles():
+    rng = np.random.default_rng(0)
+    close = 1000 + np.cumsum(rng.normal(0, 5, 1000))
+    return pd.DataFrame(
+        {
+            "open": close,
+            "high": close + rng.uniform(0, 5, 1000),
+            "low": close - rng.uniform(0, 5, 1000),
+            "close": close,
+        }
+    )
+
+
+def test_streaming_metrics_match_add_metrics(candles):
+    pytest.importorskip("pandas_ta")
+    from cryptobot.utils.feature_engineering import add_metrics
+
+    expected = add_metrics(candles.copy())
+    streamed = StreamingMetrics().add_metrics(candles.copy())
+
+    for column in StreamingMetrics.COLUMNS:
+        np.testing.assert_allclose(streamed[column], expected[column], rtol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("adjust,min_periods", [(True, 14), (False, 0)])
+def test_ewm_mean_matches_pandas(adjust, min_periods):
+    values = pd.Series([np.nan, 1.0, 3.0, np.nan, 2.0] + list(range(20)), dtype=float)
+    expected = values.ewm(alpha=0.1, adjust=adjust, min_periods=min_periods).mean()
+
+    ewm = EwmMean(0.1, adjust, min_periods)
+    streamed = [ewm.update(value) for value in values]
+
+    np.testing.assert_allclose(streamed, expected, equal_nan=True)
+
+
+def test_streaming_metrics_resume_from_checkpoint(candles):
+    expected = StreamingMetrics().add_metrics(candles.copy())
+
+    metrics = StreamingMetrics()
+    first = metrics.add_metrics(candles[:600].copy())
+    state = json.loads(json.dumps(metrics.get_state()))
+    second = StreamingMetrics.from_state(state).add_metrics(candles[600:].copy())
+
+    resumed = pd.concat([first, second])
+    for column in StreamingMetrics.COLUMNS:
+        np.testing.assert_array_equal(resumed[column], expected[column])
+
+
+def test_indicators_must_implement_update():
+    class Incomplete(StreamingIndicator):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()